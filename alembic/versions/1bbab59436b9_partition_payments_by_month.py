@@ -0,0 +1,131 @@
+"""partition_payments_by_month
+
+Moves payments into a table partitioned by month of created_at. A partition
+is created for every month from the oldest payment up to MONTHS_AHEAD months
+from now, plus a default partition.
+
+Runs in the migration's single transaction. payments is renamed first, which
+takes an ACCESS EXCLUSIVE lock, and the whole table is then copied. Until the
+commit every query on payments, webhooks included, waits. The copy's
+duration grows with the table, so plan a maintenance window for large
+tables.
+
+The partition DDL is inlined on purpose: this revision must keep doing the
+same thing however app.db.partitions changes later.
+
+Revision ID: 1bbab59436b9
+Revises: d8de9eb27d89
+Create Date: 2026-10-19 09:12:41.503118
+
+"""
+from datetime import date, datetime, time, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '1bbab59436b9'
+down_revision: Union[str, Sequence[str], None] = 'd8de9eb27d89'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_partitions(since: date) -> None:
+    """Create the monthly partitions from the month of ``since`` up to ``MONTHS_AHEAD`` months from now."""
+    month = date(since.year, since.month, 1)
+    last = add_months(datetime.now(timezone.utc).date(), MONTHS_AHEAD)
+    while month <= last:
+        # UTC month boundaries regardless of the server time zone
+        start = datetime.combine(month, time.min, timezone.utc)
+        end = datetime.combine(add_months(month, 1), time.min, timezone.utc)
+        op.execute(
+            f"CREATE TABLE payments_{month:%Y_%m} PARTITION OF payments "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        month = add_months(month, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE payments RENAME TO payments_legacy")
+    op.execute("ALTER INDEX payments_pkey RENAME TO payments_legacy_pkey")
+    for column in ("user_id", "account_id"):
+        op.execute(f"ALTER TABLE payments_legacy RENAME CONSTRAINT payments_{column}_fkey "
+                   f"TO payments_legacy_{column}_fkey")
+
+    op.execute("""
+        CREATE TABLE payments (
+            transaction_id UUID NOT NULL,
+            user_id BIGINT,
+            account_id BIGINT,
+            amount NUMERIC NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT payments_pkey PRIMARY KEY (transaction_id, created_at),
+            CONSTRAINT payments_user_id_fkey FOREIGN KEY (user_id)
+                REFERENCES users (id) ON DELETE SET NULL,
+            CONSTRAINT payments_account_id_fkey FOREIGN KEY (account_id)
+                REFERENCES accounts (id) ON DELETE SET NULL
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("CREATE TABLE payments_default PARTITION OF payments DEFAULT")
+
+    op.create_table('payment_transactions',
+                    sa.Column('transaction_id', sa.dialects.postgresql.UUID(), nullable=False),
+                    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'),
+                              nullable=False),
+                    sa.PrimaryKeyConstraint('transaction_id')
+                    )
+
+    bind = op.get_bind()
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM payments_legacy")).scalar()
+    since = oldest.date() if oldest else datetime.now(timezone.utc).date()
+    create_partitions(since)
+
+    op.execute("""
+        INSERT INTO payments (transaction_id, user_id, account_id, amount, created_at)
+        SELECT transaction_id, user_id, account_id, amount, COALESCE(created_at, now())
+        FROM payments_legacy
+    """)
+    op.execute("""
+        INSERT INTO payment_transactions (transaction_id, created_at)
+        SELECT transaction_id, COALESCE(created_at, now())
+        FROM payments_legacy
+    """)
+    op.execute("DROP TABLE payments_legacy")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE payments RENAME TO payments_partitioned")
+    op.execute("ALTER INDEX payments_pkey RENAME TO payments_partitioned_pkey")
+    for column in ("user_id", "account_id"):
+        op.execute(f"ALTER TABLE payments_partitioned RENAME CONSTRAINT payments_{column}_fkey "
+                   f"TO payments_partitioned_{column}_fkey")
+
+    op.create_table('payments',
+                    sa.Column('transaction_id', sa.dialects.postgresql.UUID(), nullable=False),
+                    sa.Column('user_id', sa.BigInteger(), nullable=True),
+                    sa.Column('account_id', sa.BigInteger(), nullable=True),
+                    sa.Column('amount', sa.Numeric(scale=2), nullable=False),
+                    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+                    sa.PrimaryKeyConstraint('transaction_id'),
+                    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+                    sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ondelete='SET NULL')
+                    )
+    op.create_index('ix_payments_transaction_id', 'payments', ['transaction_id'], unique=False)
+
+    op.execute("""
+        INSERT INTO payments (transaction_id, user_id, account_id, amount, created_at)
+        SELECT transaction_id, user_id, account_id, amount, created_at
+        FROM payments_partitioned
+    """)
+    op.execute("DROP TABLE payments_partitioned")
+    op.drop_table('payment_transactions')
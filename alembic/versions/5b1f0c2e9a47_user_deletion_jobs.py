@@ -0,0 +1,60 @@
+"""user_deletion_jobs
+
+Adds users.deleted_at, set when a user's deletion is requested, and
+user_deletion_jobs, the background jobs that detach the user's payments
+and delete the accounts and the user in batches.
+
+Revision ID: 5b1f0c2e9a47
+Revises: e74bd55c937b
+Create Date: 2026-10-19 18:12:09.514230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0c2e9a47'
+down_revision: Union[str, Sequence[str], None] = 'e74bd55c937b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without default: only a catalog change, the table is not rewritten
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_table(
+        'user_deletion_jobs',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('requested_by', sa.BigInteger(), nullable=True),
+        sa.Column('status', sa.String(length=16), server_default='pending', nullable=False),
+        sa.Column('phase', sa.String(length=16), server_default='payments', nullable=False),
+        sa.Column('payments_total', sa.BigInteger(), nullable=True),
+        sa.Column('payments_detached', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('accounts_total', sa.BigInteger(), nullable=True),
+        sa.Column('accounts_deleted', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('batches', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_user_deletion_jobs_user_id', 'user_deletion_jobs', ['user_id'])
+    op.create_index('ix_user_deletion_jobs_open', 'user_deletion_jobs', ['id'],
+                    postgresql_where=sa.text("status IN ('pending', 'running')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_deletion_jobs_open', table_name='user_deletion_jobs')
+    op.drop_index('ix_user_deletion_jobs_user_id', table_name='user_deletion_jobs')
+    op.drop_table('user_deletion_jobs')
+    op.drop_column('users', 'deleted_at')
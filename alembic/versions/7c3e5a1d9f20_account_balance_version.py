@@ -0,0 +1,35 @@
+"""account_balance_version
+
+Adds accounts.balance_version, incremented with every balance change. Balance
+updates pushed to event streams carry it, so a stream can drop an update
+that arrives after a newer one.
+
+Revision ID: 7c3e5a1d9f20
+Revises: 5b1f0c2e9a47
+Create Date: 2026-10-19 21:04:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e5a1d9f20'
+down_revision: Union[str, Sequence[str], None] = '5b1f0c2e9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Constant default: only a catalog change, the table is not rewritten
+    op.add_column(
+        'accounts',
+        sa.Column('balance_version', sa.BigInteger(), server_default='0', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('accounts', 'balance_version')
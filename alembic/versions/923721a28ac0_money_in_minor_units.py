@@ -0,0 +1,86 @@
+"""money_in_minor_units
+
+Stores accounts.balance and payments.amount as BIGINT minor units
+(balance_minor, amount_minor). Partitions detached into the archive schema
+are converted too, so they can still be attached back. The schema is
+"archive", the default of PAYMENTS_ARCHIVE_SCHEMA when this revision was
+written. Pass a different one with ``alembic -x archive_schema=<name> upgrade``.
+
+The upgrade refuses to run if any stored value has fractions of a cent,
+instead of silently rounding money.
+
+Revision ID: 923721a28ac0
+Revises: cd8c56c03411
+Create Date: 2026-10-19 14:20:51.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '923721a28ac0'
+down_revision: Union[str, Sequence[str], None] = 'cd8c56c03411'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ARCHIVE_SCHEMA = "archive"
+
+
+def archive_schema() -> str:
+    return context.get_x_argument(as_dictionary=True).get("archive_schema", ARCHIVE_SCHEMA)
+
+
+def archived_payments_tables(column: str) -> list[str]:
+    return list(op.get_bind().execute(sa.text("""
+        SELECT table_name
+        FROM information_schema.columns
+        WHERE table_schema = :schema AND column_name = :column AND table_name ~ '^payments_[0-9]{4}_[0-9]{2}$'
+        ORDER BY table_name
+    """), {"schema": archive_schema(), "column": column}).scalars())
+
+
+def to_minor(table: str, column: str) -> None:
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BIGINT USING ({column} * 100)::bigint")
+    op.execute(f"ALTER TABLE {table} RENAME COLUMN {column} TO {column}_minor")
+
+
+def from_minor(table: str, column: str) -> None:
+    op.execute(f"ALTER TABLE {table} RENAME COLUMN {column}_minor TO {column}")
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE NUMERIC USING round({column} / 100.0, 2)")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    archived = [f"{archive_schema()}.{name}" for name in archived_payments_tables("amount")]
+    bind = op.get_bind()
+    for table, column in [("accounts", "balance"), ("payments", "amount")] + [(t, "amount") for t in archived]:
+        fractional = bind.execute(sa.text(
+            f"SELECT count(*) FROM {table} WHERE {column} <> round({column}, 2)"
+        )).scalar()
+        if fractional:
+            raise RuntimeError(
+                f"{table}.{column} has {fractional} values with fractions of a cent, fix them before upgrading"
+            )
+
+    op.execute("ALTER TABLE accounts ALTER COLUMN balance DROP DEFAULT")
+    to_minor("accounts", "balance")
+    op.execute("ALTER TABLE accounts ALTER COLUMN balance_minor SET DEFAULT 0")
+
+    # Recurses into every attached partition
+    to_minor("payments", "amount")
+    for table in archived:
+        to_minor(table, "amount")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in archived_payments_tables("amount_minor"):
+        from_minor(f"{archive_schema()}.{name}", "amount")
+    from_minor("payments", "amount")
+
+    op.execute("ALTER TABLE accounts ALTER COLUMN balance_minor DROP DEFAULT")
+    from_minor("accounts", "balance")
+    op.execute("ALTER TABLE accounts ALTER COLUMN balance SET DEFAULT 0.00")
@@ -0,0 +1,63 @@
+"""index_audit
+
+Drops indexes that duplicate primary keys (ix_users_id, ix_accounts_id,
+ix_payments_transaction_id) and adds the missing foreign key indexes on
+payments.user_id and payments.account_id. All index builds and drops run
+CONCURRENTLY so webhook writes are not blocked.
+
+Revision ID: cd8c56c03411
+Revises: 1bbab59436b9
+Create Date: 2026-10-19 11:03:27.118420
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'cd8c56c03411'
+down_revision: Union[str, Sequence[str], None] = '1bbab59436b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REDUNDANT_INDEXES = ('ix_users_id', 'ix_accounts_id', 'ix_payments_transaction_id')
+PAYMENTS_FK_COLUMNS = ('user_id', 'account_id')
+
+
+def payments_partitions() -> list[str]:
+    return list(op.get_bind().execute(sa.text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'payments'::regclass
+        ORDER BY c.relname
+    """)).scalars())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name in REDUNDANT_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+        # CONCURRENTLY is not supported on a partitioned table itself: create the
+        # parent index ON ONLY (invalid until complete), build each partition's
+        # index concurrently and attach it, which makes the parent index valid.
+        for column in PAYMENTS_FK_COLUMNS:
+            parent_index = f"ix_payments_{column}"
+            op.execute(f"CREATE INDEX IF NOT EXISTS {parent_index} ON ONLY payments ({column})")
+            for partition in payments_partitions():
+                partition_index = f"{partition}_{column}_idx"
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index} ON {partition} ({column})")
+                op.execute(f"ALTER INDEX {parent_index} ATTACH PARTITION {partition_index}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for column in PAYMENTS_FK_COLUMNS:
+            op.execute(f"DROP INDEX IF EXISTS ix_payments_{column}")
+
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_id ON users (id)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_accounts_id ON accounts (id)")
@@ -0,0 +1,53 @@
+"""payment_outbox
+
+Adds payment_outbox, written in the same transaction as each payment, and
+outbox_checkpoints, the position of each relay consumer. txid is the
+writing transaction's id as BIGINT, which the relay compares with
+pg_snapshot_xmin() to read only rows of finished transactions.
+
+Revision ID: e74bd55c937b
+Revises: 923721a28ac0
+Create Date: 2026-10-19 16:02:41.337208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e74bd55c937b'
+down_revision: Union[str, Sequence[str], None] = '923721a28ac0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'payment_outbox',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('txid', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'),
+                  nullable=False),
+        sa.Column('event_type', sa.String(length=64), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_payment_outbox_position', 'payment_outbox', ['txid', 'id'])
+    op.create_table(
+        'outbox_checkpoints',
+        sa.Column('consumer', sa.Text(), nullable=False),
+        sa.Column('txid', sa.BigInteger(), nullable=False),
+        sa.Column('outbox_id', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('consumer'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('outbox_checkpoints')
+    op.drop_index('ix_payment_outbox_position', table_name='payment_outbox')
+    op.drop_table('payment_outbox')
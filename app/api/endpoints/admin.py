@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import User
+from app.core.config import USER_DELETION_MODE
 from app.db.session import get_db
 from app.core.dependencies import require_admin
 from app.schemas import (
+    UserBulkCreate,
+    UserBulkCreateResponse,
     UserCreate,
+    UserDeletionJobResponse,
+    UserImportResponse,
     UserUpdate,
     UserResponse,
     UsersListResponse,
@@ -88,13 +96,123 @@ async def create_user(
         )
 
 
+@router.post(
+    "/bulk",
+    response_model=UserBulkCreateResponse,
+    summary="Create many users",
+    description="Create up to USERS_BULK_MAX_ITEMS users in one request. Items whose email is "
+                "already registered or repeated in the request are skipped and reported in the "
+                "per-item results. Admin only.",
+    responses=PROHIBITED_RESPONSE,
+    response_model_exclude_none=True
+)
+async def create_users(
+        bulk_data: UserBulkCreate,
+        admin: User = Depends(require_admin),
+        db: AsyncSession = Depends(get_db)
+) -> UserBulkCreateResponse:
+    """
+    Create many users.
+
+    Args:
+        bulk_data: Users to create
+        admin: Authenticated admin user
+        db: Database session
+
+    Returns:
+        UserBulkCreateResponse: Result per item, in request order
+    """
+    # Ends the transaction of the admin lookup, if any, so no connection is
+    # held while the passwords are hashed
+    await db.commit()
+    return await UserService.create_users(db, bulk_data.users)
+
+
+@router.get(
+    "/export",
+    response_class=Response,
+    summary="Export users with accounts as CSV",
+    description="Stream all users joined with their accounts as CSV, one row per account. "
+                "Users without accounts get one row with empty account columns. Admin only.",
+    responses={
+        200: {"content": {"text/csv": {}}, "description": "CSV file"},
+        **PROHIBITED_RESPONSE
+    }
+)
+async def export_users(
+        admin: User = Depends(require_admin)
+) -> StreamingResponse:
+    """
+    Export users with their accounts as CSV.
+
+    Args:
+        admin: Authenticated admin user
+
+    Returns:
+        StreamingResponse: CSV rows, streamed as they are read from the database
+    """
+    return StreamingResponse(
+        UserService.export_users_csv(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="users.csv"'},
+    )
+
+
+@router.post(
+    "/import",
+    response_model=UserImportResponse,
+    summary="Import users from CSV",
+    description="Create users from a CSV request body (`Content-Type: text/csv`) with the columns "
+                "`email`, `password`, `full_name` and optionally `role`. The file is parsed while it "
+                "is uploaded and rows are created in chunks; the response lists the rows that were "
+                "not created. Admin only.",
+    responses={
+        400: {"description": "Missing or invalid CSV header"},
+        **PROHIBITED_RESPONSE
+    },
+    openapi_extra={
+        "requestBody": {"required": True, "content": {"text/csv": {"schema": {"type": "string"}}}}
+    },
+    response_model_exclude_none=True
+)
+async def import_users(
+        request: Request,
+        admin: User = Depends(require_admin),
+        db: AsyncSession = Depends(get_db)
+) -> UserImportResponse:
+    """
+    Import users from the CSV request body.
+
+    Args:
+        request: Request whose body is read as a stream
+        admin: Authenticated admin user
+        db: Database session
+
+    Returns:
+        UserImportResponse: Counts per outcome and the rows that were not created
+
+    Raises:
+        HTTPException: 400 if the header is missing or invalid
+    """
+    # Ends the transaction of the admin lookup, if any, so no connection is
+    # held while the first chunk's passwords are hashed
+    await db.commit()
+    try:
+        return await UserService.import_users_csv(db, request.stream())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.patch(
     "/{user_id}",
     response_model=UserResponse,
     summary="Update user",
     description="Update user data by ID. Admin only.",
     responses={
-        400: {"description": "Invalid data"},
+        400: {"description": "Email already taken or invalid data"},
         **NOT_FOUND_RESPONSE,
         **PROHIBITED_RESPONSE
     },
@@ -119,7 +237,7 @@ async def update_user(
         UserResponse: Updated user data
 
     Raises:
-        HTTPException: 404 if user not found
+        HTTPException: 400 if the email is taken or the data is invalid, 404 if user not found
     """
     try:
         user = await UserService.update_user(db, user_id, update_data)
@@ -130,6 +248,13 @@ async def update_user(
             )
 
         return UserResponse.model_validate(user)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -139,11 +264,17 @@ async def update_user(
 
 @router.delete(
     "/{user_id}",
-    status_code=status.HTTP_204_NO_CONTENT,
+    # The mode is fixed at startup, so the schema shows the status this server answers with
+    status_code=status.HTTP_202_ACCEPTED if USER_DELETION_MODE == "job" else status.HTTP_204_NO_CONTENT,
+    response_model=UserDeletionJobResponse if USER_DELETION_MODE == "job" else None,
     summary="Delete user",
-    description="Delete user by ID. Admin only.",
+    description="Delete user by ID. Admin only. With `USER_DELETION_MODE=sync` (default) everything "
+                "is deleted in the request (204). With `USER_DELETION_MODE=job` the user is marked "
+                "deleted at once and the payments, accounts and the user row are removed in the "
+                "background; the response is the job, see `/admin/users/deletions/{job_id}` (202).",
     responses={
-        204: {"description": "User deleted successfully"},
+        202: {"model": UserDeletionJobResponse, "description": "Deletion job started (`USER_DELETION_MODE=job`)"},
+        204: {"description": "User deleted successfully (`USER_DELETION_MODE=sync`)"},
         **NOT_FOUND_RESPONSE,
         **PROHIBITED_RESPONSE
     }
@@ -161,11 +292,18 @@ async def delete_user(
         admin: Authenticated admin user
         db: Database session
 
+    Returns:
+        UserDeletionJobResponse: The deletion job in job mode, an empty 204 response in sync mode
+
     Raises:
         HTTPException: 404 if user not found
     """
     try:
-        deleted = await UserService.delete_user(db, user_id)
+        if USER_DELETION_MODE == "job":
+            job = await UserService.request_user_deletion(db, user_id, admin.id)
+            deleted = job is not None
+        else:
+            deleted = await UserService.delete_user(db, user_id)
         if not deleted:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -180,6 +318,77 @@ async def delete_user(
             detail=f"Error deleting user: {str(e)}"
         )
 
+    if USER_DELETION_MODE == "job":
+        return UserDeletionJobResponse.model_validate(job)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get(
+    "/deletions",
+    response_model=List[UserDeletionJobResponse],
+    summary="List user deletion jobs",
+    description="Latest background user deletions, newest first. Admin only.",
+    responses=PROHIBITED_RESPONSE
+)
+async def get_deletion_jobs(
+        job_status: Optional[str] = Query(None, alias="status", description="pending, running or done"),
+        limit: int = Query(100, ge=1, le=1000),
+        admin: User = Depends(require_admin),
+        db: AsyncSession = Depends(get_db)
+) -> List[UserDeletionJobResponse]:
+    """
+    List user deletion jobs.
+
+    Args:
+        job_status: Only jobs with this status
+        limit: Maximum number of jobs
+        admin: Authenticated admin user
+        db: Database session
+
+    Returns:
+        List[UserDeletionJobResponse]: Jobs, newest first
+    """
+    jobs = await UserService.get_deletion_jobs(db, job_status, limit)
+    return [UserDeletionJobResponse.model_validate(job) for job in jobs]
+
+
+@router.get(
+    "/deletions/{job_id}",
+    response_model=UserDeletionJobResponse,
+    summary="Get user deletion progress",
+    description="Status and progress of a background user deletion. Admin only.",
+    responses={
+        404: {"description": "Deletion job not found"},
+        **PROHIBITED_RESPONSE
+    }
+)
+async def get_deletion_job(
+        job_id: int,
+        admin: User = Depends(require_admin),
+        db: AsyncSession = Depends(get_db)
+) -> UserDeletionJobResponse:
+    """
+    Get a user deletion job.
+
+    Args:
+        job_id: ID of the deletion job
+        admin: Authenticated admin user
+        db: Database session
+
+    Returns:
+        UserDeletionJobResponse: Status and progress of the job
+
+    Raises:
+        HTTPException: 404 if the job does not exist
+    """
+    job = await UserService.get_deletion_job(db, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Deletion job with ID {job_id} not found"
+        )
+    return UserDeletionJobResponse.model_validate(job)
+
 
 @router.get(
     "",
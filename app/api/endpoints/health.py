@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Response, status
+
+from app.core.lifecycle import readiness
+from app.schemas.health import LivenessResponse, ReadinessResponse
+
+router = APIRouter(prefix="/health")
+
+
+@router.get(
+    "/live",
+    response_model=LivenessResponse,
+    summary="Liveness probe",
+    description="Answers as soon as the process serves requests.",
+)
+async def live() -> LivenessResponse:
+    """
+    Report that the process is up.
+
+    Returns:
+        LivenessResponse: Status and uptime of the serving process
+    """
+    return LivenessResponse(status="ok", uptime_seconds=round(readiness.uptime(), 3))
+
+
+@router.get(
+    "/ready",
+    response_model=ReadinessResponse,
+    summary="Readiness probe",
+    description="Answers 200 once startup work such as the warm-up has finished, 503 before.",
+    responses={503: {"model": ReadinessResponse, "description": "Not ready yet"}},
+)
+async def ready(response: Response) -> ReadinessResponse:
+    """
+    Report whether the process should receive traffic.
+
+    Args:
+        response: Response whose status code is set to 503 while not ready
+
+    Returns:
+        ReadinessResponse: Readiness and the reasons holding it back
+    """
+    if not readiness.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return ReadinessResponse(ready=readiness.ready, reasons=readiness.reasons)
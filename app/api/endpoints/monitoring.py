@@ -0,0 +1,164 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.db.models import User
+from app.db.pool import pool_metrics
+from app.core.bulkhead import bulkheads
+from app.core.cache import cache, invalidation_listener
+from app.core.config import BULKHEADS_ENABLED, CACHE_ENABLED, SSE_ENABLED, SSE_FANOUT
+from app.core.dependencies import require_admin
+from app.core.events import balance_hub
+from app.core.profiler import profile_store
+from app.schemas.monitoring import (
+    BulkheadStatsResponse,
+    CacheStatsResponse,
+    EventStreamStatsResponse,
+    PoolStatsResponse,
+    RequestProfileSummary,
+)
+
+router = APIRouter(prefix="/admin/monitoring")
+
+
+@router.get(
+    "/pool",
+    response_model=PoolStatsResponse,
+    summary="Get connection pool statistics",
+    description="Checkout latency, usage, overflow and timeouts of this process's pool. Admin only.",
+)
+async def get_pool_stats(
+        admin: User = Depends(require_admin)
+) -> PoolStatsResponse:
+    """
+    Get connection pool statistics of the serving process.
+
+    Args:
+        admin: Authenticated admin user
+
+    Returns:
+        PoolStatsResponse: Current pool counters and checkout wait percentiles
+    """
+    return PoolStatsResponse(**pool_metrics.snapshot())
+
+
+@router.get(
+    "/cache",
+    response_model=CacheStatsResponse,
+    summary="Get cache statistics",
+    description="Hit rate of this process's in-process cache and state of its invalidation listener. Admin only.",
+)
+async def get_cache_stats(
+        admin: User = Depends(require_admin)
+) -> CacheStatsResponse:
+    """
+    Get in-process cache statistics of the serving process.
+
+    Args:
+        admin: Authenticated admin user
+
+    Returns:
+        CacheStatsResponse: Cache counters and invalidation listener state
+    """
+    return CacheStatsResponse(enabled=CACHE_ENABLED, **cache.stats(), **invalidation_listener.stats())
+
+
+@router.get(
+    "/events",
+    response_model=EventStreamStatsResponse,
+    summary="Get balance event stream statistics",
+    description="Open streams and delivered updates of this process's balance event hub. Admin only.",
+)
+async def get_event_stream_stats(
+        admin: User = Depends(require_admin)
+) -> EventStreamStatsResponse:
+    """
+    Get balance event stream statistics of the serving process.
+
+    Args:
+        admin: Authenticated admin user
+
+    Returns:
+        EventStreamStatsResponse: Subscriber counts and delivery counters
+    """
+    return EventStreamStatsResponse(enabled=SSE_ENABLED, fanout=SSE_FANOUT, **balance_hub.stats())
+
+
+@router.get(
+    "/bulkheads",
+    response_model=BulkheadStatsResponse,
+    summary="Get traffic class bulkhead statistics",
+    description="Requests in flight, queue length, queue waits and rejections per traffic class "
+                "(webhooks, user_reads, admin, auth) of this process. Admin only.",
+)
+async def get_bulkhead_stats(
+        admin: User = Depends(require_admin)
+) -> BulkheadStatsResponse:
+    """
+    Get traffic class bulkhead statistics of the serving process.
+
+    Args:
+        admin: Authenticated admin user
+
+    Returns:
+        BulkheadStatsResponse: Shared capacity and per-class counters
+    """
+    return BulkheadStatsResponse(enabled=BULKHEADS_ENABLED, **bulkheads.stats())
+
+
+@router.get(
+    "/profiles",
+    response_model=List[RequestProfileSummary],
+    summary="List request profiles",
+    description="Stored profiles of requests sent with `X-Profile: 1` or sampled by "
+                "REQUEST_PROFILING_SAMPLE_RATE, newest first. Admin only.",
+)
+async def get_request_profiles(
+        admin: User = Depends(require_admin)
+) -> List[RequestProfileSummary]:
+    """
+    List the stored request profiles.
+
+    Args:
+        admin: Authenticated admin user
+
+    Returns:
+        List[RequestProfileSummary]: Profiles without their stacks
+    """
+    return [RequestProfileSummary(**report) for report in await profile_store.summaries()]
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    response_class=PlainTextResponse,
+    summary="Get a request profile",
+    description="Collapsed stacks of a profiled request, one `frame;frame;... count` line per stack, "
+                "for flamegraph.pl, speedscope or inferno. Samples taken while the request waited "
+                "end in `(awaiting)`. Admin only.",
+    responses={404: {"description": "Profile not found"}},
+)
+async def get_request_profile(
+        profile_id: str,
+        admin: User = Depends(require_admin)
+) -> PlainTextResponse:
+    """
+    Get the collapsed stacks of a request profile.
+
+    Args:
+        profile_id: Id from the ``X-Profile-Id`` response header or the profile list
+        admin: Authenticated admin user
+
+    Returns:
+        PlainTextResponse: Collapsed stacks
+
+    Raises:
+        HTTPException: 404 if the profile does not exist
+    """
+    report = await profile_store.get(profile_id)
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {profile_id} not found"
+        )
+    return PlainTextResponse(report["folded"])
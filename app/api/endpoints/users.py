@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
+from app.core.cache import accounts_key, cache_get, cache_set, cache_version
+from app.core.config import SSE_ENABLED
 from app.core.dependencies import get_current_user
-from app.db.models import User, Account, Payment
+from app.core.events import EventStreamResponse, SubscriptionLimitError, balance_hub
+from app.db.models import User
+from app.db.queries import accounts_by_user, payments_by_user
 from app.schemas import UserResponse, AccountResponse, PaymentListResponse, PaymentResponse
 from app.schemas.account import AccountListResponse
 
@@ -24,6 +27,29 @@ UNAUTHORIZED_RESPONSE = {
 router = APIRouter(prefix="/users")
 
 
+async def load_accounts(db: AsyncSession, user_id: int) -> list[AccountResponse]:
+    """
+    Get the accounts of a user, from the in-process cache when possible.
+
+    Args:
+        db: Database session
+        user_id: Owner of the accounts
+
+    Returns:
+        list[AccountResponse]: The user's accounts with their balances
+    """
+    account_responses = cache_get(accounts_key(user_id))
+    if account_responses is None:
+        version = cache_version()
+        await_accounts = await db.execute(accounts_by_user(user_id))
+        accounts = await_accounts.scalars().all()
+
+        account_responses = [AccountResponse.model_validate(account) for account in accounts]
+        cache_set(accounts_key(user_id), account_responses, version)
+
+    return account_responses
+
+
 @router.get(
     "/me",
     response_model=UserResponse,
@@ -69,12 +95,65 @@ async def ger_users_accounts(
     Returns:
         AccountListResponse: List of current user's accounts
     """
-    await_accounts = await db.execute(select(Account).where(Account.user_id == current_user.id))
-    accounts = await_accounts.scalars().all()
+    return AccountListResponse(accounts=await load_accounts(db, current_user.id))
+
+
+@router.get(
+    "/accounts/events",
+    response_class=Response,
+    summary="Stream balance changes of current user's accounts",
+    description=(
+        "Server-Sent Events stream. The first `accounts` event carries the current accounts "
+        "(same data as `/users/accounts`), then a `balance` event `{\"account_id\", \"balance\"}` "
+        "follows every committed change. Idle streams receive a `: ping` comment line."
+    ),
+    responses={
+        **UNAUTHORIZED_RESPONSE,
+        200: {"content": {"text/event-stream": {}}, "description": "Event stream"},
+        429: {"description": "Too many open streams of this user"},
+        503: {"description": "Too many open streams on this server, or streams are disabled"},
+    },
+)
+async def stream_account_events(
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+) -> EventStreamResponse:
+    """
+    Open a stream of balance changes of current user's accounts.
 
-    account_responses = [AccountResponse.model_validate(account) for account in accounts]
+    Dependencies are closed before the response streams, so an open stream
+    holds no database session.
 
-    return AccountListResponse(accounts=account_responses)
+    Args:
+        current_user: The currently authenticated user from JWT token
+        db: Database session, used for the initial snapshot only
+
+    Returns:
+        EventStreamResponse: The event stream
+
+    Raises:
+        HTTPException: 429 if the user has too many open streams, 503 if the
+            server is full or streams are disabled
+    """
+    if not SSE_ENABLED:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Event streams are disabled")
+    try:
+        subscription = balance_hub.subscribe(current_user.id)
+    except SubscriptionLimitError as e:
+        if e.per_user:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"}
+        )
+
+    # Subscribed first: a change committed while the snapshot loads is sent after it
+    try:
+        accounts = await load_accounts(db, current_user.id)
+    except Exception:
+        balance_hub.unsubscribe(subscription)
+        raise
+    subscription.seed({account.id: account.balance_version for account in accounts})
+    return EventStreamResponse(balance_hub, subscription, AccountListResponse(accounts=accounts))
 
 
 @router.get(
@@ -99,7 +178,7 @@ async def ger_users_payments(
     Returns:
         PaymentListResponse: List of current user's payments
     """
-    await_payments = await db.execute(select(Payment).where(Payment.user_id == current_user.id))
+    await_payments = await db.execute(payments_by_user(current_user.id))
     payments = await_payments.scalars().all()
 
     payment_responses = [PaymentResponse.model_validate(payment) for payment in payments]
@@ -0,0 +1,247 @@
+"""
+Bulkheads: concurrency limits per traffic class.
+
+Every request of a class holds at most one pool connection, so limiting the
+requests in flight per class limits the connections it can take. The
+classes share the worker's pool capacity, except for a reserve that only
+the priority class (webhooks) may use: a flood of admin listings or
+payment-history reads then waits in its own queue, without connections,
+while webhooks still find free ones.
+
+A request that finds its class full waits in the class's FIFO queue, for at
+most ``queue_timeout`` and behind at most ``queue_size`` others; otherwise
+``BulkheadMiddleware`` answers 503. Freed slots go to queued requests of
+the priority class first, then to the request that has waited longest.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from app.core.config import (
+    BULKHEAD_ADMIN_LIMIT,
+    BULKHEAD_AUTH_LIMIT,
+    BULKHEAD_QUEUE_SIZE,
+    BULKHEAD_QUEUE_TIMEOUT_MS,
+    BULKHEAD_USER_READS_LIMIT,
+    BULKHEAD_WEBHOOK_RESERVED_SHARE,
+)
+from app.core.stats import percentile
+from app.db.session import MAX_OVERFLOW, POOL_SIZE
+
+WEBHOOKS = "webhooks"
+
+# Path prefix -> traffic class, first match wins
+ROUTES = (
+    ("/api/webhooks", WEBHOOKS),
+    ("/api/users", "user_reads"),
+    ("/api/admin", "admin"),
+    ("/api/auth", "auth"),
+)
+# Never limited: probes, monitoring during an overload, and event streams,
+# which hold no connection while open (SSE_MAX_CONNECTIONS caps them)
+EXEMPT_PREFIXES = ("/api/health", "/api/admin/monitoring", "/api/users/accounts/events")
+
+
+class BulkheadFull(Exception):
+    """Raised when a request can't get a slot of its class."""
+
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"Bulkhead {name} is full ({reason})")
+        self.name = name
+        self.reason = reason
+
+
+class Bulkhead:
+    """
+    Slots and queue of one traffic class.
+
+    Args:
+        name: Traffic class
+        limit: Requests of the class in flight at once; 0 leaves only the shared capacity
+        queue_size: Requests waiting at once; more are rejected
+        priority: The class may use the reserved capacity and is served first
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, priority: bool = False, window: int = 2048):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.priority = priority
+        self.active = 0
+        self.peak_active = 0
+        self.peak_queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # (queued at, future) per waiting request, oldest first
+        self.waiters: deque[tuple[float, asyncio.Future]] = deque()
+        self._waits = deque(maxlen=window)
+
+    def admit(self, wait: float) -> None:
+        self.active += 1
+        self.admitted += 1
+        self.peak_active = max(self.peak_active, self.active)
+        self._waits.append(wait)
+
+    def stats(self) -> dict:
+        """Return current counters and queue wait percentiles (milliseconds) of admitted requests."""
+        waits = list(self._waits)
+        return {
+            "name": self.name,
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "peak_active": self.peak_active,
+            "peak_queued": self.peak_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_p50_ms": round(percentile(waits, 50) * 1000, 3),
+            "wait_p95_ms": round(percentile(waits, 95) * 1000, 3),
+            "wait_max_ms": round(max(waits, default=0.0) * 1000, 3),
+        }
+
+
+class Bulkheads:
+    """
+    Traffic classes sharing the capacity of one worker.
+
+    Args:
+        capacity: Requests of all classes in flight at once, the pool's connections
+        reserved: Part of ``capacity`` only the priority class may use
+        bulkheads: The traffic classes
+        queue_timeout: Seconds a request waits for a slot
+        routes: ``(path prefix, class)`` pairs, first match wins
+        exempt_prefixes: Paths that are never limited
+    """
+
+    def __init__(
+            self,
+            capacity: int,
+            reserved: int,
+            bulkheads: list[Bulkhead],
+            queue_timeout: float,
+            routes: tuple[tuple[str, str], ...] = ROUTES,
+            exempt_prefixes: tuple[str, ...] = EXEMPT_PREFIXES,
+    ):
+        self.capacity = capacity
+        self.reserved = reserved
+        self.queue_timeout = queue_timeout
+        self.bulkheads = {bulkhead.name: bulkhead for bulkhead in bulkheads}
+        self.routes = routes
+        self.exempt_prefixes = exempt_prefixes
+        self.active = 0
+        # Requests in flight outside the priority class
+        self.shared_active = 0
+
+    def classify(self, path: str) -> Optional[Bulkhead]:
+        """Return the bulkhead of a request path, or None if it isn't limited."""
+        if path.startswith(self.exempt_prefixes):
+            return None
+        for prefix, name in self.routes:
+            if path.startswith(prefix):
+                return self.bulkheads[name]
+        return None
+
+    async def acquire(self, bulkhead: Bulkhead) -> None:
+        """
+        Take a slot of ``bulkhead``, waiting in its queue if needed.
+
+        Raises:
+            BulkheadFull: If the queue is full or the wait timed out
+        """
+        if not bulkhead.waiters and self._has_room(bulkhead):
+            self._admit(bulkhead, 0.0)
+            return
+        if len(bulkhead.waiters) >= bulkhead.queue_size:
+            bulkhead.rejected += 1
+            raise BulkheadFull(bulkhead.name, "queue full")
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (time.perf_counter(), future)
+        bulkhead.waiters.append(waiter)
+        bulkhead.peak_queued = max(bulkhead.peak_queued, len(bulkhead.waiters))
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Admitted as the wait ended
+                if isinstance(e, asyncio.TimeoutError):
+                    return
+                self.release(bulkhead)
+                raise
+            # Gone already if a release skipped the cancelled future
+            if waiter in bulkhead.waiters:
+                bulkhead.waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            bulkhead.timed_out += 1
+            raise BulkheadFull(bulkhead.name, "queue timeout") from None
+
+    def release(self, bulkhead: Bulkhead) -> None:
+        """Free a slot of ``bulkhead`` and hand the free capacity to queued requests."""
+        bulkhead.active -= 1
+        self.active -= 1
+        if not bulkhead.priority:
+            self.shared_active -= 1
+        self._dispatch()
+
+    def _has_room(self, bulkhead: Bulkhead) -> bool:
+        if bulkhead.limit and bulkhead.active >= bulkhead.limit:
+            return False
+        if self.active >= self.capacity:
+            return False
+        return bulkhead.priority or self.shared_active < self.capacity - self.reserved
+
+    def _admit(self, bulkhead: Bulkhead, wait: float) -> None:
+        bulkhead.admit(wait)
+        self.active += 1
+        if not bulkhead.priority:
+            self.shared_active += 1
+
+    def _dispatch(self) -> None:
+        now = time.perf_counter()
+        while True:
+            ready = [b for b in self.bulkheads.values() if b.waiters and self._has_room(b)]
+            if not ready:
+                return
+            bulkhead = min(ready, key=lambda b: (not b.priority, b.waiters[0][0]))
+            queued_at, future = bulkhead.waiters.popleft()
+            if future.done():
+                # Timed out or cancelled, its request hasn't resumed yet
+                continue
+            self._admit(bulkhead, now - queued_at)
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "reserved": self.reserved,
+            "active": self.active,
+            "shared_active": self.shared_active,
+            "queue_timeout_ms": self.queue_timeout * 1000,
+            "classes": [bulkhead.stats() for bulkhead in self.bulkheads.values()],
+        }
+
+
+def build_bulkheads(capacity: int) -> Bulkheads:
+    """Bulkheads of the configured classes for a worker whose pool holds ``capacity`` connections."""
+    # At least one connection for webhooks and one for everything else
+    reserved = min(max(1, math.ceil(capacity * BULKHEAD_WEBHOOK_RESERVED_SHARE)), capacity - 1) if capacity > 1 else 0
+    return Bulkheads(
+        capacity=capacity,
+        reserved=reserved,
+        bulkheads=[
+            Bulkhead(WEBHOOKS, 0, BULKHEAD_QUEUE_SIZE, priority=True),
+            Bulkhead("user_reads", BULKHEAD_USER_READS_LIMIT, BULKHEAD_QUEUE_SIZE),
+            Bulkhead("admin", BULKHEAD_ADMIN_LIMIT, BULKHEAD_QUEUE_SIZE),
+            Bulkhead("auth", BULKHEAD_AUTH_LIMIT, BULKHEAD_QUEUE_SIZE),
+        ],
+        queue_timeout=BULKHEAD_QUEUE_TIMEOUT_MS / 1000,
+    )
+
+
+bulkheads = build_bulkheads(POOL_SIZE + MAX_OVERFLOW)
@@ -0,0 +1,285 @@
+"""
+In-process cache with cross-worker invalidation over Postgres LISTEN/NOTIFY.
+
+Write paths call ``publish_invalidation`` inside their transaction. The keys
+are attached to the session and handed to ``invalidation_publisher`` only
+when the session commits; a rollback drops them. The publisher coalesces the
+keys of all commits within ``CACHE_INVALIDATION_BATCH_MS`` into one
+``pg_notify`` (see ``app.db.listener.NotifyPublisher``).
+
+Each worker's ``invalidation_listener`` evicts the received keys in batches
+as well. After a listener reconnect the whole cache is cleared, because
+notifications sent in the meantime were lost. ``CACHE_TTL_SECONDS`` bounds
+staleness from writes that bypass the services, or from a process dying
+between commit and publish.
+
+A read that misses takes ``cache_version()`` before it loads from the
+database and passes it to ``cache_set``. If the key was evicted in between,
+the loaded value may predate the write and is not cached, so an
+invalidation that overtakes a slow read can't be undone by it.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    CACHE_ENABLED,
+    CACHE_TTL_SECONDS,
+    CACHE_MAX_ENTRIES,
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_INVALIDATION_BATCH_MS,
+    CACHE_INVALIDATION_MAX_BATCH,
+)
+from app.db.listener import NotifyPublisher, PgListener, pg_listener
+
+logger = logging.getLogger(__name__)
+
+# Payload that clears every worker's cache; also used when the key list
+# would not fit into a notification (8000 bytes).
+EVICT_ALL = "*"
+MAX_PAYLOAD_BYTES = 7000
+SESSION_KEYS = "cache_invalidation_keys"
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def accounts_key(user_id: int) -> str:
+    return f"accounts:{user_id}"
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    Args:
+        ttl: Entry lifetime in seconds
+        max_entries: Least recently used entries are dropped beyond this size
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.clears = 0
+        self.stale_sets = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        # Eviction sequence: bumped by every evict and clear. Sets of values
+        # loaded before the last eviction of their key are dropped.
+        self.version = 0
+        self._evicted_at: OrderedDict[str, int] = OrderedDict()
+        # Last clear, or the newest eviction forgotten to bound _evicted_at
+        self._floor = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any, version: Optional[int] = None) -> None:
+        """
+        Store ``value``, unless ``key`` was evicted after ``version`` was taken.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            version: ``self.version`` from before the value was loaded; None stores unconditionally
+        """
+        if version is not None and (version < self._floor or self._evicted_at.get(key, 0) > version):
+            self.stale_sets += 1
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def evict(self, keys: Iterable[str]) -> None:
+        self.version += 1
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                self.evictions += 1
+            self._evicted_at[key] = self.version
+            self._evicted_at.move_to_end(key)
+        while len(self._evicted_at) > self.max_entries:
+            _, self._floor = self._evicted_at.popitem(last=False)
+
+    def clear(self) -> None:
+        self.version += 1
+        self._floor = self.version
+        self._evicted_at.clear()
+        self._entries.clear()
+        self.clears += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "clears": self.clears,
+            "stale_sets": self.stale_sets,
+        }
+
+
+class InvalidationListener:
+    """
+    Applies invalidation notifications to ``cache`` in batches.
+
+    Keys received within ``batch_ms`` are evicted together. A batch larger
+    than ``max_batch`` keys clears the whole cache instead.
+
+    Args:
+        cache: Cache to evict from
+        channel: Notification channel
+        batch_ms: Collection window in milliseconds
+        max_batch: Keys per batch before falling back to a full clear
+        listener: LISTEN connection to subscribe the channel on
+    """
+
+    def __init__(self, cache: TTLCache, channel: str, batch_ms: float, max_batch: int, listener: PgListener):
+        self.cache = cache
+        self.channel = channel
+        self.batch_delay = batch_ms / 1000
+        self.max_batch = max_batch
+        self.notifications = 0
+        self.batches = 0
+        self._pending: set[str] = set()
+        self._evict_all = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.listener = listener
+
+    def receive(self, payload: str) -> None:
+        self.notifications += 1
+        if payload == EVICT_ALL:
+            self._evict_all = True
+        else:
+            self._pending.update(json.loads(payload))
+
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_delay, self.flush)
+
+    def flush(self) -> None:
+        self._flush_handle = None
+        self.batches += 1
+        if self._evict_all or len(self._pending) > self.max_batch:
+            self.cache.clear()
+        else:
+            self.cache.evict(self._pending)
+        self._pending.clear()
+        self._evict_all = False
+
+    def resync(self) -> None:
+        """Anything published while not listening is lost, so drop everything."""
+        self.cache.clear()
+
+    def start(self) -> None:
+        """Subscribe the channel; the listener itself is started by the application."""
+        self.listener.subscribe(self.channel, self.receive, on_connect=self.resync)
+
+    async def stop(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def stats(self) -> dict:
+        return {
+            "listening": self.listener.running,
+            "connects": self.listener.connects,
+            "notifications": self.notifications,
+            "batches": self.batches,
+        }
+
+
+def encode_invalidation(keys: list[str]) -> str:
+    payload = json.dumps(keys)
+    return EVICT_ALL if len(payload.encode()) > MAX_PAYLOAD_BYTES else payload
+
+
+cache = TTLCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+invalidation_listener = InvalidationListener(
+    cache, CACHE_INVALIDATION_CHANNEL, CACHE_INVALIDATION_BATCH_MS, CACHE_INVALIDATION_MAX_BATCH, pg_listener
+)
+invalidation_publisher = NotifyPublisher(
+    CACHE_INVALIDATION_CHANNEL, CACHE_INVALIDATION_BATCH_MS, encode_invalidation
+)
+
+
+def snapshot(instance: Any) -> Any:
+    """
+    Copy the column attributes of an ORM instance into a new transient instance.
+
+    Cached objects are shared by concurrent requests, so they must not belong
+    to any session. A rollback there would expire them, and a lazy load would
+    need that session's connection.
+    """
+    mapper = inspect(instance).mapper
+    return mapper.class_(**{attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs})
+
+
+def cache_get(key: str) -> Optional[Any]:
+    return cache.get(key) if CACHE_ENABLED else None
+
+
+def cache_version() -> int:
+    """Version to pass to ``cache_set``; take it before loading the value."""
+    return cache.version
+
+
+def cache_set(key: str, value: Any, version: int) -> None:
+    if CACHE_ENABLED:
+        cache.set(key, value, version)
+
+
+def publish_invalidation(db: AsyncSession, keys: Iterable[str]) -> None:
+    """
+    Evict ``keys`` in every worker once the current transaction commits.
+
+    The keys are also evicted locally right away. The notification evicts
+    them again after commit; a concurrent read that loaded the old value
+    before either eviction does not cache it (see ``TTLCache.set``).
+
+    Args:
+        db: Session whose transaction carries the change
+        keys: Cache keys affected by the change
+    """
+    if not CACHE_ENABLED:
+        return
+    keys = set(keys)
+    cache.evict(keys)
+    db.sync_session.info.setdefault(SESSION_KEYS, set()).update(keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    # Also fired when a savepoint is released; the keys wait for the real commit
+    if session.in_nested_transaction():
+        return
+    keys = session.info.pop(SESSION_KEYS, None)
+    if keys:
+        invalidation_publisher.enqueue(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    # A rolled back savepoint keeps the keys of the enclosing transaction; evicting a few more is harmless
+    if not session.in_nested_transaction():
+        session.info.pop(SESSION_KEYS, None)
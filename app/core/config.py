@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -9,4 +10,153 @@ load_dotenv()
 
 WEBHOOK_SECRET_KEY = os.getenv("WEBHOOK_SECRET_KEY")
 
-DATABASE_URL = os.getenv("DATABASE_URL")
\ No newline at end of file
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+ENVIRONMENT = os.getenv("ENVIRONMENT", "production")
+# Startup compares the alembic_version row with the migration heads.
+# "upgrade": run alembic upgrade when behind, "fail": refuse to start,
+# "warn": log and start anyway, "off": skip the check.
+SCHEMA_REVISION_CHECK = os.getenv(
+    "SCHEMA_REVISION_CHECK", "upgrade" if ENVIRONMENT == "development" else "warn"
+)
+
+# "lazy": read-only requests run on autocommit connections (no BEGIN/COMMIT),
+# write requests commit only if a transaction was actually started.
+# "transactional": every request gets a commit-on-success session.
+DB_SESSION_MODE = os.getenv("DB_SESSION_MODE", "lazy")
+
+DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "pay_flow")
+# Worker processes of the gunicorn run mode (see gunicorn.conf.py). When
+# DB_CONNECTION_BUDGET is set, it caps the connections of all workers
+# together, and each worker's pool is sized from its share.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "0"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+# "always": ping on every checkout, "idle": ping only connections that sat in
+# the pool longer than DB_POOL_PRE_PING_IDLE_SECONDS, "off": never ping.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "idle")
+DB_POOL_PRE_PING_IDLE_SECONDS = float(os.getenv("DB_POOL_PRE_PING_IDLE_SECONDS", "30"))
+# SQLAlchemy compiled-statement cache (per engine) and asyncpg prepared
+# statement cache (per connection).
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "500"))
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "256"))
+
+# Per-request SQL profiling: statement count, database time and the slowest
+# statement of each request (debug log, Server-Timing header if
+# SQL_SERVER_TIMING). Statements running SQL_SLOW_QUERY_MS or longer are
+# logged with a warning (0: off). A statement executed more than
+# SQL_REPEAT_WARN_THRESHOLD times in one request is reported as a likely N+1
+# query (0: off, the default outside development).
+SQL_PROFILING_ENABLED = os.getenv("SQL_PROFILING_ENABLED", "true").lower() == "true"
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "500"))
+SQL_REPEAT_WARN_THRESHOLD = int(
+    os.getenv("SQL_REPEAT_WARN_THRESHOLD", "10" if ENVIRONMENT == "development" else "0")
+)
+SQL_SERVER_TIMING = os.getenv(
+    "SQL_SERVER_TIMING", "true" if ENVIRONMENT == "development" else "false"
+).lower() == "true"
+
+# On-demand profiling of single requests: a request with "X-Profile: 1" and
+# an admin's bearer token, or a random REQUEST_PROFILING_SAMPLE_RATE share of
+# all requests, is sampled every REQUEST_PROFILING_INTERVAL_MS. The newest
+# REQUEST_PROFILING_KEEP reports are kept in REQUEST_PROFILING_DIR (shared by
+# the workers) and served under /api/admin/monitoring/profiles.
+REQUEST_PROFILING_ENABLED = os.getenv("REQUEST_PROFILING_ENABLED", "true").lower() == "true"
+REQUEST_PROFILING_SAMPLE_RATE = float(os.getenv("REQUEST_PROFILING_SAMPLE_RATE", "0"))
+REQUEST_PROFILING_INTERVAL_MS = float(os.getenv("REQUEST_PROFILING_INTERVAL_MS", "2"))
+REQUEST_PROFILING_DIR = os.getenv("REQUEST_PROFILING_DIR", os.path.join(tempfile.gettempdir(), "pay_flow_profiles"))
+REQUEST_PROFILING_KEEP = int(os.getenv("REQUEST_PROFILING_KEEP", "100"))
+
+# Bulkheads: per-class limits of the requests in flight (webhooks, user
+# reads, admin, auth), so a flood of one class can't take every pool
+# connection of a worker. The classes share the pool's capacity (pool size
+# plus overflow), but BULKHEAD_WEBHOOK_RESERVED_SHARE of it is left to
+# webhooks. BULKHEAD_<CLASS>_LIMIT caps a class further (0: no own cap). A
+# request waits up to BULKHEAD_QUEUE_TIMEOUT_MS for a slot, behind at most
+# BULKHEAD_QUEUE_SIZE others of its class; otherwise it gets 503.
+BULKHEADS_ENABLED = os.getenv("BULKHEADS_ENABLED", "true").lower() == "true"
+BULKHEAD_WEBHOOK_RESERVED_SHARE = float(os.getenv("BULKHEAD_WEBHOOK_RESERVED_SHARE", "0.25"))
+BULKHEAD_USER_READS_LIMIT = int(os.getenv("BULKHEAD_USER_READS_LIMIT", "0"))
+BULKHEAD_ADMIN_LIMIT = int(os.getenv("BULKHEAD_ADMIN_LIMIT", "4"))
+BULKHEAD_AUTH_LIMIT = int(os.getenv("BULKHEAD_AUTH_LIMIT", "4"))
+BULKHEAD_QUEUE_SIZE = int(os.getenv("BULKHEAD_QUEUE_SIZE", "100"))
+BULKHEAD_QUEUE_TIMEOUT_MS = float(os.getenv("BULKHEAD_QUEUE_TIMEOUT_MS", "5000"))
+
+# Monthly partitions of ``payments`` are created ahead of time on startup
+# and by ``python -m scripts.payment_partitions ensure``.
+PAYMENTS_PARTITIONS_AUTOCREATE = os.getenv("PAYMENTS_PARTITIONS_AUTOCREATE", "true").lower() == "true"
+PAYMENTS_PARTITIONS_MONTHS_AHEAD = int(os.getenv("PAYMENTS_PARTITIONS_MONTHS_AHEAD", "3"))
+PAYMENTS_ARCHIVE_SCHEMA = os.getenv("PAYMENTS_ARCHIVE_SCHEMA", "archive")
+
+# In-process TTL cache of users and account lists. Writes publish the
+# affected keys with pg_notify, every worker evicts them on commit.
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache_invalidation")
+# Notifications are collected for this long and evicted together; a batch
+# with more keys than CACHE_INVALIDATION_MAX_BATCH clears the whole cache.
+CACHE_INVALIDATION_BATCH_MS = float(os.getenv("CACHE_INVALIDATION_BATCH_MS", "20"))
+CACHE_INVALIDATION_MAX_BATCH = int(os.getenv("CACHE_INVALIDATION_MAX_BATCH", "1000"))
+
+# Warm-up after startup: open WARMUP_CONNECTIONS pool connections, prepare
+# the hot statements on each of them and run the response models once.
+# /api/health/ready answers 503 until it has finished.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+
+# SIGTERM puts the process into drain mode: readiness fails, new requests get
+# 503 and in-flight ones get this long to finish before the server shuts
+# down. Keep it below gunicorn's GRACEFUL_TIMEOUT.
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "20"))
+
+# Payment events are written to payment_outbox with each payment. Committed
+# writes wake the relay with one pg_notify per OUTBOX_NOTIFY_BATCH_MS.
+OUTBOX_CHANNEL = os.getenv("OUTBOX_CHANNEL", "payment_outbox")
+OUTBOX_NOTIFY_BATCH_MS = float(os.getenv("OUTBOX_NOTIFY_BATCH_MS", "10"))
+
+# Live balance updates at /api/users/accounts/events (Server-Sent Events).
+# "local": committed updates go straight to this process's streams, "notify":
+# they are sent with pg_notify on SSE_CHANNEL and every worker delivers them
+# to its own streams. Needed with several workers or replicas.
+SSE_ENABLED = os.getenv("SSE_ENABLED", "true").lower() == "true"
+SSE_FANOUT = os.getenv("SSE_FANOUT", "notify" if WEB_CONCURRENCY > 1 else "local")
+SSE_CHANNEL = os.getenv("SSE_CHANNEL", "balance_updates")
+SSE_NOTIFY_BATCH_MS = float(os.getenv("SSE_NOTIFY_BATCH_MS", "10"))
+# Open streams per process and per user; more get 503 and 429.
+SSE_MAX_CONNECTIONS = int(os.getenv("SSE_MAX_CONNECTIONS", "10000"))
+SSE_MAX_CONNECTIONS_PER_USER = int(os.getenv("SSE_MAX_CONNECTIONS_PER_USER", "5"))
+# An idle stream gets a comment line this often, which keeps proxies from
+# timing it out and detects clients that went away.
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+# Threads per worker process that hash passwords for the admin user
+# endpoints; bulk creation hashes up to USERS_BULK_MAX_ITEMS per request.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY))))
+USERS_BULK_MAX_ITEMS = int(os.getenv("USERS_BULK_MAX_ITEMS", "1000"))
+
+# CSV import and export of users (admin). Imported rows are validated and
+# inserted in chunks; the export streams rows from a server-side cursor.
+USERS_IMPORT_CHUNK_ROWS = int(os.getenv("USERS_IMPORT_CHUNK_ROWS", "500"))
+USERS_IMPORT_MAX_ERRORS = int(os.getenv("USERS_IMPORT_MAX_ERRORS", "1000"))
+USERS_IMPORT_MAX_RECORD_LENGTH = int(os.getenv("USERS_IMPORT_MAX_RECORD_LENGTH", "65536"))
+USERS_EXPORT_BATCH_ROWS = int(os.getenv("USERS_EXPORT_BATCH_ROWS", "1000"))
+
+# How DELETE /admin/users/{id} deletes: "sync" deletes everything in the
+# request (204); "job" (opt-in) marks the user deleted and removes payments
+# links, accounts and the user in the background in batches of
+# USER_DELETION_BATCH_ROWS rows (202 with the job).
+USER_DELETION_MODE = os.getenv("USER_DELETION_MODE", "sync")
+# Runs deletion jobs in this process; every worker polls for open jobs
+USER_DELETION_WORKER_ENABLED = os.getenv("USER_DELETION_WORKER_ENABLED", "true").lower() == "true"
+USER_DELETION_BATCH_ROWS = int(os.getenv("USER_DELETION_BATCH_ROWS", "5000"))
+# Pause between batches, leaves room for the webhook traffic
+USER_DELETION_BATCH_PAUSE_MS = int(os.getenv("USER_DELETION_BATCH_PAUSE_MS", "50"))
+USER_DELETION_POLL_SECONDS = float(os.getenv("USER_DELETION_POLL_SECONDS", "5"))
+# A job is taken over by another worker when its worker shows no progress for this long
+USER_DELETION_LEASE_SECONDS = int(os.getenv("USER_DELETION_LEASE_SECONDS", "60"))
@@ -0,0 +1,91 @@
+"""
+Incremental CSV reading and writing for the admin import and export.
+
+``read_csv_records`` turns a stream of byte chunks into CSV records without
+holding more than one record in memory. Lines are collected until their
+quote count is even: quotes inside quoted fields are doubled, so an odd count
+means a quoted field continues on the next line. Only then is the record
+handed to ``csv.reader``.
+"""
+import codecs
+import csv
+import io
+from typing import AsyncIterator, Iterable
+
+
+class CsvFormatError(ValueError):
+    """Raised when the upload is not valid UTF-8 CSV."""
+
+
+async def read_csv_records(
+        chunks: AsyncIterator[bytes],
+        max_record_length: int,
+) -> AsyncIterator[tuple[int, list[str]]]:
+    """
+    Parse CSV records from a stream of UTF-8 chunks as they arrive.
+
+    Args:
+        chunks: Raw upload, e.g. ``request.stream()``
+        max_record_length: Longest record accepted, bounds the memory of an unterminated quote
+
+    Yields:
+        tuple[int, list[str]]: Line number the record starts on and its fields; blank lines are skipped
+
+    Raises:
+        CsvFormatError: On invalid UTF-8, an unterminated quoted field or a record over the limit
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    record: list[str] = []
+    record_size = 0
+    quotes = 0
+    line_number = 0
+    record_line = 1
+    finished = False
+
+    while not finished:
+        try:
+            chunk = await anext(chunks)
+            text = pending + decoder.decode(chunk)
+            *lines, pending = text.split("\n")
+            lines = [line + "\n" for line in lines]
+        except StopAsyncIteration:
+            text = pending + decoder.decode(b"", final=True)
+            lines = [text] if text else []
+            finished = True
+        except UnicodeDecodeError as e:
+            raise CsvFormatError(f"Upload is not valid UTF-8 near line {line_number + 1}: {e.reason}")
+
+        for line in lines:
+            line_number += 1
+            if not record:
+                record_line = line_number
+            record.append(line)
+            record_size += len(line)
+            quotes += line.count('"')
+            if quotes % 2:
+                if record_size > max_record_length:
+                    raise CsvFormatError(
+                        f"Record starting at line {record_line} is longer than {max_record_length} characters"
+                    )
+                continue
+            try:
+                fields = next(csv.reader(["".join(record)], strict=True), [])
+            except csv.Error as e:
+                raise CsvFormatError(f"Invalid CSV in record starting at line {record_line}: {e}")
+            record, record_size, quotes = [], 0, 0
+            if fields:
+                yield record_line, fields
+
+        if len(pending) > max_record_length:
+            raise CsvFormatError(f"Line {line_number + 1} is longer than {max_record_length} characters")
+
+    if record:
+        raise CsvFormatError(f"Unterminated quoted field in record starting at line {record_line}")
+
+
+def format_csv_rows(rows: Iterable[Iterable]) -> str:
+    """Render rows as CSV text with ``\\r\\n`` line endings."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
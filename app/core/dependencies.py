@@ -1,11 +1,15 @@
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.core.cache import cache_get, cache_set, cache_version, snapshot, user_key
+from app.db.session import AsyncSessionLocal, get_db
 from app.db.models.user import User, UserRole
+from app.db.queries import user_by_id
 from app.core.security import SECRET_KEY, ALGORITHM
 from app.schemas import TokenData
 
@@ -37,6 +41,9 @@ async def get_current_user(
     """
     Dependency to get current authenticated user from validated token data.
 
+    The user is served from the in-process cache when possible. The cached
+    copy is detached from any session.
+
     Args:
         token_data: standardized payload data
         db: Database session
@@ -47,20 +54,25 @@ async def get_current_user(
     Raises:
         HTTPException: 401 if user not found
     """
-    from sqlalchemy import select
-
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="User not found",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    result = await db.execute(select(User).where(User.id == int(token_data.sub)))
+    user_id = int(token_data.sub)
+    user = cache_get(user_key(user_id))
+    if user is not None:
+        return user
+
+    version = cache_version()
+    result = await db.execute(user_by_id(user_id))
     user = result.scalar_one_or_none()
 
     if user is None:
         raise credentials_exception
 
+    cache_set(user_key(user_id), snapshot(user), version)
     return user
 
 
@@ -86,3 +98,23 @@ async def require_admin(
         )
 
     return current_user
+
+
+async def admin_from_token(token: str) -> Optional[User]:
+    """
+    Resolve a bearer token to an admin outside of dependency injection, e.g. in middleware.
+
+    Runs the same checks as ``require_admin``.
+
+    Args:
+        token: Bearer token without the ``Bearer`` prefix
+
+    Returns:
+        Optional[User]: The admin, None if the token is invalid or does not belong to an admin
+    """
+    try:
+        token_data = await validate_token(token)
+        async with AsyncSessionLocal() as db:
+            return await require_admin(await get_current_user(token_data, db))
+    except HTTPException:
+        return None
@@ -0,0 +1,380 @@
+"""
+Live balance updates for the account event stream.
+
+The webhook calls ``publish_balance`` inside its transaction. The update is
+attached to the session and fanned out only when the session commits; a
+rollback drops it.
+
+``balance_hub`` holds the open streams of this process. With
+``SSE_FANOUT=local`` committed updates go to it directly. With several
+workers (``notify``) the client may be connected to any of them, so updates
+are sent by ``balance_publisher`` with ``pg_notify`` and every worker's hub
+receives them on the shared LISTEN connection. Notifications sent while
+that connection was down are lost, so after a reconnect all streams are
+closed; clients reconnect and start from a fresh snapshot.
+
+A subscription keeps only the latest unsent balance per account. A slow
+client skips intermediate balances instead of buffering them. Updates of
+one account can arrive out of order (separate notifications of one worker
+are sent over separate connections, and workers notify independently), so
+every update carries the account's ``balance_version`` and a subscription
+drops updates not newer than the balance it already holds, including the
+one of the initial snapshot. Heartbeats of
+idle streams come from one ticker task of the hub, so an idle stream has no
+timer of its own.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import (
+    SSE_CHANNEL,
+    SSE_ENABLED,
+    SSE_FANOUT,
+    SSE_HEARTBEAT_SECONDS,
+    SSE_MAX_CONNECTIONS,
+    SSE_MAX_CONNECTIONS_PER_USER,
+    SSE_NOTIFY_BATCH_MS,
+    SSE_RETRY_MS,
+)
+from app.core.money import from_minor_units
+from app.db.listener import NotifyPublisher, PgListener
+from app.schemas.account import AccountListResponse, BalanceEvent
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = "balance_updates"
+# "user:account:version:balance" items stay below 60 bytes, well within
+# the 8000-byte notification payload
+NOTIFY_MAX_ITEMS = 120
+HEARTBEAT = b": ping\n\n"
+
+
+class SubscriptionLimitError(Exception):
+    """
+    Raised when a stream cannot be opened.
+
+    Args:
+        message: Reason for the client
+        per_user: True if the user's limit was hit, False for the process limit
+    """
+
+    def __init__(self, message: str, per_user: bool):
+        super().__init__(message)
+        self.per_user = per_user
+
+
+class Subscription:
+    """Latest unsent balance per account of one open stream."""
+
+    # One instance per open stream
+    __slots__ = ("user_id", "pending", "versions", "closed", "active_at", "_wake")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        # account id -> (version, balance in minor units)
+        self.pending: dict[int, tuple[int, int]] = {}
+        # account id -> newest version sent or pending
+        self.versions: dict[int, int] = {}
+        self.closed = False
+        self.active_at = time.monotonic()
+        self._wake = asyncio.Event()
+
+    def push(self, account_id: int, version: int, balance_minor: int) -> bool:
+        """
+        Queue a balance unless the stream already holds a newer one of the account.
+
+        Returns:
+            bool: False if the update was stale and dropped
+        """
+        if version <= self.versions.get(account_id, -1):
+            return False
+        self.versions[account_id] = version
+        self.pending[account_id] = (version, balance_minor)
+        self._wake.set()
+        return True
+
+    def seed(self, versions: dict[int, int]) -> None:
+        """
+        Hold the balance versions of the snapshot sent first; older updates are dropped.
+
+        Args:
+            versions: Balance version per account id
+        """
+        for account_id, version in versions.items():
+            if version >= self.versions.get(account_id, -1):
+                self.versions[account_id] = version
+                self.pending.pop(account_id, None)
+
+    def ping(self) -> None:
+        """Wake the stream without updates, so it sends a heartbeat."""
+        self._wake.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake.set()
+
+    async def next_updates(self) -> dict[int, tuple[int, int]]:
+        """
+        Wait for updates and take them.
+
+        Returns:
+            dict[int, tuple[int, int]]: Balance version and balance in minor units per account id,
+                empty on a ping or close
+        """
+        await self._wake.wait()
+        self._wake.clear()
+        self.active_at = time.monotonic()
+        updates, self.pending = self.pending, {}
+        return updates
+
+
+class BalanceHub:
+    """
+    Fans balance updates out to the open streams of this process.
+
+    Args:
+        max_subscribers: Open streams per process
+        max_per_user: Open streams per user
+        heartbeat: Seconds without an event after which a stream is pinged
+    """
+
+    def __init__(self, max_subscribers: int, max_per_user: int, heartbeat: float):
+        self.max_subscribers = max_subscribers
+        self.max_per_user = max_per_user
+        self.heartbeat = heartbeat
+        self.subscribers: dict[int, set[Subscription]] = {}
+        self.count = 0
+        self.peak = 0
+        self.delivered = 0
+        self.stale = 0
+        self.rejected = 0
+        self.notifications = 0
+        self._ticker: Optional[asyncio.Task] = None
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """
+        Open a subscription to the balances of ``user_id``.
+
+        Raises:
+            SubscriptionLimitError: If the process or the user has no slot left
+        """
+        if self.count >= self.max_subscribers:
+            self.rejected += 1
+            raise SubscriptionLimitError("Too many open event streams, retry later", per_user=False)
+        user_subscriptions = self.subscribers.setdefault(user_id, set())
+        if len(user_subscriptions) >= self.max_per_user:
+            self.rejected += 1
+            raise SubscriptionLimitError(
+                f"At most {self.max_per_user} event streams per user are allowed", per_user=True
+            )
+        subscription = Subscription(user_id)
+        user_subscriptions.add(subscription)
+        self.count += 1
+        self.peak = max(self.peak, self.count)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        user_subscriptions = self.subscribers.get(subscription.user_id)
+        if user_subscriptions is None or subscription not in user_subscriptions:
+            return
+        user_subscriptions.remove(subscription)
+        self.count -= 1
+        if not user_subscriptions:
+            del self.subscribers[subscription.user_id]
+
+    def publish(self, user_id: int, account_id: int, version: int, balance_minor: int) -> None:
+        for subscription in self.subscribers.get(user_id, ()):
+            if subscription.push(account_id, version, balance_minor):
+                self.delivered += 1
+            else:
+                self.stale += 1
+
+    def receive(self, payload: str) -> None:
+        """Publish the updates of a notification sent by ``balance_publisher``."""
+        self.notifications += 1
+        for item in payload.split(","):
+            user_id, account_id, version, balance_minor = item.split(":")
+            self.publish(int(user_id), int(account_id), int(version), int(balance_minor))
+
+    def close_all(self) -> None:
+        """End every open stream; clients reconnect and get a fresh snapshot."""
+        if self.count:
+            logger.info(f"Closing {self.count} event streams")
+        for user_subscriptions in self.subscribers.values():
+            for subscription in user_subscriptions:
+                subscription.close()
+
+    def start(self, listener: PgListener) -> None:
+        """
+        Start the heartbeat ticker and, when updates come from other workers,
+        subscribe the notification channel.
+
+        Args:
+            listener: LISTEN connection to subscribe the channel on
+        """
+        if not SSE_ENABLED:
+            return
+        if SSE_FANOUT == "notify":
+            listener.subscribe(SSE_CHANNEL, self.receive, on_connect=self.close_all)
+        if self._ticker is None:
+            self._ticker = asyncio.create_task(self._tick(), name="sse-heartbeat")
+
+    async def stop(self) -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+            try:
+                await self._ticker
+            except asyncio.CancelledError:
+                pass
+            self._ticker = None
+
+    async def _tick(self) -> None:
+        # Streams are pinged when due rather than all at once, which spreads
+        # the heartbeats of many streams over the interval
+        interval = min(1.0, self.heartbeat / 4)
+        while True:
+            await asyncio.sleep(interval)
+            due = time.monotonic() - self.heartbeat
+            for user_subscriptions in self.subscribers.values():
+                for subscription in user_subscriptions:
+                    if subscription.active_at <= due:
+                        subscription.ping()
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.count,
+            "users": len(self.subscribers),
+            "peak_subscribers": self.peak,
+            "max_subscribers": self.max_subscribers,
+            "delivered": self.delivered,
+            "stale": self.stale,
+            "rejected": self.rejected,
+            "notifications": self.notifications,
+        }
+
+
+def format_event(name: str, data: str) -> str:
+    return f"event: {name}\ndata: {data}\n\n"
+
+
+class EventStreamResponse(Response):
+    """
+    ``text/event-stream`` response of one subscription.
+
+    Sends the account snapshot first, then ``balance`` events, and a
+    heartbeat comment when the hub pings it. The subscription is removed from
+    the hub however the response ends, even if the stream never started.
+
+    Unlike ``StreamingResponse`` it runs no task group: the stream is written
+    from the request's own task, and a single watcher task closes the
+    subscription when the client disconnects.
+
+    Args:
+        hub: Hub the subscription belongs to
+        subscription: Subscription to stream
+        snapshot: Accounts of the user when the subscription was opened
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, hub: BalanceHub, subscription: Subscription, snapshot: AccountListResponse):
+        super().__init__(headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        self.hub = hub
+        self.subscription = subscription
+        # Rendered right away, so the open stream does not keep the models alive
+        self.first = (
+            f"retry: {SSE_RETRY_MS}\n" + format_event("accounts", snapshot.model_dump_json(exclude_none=True))
+        ).encode()
+
+    def init_headers(self, headers=None) -> None:
+        # No content-length: the body is streamed with chunked encoding
+        super().init_headers(headers)
+        self.raw_headers = [(name, value) for name, value in self.raw_headers if name != b"content-length"]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        watcher = asyncio.create_task(self.watch_disconnect(receive))
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": self.first, "more_body": True})
+            while not self.subscription.closed:
+                updates = await self.subscription.next_updates()
+                if updates:
+                    body = "".join(
+                        format_event(
+                            "balance",
+                            BalanceEvent(
+                                account_id=account_id,
+                                balance=from_minor_units(balance_minor),
+                                balance_version=version,
+                            ).model_dump_json(),
+                        )
+                        for account_id, (version, balance_minor) in updates.items()
+                    ).encode()
+                elif self.subscription.closed:
+                    break
+                else:
+                    body = HEARTBEAT
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            watcher.cancel()
+            self.hub.unsubscribe(self.subscription)
+
+    async def watch_disconnect(self, receive: Receive) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        self.subscription.close()
+
+
+def encode_balances(items: list[str]) -> str:
+    return ",".join(items)
+
+
+balance_hub = BalanceHub(SSE_MAX_CONNECTIONS, SSE_MAX_CONNECTIONS_PER_USER, SSE_HEARTBEAT_SECONDS)
+balance_publisher = NotifyPublisher(SSE_CHANNEL, SSE_NOTIFY_BATCH_MS, encode_balances, max_items=NOTIFY_MAX_ITEMS)
+
+
+def publish_balance(db: AsyncSession, user_id: int, account_id: int, balance_minor: int, version: int) -> None:
+    """
+    Push the new balance of an account to its owner's streams once the current transaction commits.
+
+    Args:
+        db: Session whose transaction carries the change
+        user_id: Owner of the account
+        account_id: Account whose balance changed
+        balance_minor: Balance after the change, in minor units
+        version: ``balance_version`` of the account after the change
+    """
+    if SSE_ENABLED:
+        db.sync_session.info.setdefault(SESSION_KEY, []).append((user_id, account_id, version, balance_minor))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    if session.in_nested_transaction():
+        # A released savepoint, the transaction is not committed yet
+        return
+    updates: Optional[list] = session.info.pop(SESSION_KEY, None)
+    if not updates:
+        return
+    if SSE_FANOUT == "notify":
+        balance_publisher.enqueue(f"{user_id}:{account_id}:{version}:{balance_minor}"
+                                  for user_id, account_id, version, balance_minor in updates)
+    else:
+        for update in updates:
+            balance_hub.publish(*update)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    # Updates made before a rolled back savepoint are still published on commit
+    if not session.in_nested_transaction():
+        session.info.pop(SESSION_KEY, None)
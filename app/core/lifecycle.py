@@ -0,0 +1,178 @@
+"""
+Process lifecycle state reported by the health endpoints.
+
+A process is live as soon as it serves requests. It is ready only once
+nothing holds readiness back: startup work such as the warm-up calls
+``readiness.hold`` and ``readiness.release`` around itself.
+
+On SIGTERM the process drains before the server gets to shut down:
+- readiness fails
+- ``DrainMiddleware`` answers new requests with 503
+- the requests already in flight, webhook transactions included, get up
+  to ``DRAIN_TIMEOUT_SECONDS`` to finish
+- long-lived responses such as event streams are ended by the callbacks
+  registered with ``drain.on_drain``
+Only then is the signal passed on to the server's own handler.
+"""
+import asyncio
+import logging
+import signal
+import threading
+import time
+from types import FrameType
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Set of reasons that keep the process out of rotation."""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self._holds: set[str] = set()
+
+    @property
+    def ready(self) -> bool:
+        return not self._holds
+
+    @property
+    def reasons(self) -> list[str]:
+        return sorted(self._holds)
+
+    def hold(self, reason: str) -> None:
+        self._holds.add(reason)
+
+    def release(self, reason: str) -> None:
+        self._holds.discard(reason)
+
+    def uptime(self) -> float:
+        return time.monotonic() - self.started_at
+
+
+class DrainController:
+    """
+    Counts in-flight requests and coordinates the drain on shutdown.
+
+    Args:
+        readiness: Readiness to hold while draining
+    """
+
+    def __init__(self, readiness: Readiness):
+        self.readiness = readiness
+        self.draining = False
+        self.drain_started_at: Optional[float] = None
+        self.in_flight = 0
+        self.rejected = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._original_handler = None
+        self._exit_task: Optional[asyncio.Task] = None
+        self._drain_callbacks: list[Callable[[], None]] = []
+
+    def request_started(self) -> None:
+        self.in_flight += 1
+        self._idle.clear()
+
+    def request_finished(self) -> None:
+        self.in_flight -= 1
+        if not self.in_flight:
+            self._idle.set()
+
+    def on_drain(self, callback: Callable[[], None]) -> None:
+        """Call ``callback`` when the drain starts, to end requests that would otherwise never finish."""
+        self._drain_callbacks.append(callback)
+
+    def start(self) -> None:
+        """Enter drain mode: fail readiness and reject new requests."""
+        if self.draining:
+            return
+        self.draining = True
+        self.drain_started_at = time.monotonic()
+        self.readiness.hold("draining")
+        logger.info(f"Draining, {self.in_flight} requests in flight")
+        # start() may run inside the signal handler, so the callbacks run on the loop
+        asyncio.get_running_loop().call_soon_threadsafe(self._run_drain_callbacks)
+
+    def _run_drain_callbacks(self) -> None:
+        for callback in self._drain_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Drain callback {callback} failed: {e}")
+
+    async def wait_drained(self, timeout: float) -> bool:
+        """
+        Wait until no request is in flight, at most ``timeout`` seconds after the drain started.
+
+        Args:
+            timeout: Drain deadline in seconds, counted from ``start``
+
+        Returns:
+            bool: True if idle, False if the deadline passed first
+        """
+        self.start()
+        remaining = self.drain_started_at + timeout - time.monotonic()
+        try:
+            await asyncio.wait_for(self._idle.wait(), max(remaining, 0))
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def install_signal_handler(self, timeout: float) -> None:
+        """
+        Put a drain in front of the current SIGTERM handler.
+
+        Runs on the event loop after the server has installed its own
+        handler, i.e. during lifespan startup. Does nothing outside the main
+        thread, where signals cannot be handled.
+
+        Args:
+            timeout: Seconds to wait for in-flight requests before the
+                server's handler is called anyway
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        loop = asyncio.get_running_loop()
+        # None: installed outside Python, treated as the default disposition
+        self._original_handler = signal.getsignal(signal.SIGTERM) or signal.SIG_DFL
+
+        def handler(sig: int, frame: Optional[FrameType]) -> None:
+            if self.draining:
+                # A repeated signal goes straight to the server
+                self._pass_on(sig, frame)
+                return
+            self.start()
+            loop.call_soon_threadsafe(self._schedule_exit, sig, frame, timeout)
+
+        signal.signal(signal.SIGTERM, handler)
+
+    def restore_signal_handler(self) -> None:
+        if self._original_handler is not None:
+            signal.signal(signal.SIGTERM, self._original_handler)
+            self._original_handler = None
+
+    def _schedule_exit(self, sig: int, frame: Optional[FrameType], timeout: float) -> None:
+        self._exit_task = asyncio.create_task(self._exit_after_drain(sig, frame, timeout))
+
+    async def _exit_after_drain(self, sig: int, frame: Optional[FrameType], timeout: float) -> None:
+        if await self.wait_drained(timeout):
+            logger.info(
+                f"Drained in {time.monotonic() - self.drain_started_at:.2f}s, {self.rejected} requests rejected"
+            )
+        else:
+            logger.warning(f"Drain deadline of {timeout}s passed with {self.in_flight} requests in flight")
+        self._pass_on(sig, frame)
+
+    def _pass_on(self, sig: int, frame: Optional[FrameType]) -> None:
+        handler = self._original_handler
+        if callable(handler):
+            handler(sig, frame)
+        elif handler != signal.SIG_IGN:
+            # Default disposition: terminate as the signal would have
+            self.restore_signal_handler()
+            signal.raise_signal(sig)
+
+
+readiness = Readiness()
+drain = DrainController(readiness)
@@ -0,0 +1,211 @@
+"""
+ASGI middleware.
+
+Written as plain ASGI callables rather than ``BaseHTTPMiddleware``, which
+would run every request through an extra task and memory stream.
+"""
+import json
+import random
+import sys
+
+from app.core.bulkhead import BulkheadFull, Bulkheads
+from app.core.dependencies import admin_from_token
+from app.core.lifecycle import DrainController
+from app.core.profiler import ProfileStore, RequestProfile, StackSampler
+from app.db.profiling import QueryProfile, current_profile
+
+DRAINING_BODY = json.dumps({"detail": "Service is shutting down, retry later"}).encode()
+BULKHEAD_FULL_BODY = json.dumps({"detail": "Too many concurrent requests of this kind, retry later"}).encode()
+
+
+class DrainMiddleware:
+    """
+    Track in-flight requests and turn new ones away while draining.
+
+    Rejected requests get 503 with ``Retry-After`` and ``Connection: close``,
+    so clients and webhook providers retry against another replica.
+
+    Args:
+        app: Wrapped ASGI application
+        drain: Drain controller counting the requests
+        exempt_prefixes: Paths still served while draining (health probes)
+        retry_after: Value of the ``Retry-After`` header in seconds
+    """
+
+    def __init__(self, app, drain: DrainController, exempt_prefixes: tuple[str, ...] = (), retry_after: int = 1):
+        self.app = app
+        self.drain = drain
+        self.exempt_prefixes = exempt_prefixes
+        self.retry_after = str(retry_after).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.drain.draining and not scope["path"].startswith(self.exempt_prefixes):
+            self.drain.rejected += 1
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(DRAINING_BODY)).encode()),
+                    (b"retry-after", self.retry_after),
+                    (b"connection", b"close"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": DRAINING_BODY})
+            return
+
+        self.drain.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.drain.request_finished()
+
+
+class BulkheadMiddleware:
+    """
+    Admit each request through the bulkhead of its traffic class.
+
+    A request that gets no slot is answered with 503 and ``Retry-After``
+    without reaching the application, so it never checks out a connection.
+
+    Args:
+        app: Wrapped ASGI application
+        bulkheads: Traffic classes and their shared capacity
+        retry_after: Value of the ``Retry-After`` header in seconds
+    """
+
+    def __init__(self, app, bulkheads: Bulkheads, retry_after: int = 1):
+        self.app = app
+        self.bulkheads = bulkheads
+        self.retry_after = str(retry_after).encode()
+
+    async def __call__(self, scope, receive, send):
+        bulkhead = self.bulkheads.classify(scope["path"]) if scope["type"] == "http" else None
+        if bulkhead is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.bulkheads.acquire(bulkhead)
+        except BulkheadFull:
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(BULKHEAD_FULL_BODY)).encode()),
+                    (b"retry-after", self.retry_after),
+                ],
+            })
+            await send({"type": "http.response.body", "body": BULKHEAD_FULL_BODY})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.bulkheads.release(bulkhead)
+
+
+class QueryProfilingMiddleware:
+    """
+    Collect the SQL statements of each request in a ``QueryProfile``.
+
+    The profile is logged when the request finishes: a debug summary, and a
+    warning per statement repeated more than ``repeat_threshold`` times.
+
+    Args:
+        app: Wrapped ASGI application
+        repeat_threshold: Executions of one statement per request reported as a likely N+1 query; 0 disables
+        server_timing: Add a ``Server-Timing`` header with the statement count and database time
+    """
+
+    def __init__(self, app, repeat_threshold: int = 0, server_timing: bool = False):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile(f"{scope['method']} {scope['path']}", self.repeat_threshold)
+        token = current_profile.set(profile)
+
+        async def send_with_timing(message):
+            # Statements of a streaming body run after the headers and are not included
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", profile.server_timing())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing if self.server_timing else send)
+        finally:
+            current_profile.reset(token)
+            profile.report()
+
+
+class RequestProfilingMiddleware:
+    """
+    Profile single requests with a sampling profiler.
+
+    A request is profiled when it carries ``X-Profile: 1`` and the bearer
+    token of an admin, or at random with ``sample_rate``. The report is saved
+    to ``store``; requested profiles return its id in ``X-Profile-Id``.
+    Other requests only pay for a scan of the header list.
+
+    Args:
+        app: Wrapped ASGI application
+        sampler: Stack sampler of the process
+        store: Where the reports are saved
+        sample_rate: Share of all requests profiled without the header
+    """
+
+    def __init__(self, app, sampler: StackSampler, store: ProfileStore, sample_rate: float = 0.0):
+        self.app = app
+        self.sampler = sampler
+        self.store = store
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = False
+        authorization = b""
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                requested = value == b"1"
+            elif name == b"authorization":
+                authorization = value
+        if requested:
+            scheme, _, token = authorization.decode("latin-1").partition(" ")
+            requested = scheme.lower() == "bearer" and await admin_from_token(token) is not None
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        # Samples with this call's frame on the stack belong to the request
+        profile = RequestProfile(scope["method"], scope["path"], sys._getframe())
+        status_code = 0
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if requested:
+                    message["headers"] = [*message.get("headers", ()), (b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        self.sampler.add(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self.sampler.remove(profile)
+            profile.finish(status_code)
+            await self.store.save(profile)
@@ -0,0 +1,55 @@
+"""
+Money representation.
+
+Amounts are stored and aggregated as BIGINT minor units (cents), so balance
+updates and sums are plain integer arithmetic in Postgres and Python.
+``Decimal`` is used only at the API boundary.
+"""
+from decimal import Decimal
+from typing import Annotated
+
+from pydantic import Field, PlainSerializer
+
+MINOR_UNITS = 100
+
+# A JSON number is parsed through a binary64 float. Every decimal with at most
+# 15 significant digits round-trips exactly through float's shortest repr, so
+# max_digits=15 keeps parsing exact. On output, the float's repr is again the
+# exact two-place decimal, and the wire format stays a JSON number.
+Money = Annotated[
+    Decimal,
+    Field(max_digits=15, decimal_places=2),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
+
+
+def to_minor_units(amount: Decimal) -> int:
+    """
+    Convert an amount with at most two decimal places to minor units.
+
+    Args:
+        amount: Amount in major units, e.g. ``Decimal("100.50")``
+
+    Returns:
+        int: Amount in minor units, e.g. ``10050``
+
+    Raises:
+        ValueError: If the amount has fractions of a minor unit
+    """
+    minor = amount * MINOR_UNITS
+    if minor != minor.to_integral_value():
+        raise ValueError(f"Amount {amount} has more than two decimal places")
+    return int(minor)
+
+
+def from_minor_units(minor: int) -> Decimal:
+    """
+    Convert minor units to an amount in major units.
+
+    Args:
+        minor: Amount in minor units, e.g. ``10050``
+
+    Returns:
+        Decimal: Amount with two decimal places, e.g. ``Decimal("100.50")``
+    """
+    return Decimal(minor).scaleb(-2)
@@ -0,0 +1,223 @@
+"""
+Sampling profiler for single requests.
+
+``StackSampler`` runs a thread that reads the event loop thread's stack every
+``interval`` seconds while at least one request is profiled. All requests
+share the loop thread, so a sample counts for a request only if the frame of
+its ``RequestProfilingMiddleware`` call is on the stack, i.e. the request's
+own code is running. Samples taken while the request awaits the database,
+the network or other tasks are counted as ``(awaiting)``, so the report
+covers the request's wall time. Work handed to other threads (password
+hashing, sync dependencies) shows up as awaiting.
+
+Reports are collapsed stacks (``root;outer;...;inner count`` per line), the
+input format of flamegraph.pl, speedscope and inferno. ``ProfileStore``
+keeps them as JSON files in a directory shared by all workers.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import (
+    PROJECT_ROOT,
+    REQUEST_PROFILING_DIR,
+    REQUEST_PROFILING_INTERVAL_MS,
+    REQUEST_PROFILING_KEEP,
+)
+
+logger = logging.getLogger(__name__)
+
+AWAITING = "(awaiting)"
+PROFILE_ID = re.compile(r"^\d+-[0-9a-f]{8}$")
+
+# Label per code object, formatted once
+_labels: dict = {}
+
+
+def frame_label(code) -> str:
+    """``qualname (path:line)`` of a code object, with the path relative to the project or site-packages."""
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        if path.startswith(str(PROJECT_ROOT)):
+            path = os.path.relpath(path, PROJECT_ROOT)
+        elif "site-packages" in path:
+            path = path.split("site-packages" + os.sep, 1)[-1]
+        label = _labels[code] = f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+    return label
+
+
+class RequestProfile:
+    """
+    Samples of one request.
+
+    Args:
+        method: HTTP method
+        path: Request path
+        marker: Frame of the middleware call; samples with it on the stack belong to the request
+    """
+
+    def __init__(self, method: str, path: str, marker):
+        self.id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.root = f"{method} {path}"
+        self.marker = marker
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.status_code = 0
+        self.created_at = time.time()
+        self.started = time.perf_counter()
+        self.wall = 0.0
+
+    def add_sample(self, frames: list) -> None:
+        """Count one sample; ``frames`` runs from the innermost frame outwards."""
+        self.samples += 1
+        for index, frame in enumerate(frames):
+            if frame is self.marker:
+                labels = [frame_label(inner.f_code) for inner in reversed(frames[:index])]
+                self.stacks[";".join((self.root, *labels))] += 1
+                return
+        self.stacks[f"{self.root};{AWAITING}"] += 1
+
+    def finish(self, status_code: int) -> None:
+        self.status_code = status_code
+        self.wall = time.perf_counter() - self.started
+        self.marker = None
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "wall_ms": round(self.wall * 1000, 3),
+            "samples": self.samples,
+            "awaiting_samples": self.stacks[f"{self.root};{AWAITING}"],
+            "created_at": self.created_at,
+        }
+
+
+class StackSampler:
+    """
+    Samples the stack of the event loop thread for the requests being profiled.
+
+    The sampling thread runs only while a request is profiled. A thread can
+    only sample once the loop thread releases the GIL, which CPU-bound code
+    does every ``sys.getswitchinterval()`` (5 ms by default), so the switch
+    interval is lowered to ``interval`` meanwhile.
+
+    Args:
+        interval: Seconds between samples
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiles: set[RequestProfile] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._target: Optional[int] = None
+        self._switch_interval = sys.getswitchinterval()
+
+    def add(self, profile: RequestProfile) -> None:
+        """Start sampling for ``profile``; called from the event loop thread."""
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._target = threading.get_ident()
+                self._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self._switch_interval, self.interval))
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: RequestProfile) -> None:
+        """Stop sampling for ``profile``; waits for a sample in progress."""
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            # Held while sampling, so a profile is complete once remove() returns
+            with self._lock:
+                if not self._profiles:
+                    sys.setswitchinterval(self._switch_interval)
+                    self._thread = None
+                    return
+                frame = sys._current_frames().get(self._target)
+                frames = []
+                while frame is not None:
+                    frames.append(frame)
+                    frame = frame.f_back
+                for profile in self._profiles:
+                    profile.add_sample(frames)
+                # Frames keep their locals alive
+                del frames
+
+
+class ProfileStore:
+    """
+    Request profiles as JSON files in ``directory``, the newest ``keep`` of them.
+
+    Args:
+        directory: Directory of the reports, created on first use
+        keep: Reports kept; older ones are deleted when a new one is saved
+    """
+
+    def __init__(self, directory: str, keep: int):
+        self.directory = Path(directory)
+        self.keep = keep
+
+    async def save(self, profile: RequestProfile) -> None:
+        report = {**profile.summary(), "interval_ms": REQUEST_PROFILING_INTERVAL_MS, "folded": profile.folded()}
+        try:
+            await asyncio.to_thread(self._write, profile.id, report)
+        except OSError as e:
+            logger.warning(f"Could not save profile {profile.id} of {profile.root}: {e}")
+
+    async def summaries(self) -> list[dict]:
+        """Summaries of the stored reports, newest first."""
+        return await asyncio.to_thread(self._list)
+
+    async def get(self, profile_id: str) -> Optional[dict]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        return await asyncio.to_thread(self._read, self.directory / f"{profile_id}.json")
+
+    def _write(self, profile_id: str, report: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{profile_id}.json"
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(report))
+        temporary.replace(path)
+        for old in sorted(self.directory.glob("*.json"), reverse=True)[self.keep:]:
+            old.unlink(missing_ok=True)
+
+    def _list(self) -> list[dict]:
+        if not self.directory.is_dir():
+            return []
+        reports = (self._read(path) for path in sorted(self.directory.glob("*.json"), reverse=True))
+        return [{key: value for key, value in report.items() if key != "folded"} for report in reports if report]
+
+    @staticmethod
+    def _read(path: Path) -> Optional[dict]:
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+
+request_sampler = StackSampler(REQUEST_PROFILING_INTERVAL_MS / 1000)
+profile_store = ProfileStore(REQUEST_PROFILING_DIR, REQUEST_PROFILING_KEEP)
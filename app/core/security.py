@@ -1,18 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import asyncio
 import os
 
-from sqlalchemy import select
-
+from app.core.config import PASSWORD_HASH_WORKERS
 from app.db.models.user import User
+from app.db.queries import user_by_email
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("JWT_ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
+# Work factor of new hashes; existing hashes keep the one they were made with
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt releases the GIL while hashing, so threads hash in parallel on all
+# cores. Created on first use, i.e. after gunicorn has forked the worker.
+_hash_executor: Optional[ThreadPoolExecutor] = None
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -42,6 +50,35 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def password_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return _hash_executor
+
+
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    """
+    Hash passwords in parallel without blocking the event loop.
+
+    Args:
+        passwords: Plain text passwords
+
+    Returns:
+        list[str]: Hashed passwords, in the order of ``passwords``
+    """
+    loop = asyncio.get_running_loop()
+    executor = password_hash_executor()
+    return await asyncio.gather(*(loop.run_in_executor(executor, get_password_hash, password) for password in passwords))
+
+
+def shutdown_password_hashing() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+
 def create_access_token(data: dict) -> str:
     """
     Create a JWT access token.
@@ -72,10 +109,10 @@ async def authenticate_user(email: str, password: str, db) -> Optional[User]:
     Returns:
         Optional[dict]: User data if authentication successful, None otherwise
     """
-    result = await db.execute(select(User).where(User.email == email))
+    result = await db.execute(user_by_email(email))
     user = result.scalar_one_or_none()
 
-    if not user:
+    if not user or user.deleted_at is not None:
         return None
     if not verify_password(password, user.hashed_password):
         return None
@@ -0,0 +1,22 @@
+"""
+Summary statistics shared by the monitoring endpoints and the scripts.
+"""
+import math
+from typing import Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of numbers.
+
+    Args:
+        values: Samples, in any order
+        pct: Percentile, 0-100
+
+    Returns:
+        float: The smallest sample with at least ``pct`` percent of the samples at or below it; 0.0 if there are none
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))]
@@ -0,0 +1,200 @@
+"""
+Warm-up of a freshly started worker.
+
+Without it, the first requests of a worker pay for work that is done once:
+- opening pool connections
+- asyncpg type introspection and statement preparation, done per connection
+- SQLAlchemy mapper configuration, lambda statement analysis and SQL compilation
+- the bcrypt backend self-test and the jose backend load
+- the first validation and serialization through each response model
+
+``warm_up`` does all of it before the process reports ready.
+Write statements run inside transactions that are rolled back.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from typing import Any, Union, get_args, get_origin
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.orm import configure_mappers
+
+from app.core.lifecycle import readiness
+from app.core.security import create_access_token, get_password_hash, verify_password
+from app.db.models import Account, Payment
+from app.db.outbox import PAYMENT_CREATED
+from app.db.queries import (
+    account_by_id,
+    accounts_by_user,
+    claim_transaction,
+    credit_account_with_event,
+    payment_by_transaction,
+    payments_by_user,
+    transaction_created_at,
+    user_by_email,
+    user_by_id,
+)
+from app.db.session import AsyncSessionLocal, POOL_SIZE, engine
+
+logger = logging.getLogger(__name__)
+
+MISSING_ID = 0
+
+
+async def prepare_statements(conn: AsyncConnection) -> None:
+    """
+    Execute every hot statement once on ``conn`` through an ORM session.
+
+    The session compiles the same SQL as request handlers do, so the
+    statements land in asyncpg's prepared statement cache of this
+    connection. Lookups use ids that do not exist. Writes are rolled back.
+
+    Args:
+        conn: Pool connection to warm
+    """
+    transaction_id = uuid.uuid4()
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal(bind=conn) as session:
+        for statement in (
+                user_by_id(MISSING_ID),
+                user_by_email(""),
+                account_by_id(MISSING_ID),
+                accounts_by_user(MISSING_ID),
+                payments_by_user(MISSING_ID),
+                payment_by_transaction(transaction_id, now),
+                transaction_created_at(transaction_id),
+        ):
+            await session.execute(statement)
+
+        result = await session.execute(claim_transaction(transaction_id))
+        created_at = result.scalar_one()
+        await session.execute(credit_account_with_event(MISSING_ID, 0, PAYMENT_CREATED, {}))
+        account = (await session.execute(select(Account).limit(1))).scalar_one_or_none()
+        if account is not None:
+            session.add(Payment(
+                transaction_id=transaction_id,
+                user_id=account.user_id,
+                account_id=account.id,
+                amount_minor=1,
+                created_at=created_at,
+            ))
+            await session.flush()
+        await session.rollback()
+
+
+async def warm_up_connections(count: int) -> int:
+    """
+    Open ``count`` pool connections at once and prepare the hot statements on each.
+
+    Args:
+        count: Connections to open, capped at the pool size
+
+    Returns:
+        int: Number of connections warmed
+    """
+    count = min(count, POOL_SIZE)
+    async with AsyncExitStack() as stack:
+        # Hold all of them, otherwise the pool would hand out the same connection again
+        connections = [await stack.enter_async_context(engine.connect()) for _ in range(count)]
+        await asyncio.gather(*(prepare_statements(conn) for conn in connections))
+    return count
+
+
+def sample_value(annotation: Any) -> Any:
+    """Build a JSON-like sample for ``annotation`` from the ``example`` values of the schemas."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        extra = annotation.model_config.get("json_schema_extra")
+        if isinstance(extra, dict) and "example" in extra:
+            return extra["example"]
+        sample = {}
+        for name, field in annotation.model_fields.items():
+            if isinstance(field.json_schema_extra, dict) and "example" in field.json_schema_extra:
+                sample[name] = field.json_schema_extra["example"]
+            elif field.default is not PydanticUndefined:
+                sample[name] = field.default
+            else:
+                sample[name] = sample_value(field.annotation)
+        return sample
+
+    origin = get_origin(annotation)
+    args = [arg for arg in get_args(annotation) if arg is not type(None)]
+    if origin in (list, set, tuple):
+        return [sample_value(args[0])] if args else []
+    if origin is Union and args:
+        return sample_value(args[0])
+    return None
+
+
+def warm_up_response_models(app: FastAPI) -> int:
+    """
+    Validate and serialize a sample through the response model of every route.
+
+    Routes whose sample does not validate are skipped.
+
+    Args:
+        app: Application whose routes to warm
+
+    Returns:
+        int: Number of routes warmed
+    """
+    warmed = 0
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or route.response_field is None:
+            continue
+        value, errors = route.response_field.validate(
+            sample_value(route.response_field.type_), {}, loc=("response",)
+        )
+        if errors:
+            logger.debug(f"No valid warm-up sample for {route.path}: {errors}")
+            continue
+        route.response_field.serialize(value, exclude_none=route.response_model_exclude_none)
+        warmed += 1
+    return warmed
+
+
+def warm_up_security() -> None:
+    """Load the bcrypt and jose backends, both are initialised on first use."""
+    verify_password("warmup", get_password_hash("warmup"))
+    create_access_token({"sub": "0", "role": "USER"})
+
+
+async def warm_up(app: FastAPI, connections: int) -> None:
+    """
+    Run the whole warm-up.
+
+    Args:
+        app: Application being started
+        connections: Pool connections to open and prepare
+    """
+    started = time.perf_counter()
+    configure_mappers()
+    await asyncio.to_thread(warm_up_security)
+    routes = warm_up_response_models(app)
+    warmed = await warm_up_connections(connections)
+    logger.info(
+        f"Warm-up finished in {time.perf_counter() - started:.2f}s: "
+        f"{warmed} connections, {routes} response models"
+    )
+
+
+async def run_warm_up(app: FastAPI, connections: int, timeout: float) -> None:
+    """
+    Background task of ``lifespan``, holds readiness until the warm-up is done.
+
+    A failed or timed out warm-up is logged and the process becomes ready
+    anyway: it can serve, only more slowly at first.
+    """
+    try:
+        await asyncio.wait_for(warm_up(app, connections), timeout)
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e!r}")
+    finally:
+        readiness.release("warmup")
@@ -0,0 +1,279 @@
+"""
+Background deletion of users with large histories.
+
+Deleting a user in one statement cascades to every account and sets
+``user_id``/``account_id`` to NULL on every related payment, in a single
+transaction. For a user with millions of payments that holds row locks for
+minutes. In ``job`` mode (``USER_DELETION_MODE``) the request only sets
+``users.deleted_at`` and creates a ``UserDeletionJob``; from then on the user
+cannot log in, receive payments or show up in the admin API.
+
+``deletion_worker`` runs the job in phases, each batch of at most
+``USER_DELETION_BATCH_ROWS`` rows in its own short transaction:
+
+- ``payments``: unlink payments from the user and the user's accounts
+- ``accounts``: delete the accounts, which no payment references any more
+- ``user``: delete the user row; the foreign keys still clean up payments
+  booked by a webhook that raced with the deletion
+
+Every statement only touches rows still linked to the user, so a batch that
+is repeated after a crash does no harm. The worker holds a job until
+``locked_until`` and extends it with each batch. Every worker polls for open
+jobs, and the worker of the process that created a job is woken after the
+commit.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import delete, event, func, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    USER_DELETION_BATCH_PAUSE_MS,
+    USER_DELETION_BATCH_ROWS,
+    USER_DELETION_LEASE_SECONDS,
+    USER_DELETION_POLL_SECONDS,
+)
+from app.db.models import Account, Payment, User, UserDeletionJob
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+SESSION_FLAG = "deletion_job_created"
+LEASE = timedelta(seconds=USER_DELETION_LEASE_SECONDS)
+
+
+def user_accounts(user_id: int):
+    return select(Account.id).where(Account.user_id == user_id)
+
+
+# The batch's keys are passed on as arrays: joined through unnest(), each row
+# is found with the primary key index of its partition. An IN (subquery) on
+# the keys is planned as a hash join over every partition, which reads the
+# whole table for each batch.
+DETACH_PAYMENTS = text("""
+    WITH user_accounts AS (
+        SELECT id FROM accounts WHERE user_id = :user_id
+    ),
+    batch AS (
+        SELECT array_agg(transaction_id) AS transaction_ids, array_agg(created_at) AS created_ats
+        FROM (
+            SELECT transaction_id, created_at FROM payments
+            WHERE user_id = :user_id OR account_id IN (SELECT id FROM user_accounts)
+            LIMIT :limit
+        ) keys
+    )
+    UPDATE payments p
+    SET user_id = nullif(p.user_id, :user_id),
+        account_id = CASE WHEN p.account_id IN (SELECT id FROM user_accounts) THEN NULL ELSE p.account_id END
+    FROM batch, unnest(batch.transaction_ids, batch.created_ats) AS k(transaction_id, created_at)
+    WHERE p.transaction_id = k.transaction_id AND p.created_at = k.created_at
+""")
+
+
+def delete_accounts(user_id: int, limit: int):
+    return (
+        delete(Account)
+        .where(Account.id.in_(user_accounts(user_id).limit(limit)))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def claim_job():
+    """Take the oldest open job that no live worker holds."""
+    open_job = (
+        select(UserDeletionJob.id)
+        .where(
+            UserDeletionJob.status.in_(("pending", "running")),
+            or_(UserDeletionJob.locked_until.is_(None), UserDeletionJob.locked_until < func.now()),
+        )
+        .order_by(UserDeletionJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    return (
+        update(UserDeletionJob)
+        .where(UserDeletionJob.id == open_job)
+        .values(
+            status="running",
+            started_at=func.coalesce(UserDeletionJob.started_at, func.now()),
+            locked_until=func.now() + LEASE,
+            attempts=UserDeletionJob.attempts + 1,
+        )
+        .returning(UserDeletionJob)
+    )
+
+
+async def create_deletion_job(db: AsyncSession, user_id: int, email: str,
+                              requested_by: Optional[int]) -> UserDeletionJob:
+    """
+    Create the deletion job of a user marked deleted; the worker starts once the transaction commits.
+
+    Args:
+        db: Session whose transaction marked the user deleted
+        user_id: User to delete
+        email: Email of the user, kept for the job status
+        requested_by: Admin who requested the deletion
+
+    Returns:
+        UserDeletionJob: The pending job
+    """
+    job = UserDeletionJob(user_id=user_id, email=email, requested_by=requested_by)
+    db.add(job)
+    await db.flush()
+    db.sync_session.info[SESSION_FLAG] = True
+    return job
+
+
+class DeletionWorker:
+    """
+    Runs deletion jobs one at a time in a background task.
+
+    Args:
+        batch_rows: Rows per batch
+        pause: Seconds between batches
+        poll_interval: Seconds between looks for open jobs when not woken
+    """
+
+    def __init__(self, batch_rows: int, pause: float, poll_interval: float):
+        self.batch_rows = batch_rows
+        self.pause = pause
+        self.poll_interval = poll_interval
+        self.jobs_done = 0
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="user-deletion")
+
+    async def stop(self) -> None:
+        """Finish the batch in progress and hand the job back to the other workers."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(self._task, USER_DELETION_LEASE_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Deletion batch did not finish before shutdown")
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                job = await self._claim()
+                if job is not None:
+                    await self._process(job)
+                    continue
+            except Exception as e:
+                logger.error(f"Deletion worker error: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self) -> Optional[UserDeletionJob]:
+        async with AsyncSessionLocal() as db:
+            job = (await db.execute(claim_job())).scalar_one_or_none()
+            if job is not None and job.payments_total is None:
+                # Counted once, when the job starts; uses the foreign key indexes
+                job.payments_total = (await db.execute(
+                    select(func.count()).select_from(Payment).where(
+                        or_(Payment.user_id == job.user_id, Payment.account_id.in_(user_accounts(job.user_id)))
+                    )
+                )).scalar_one()
+                job.accounts_total = (await db.execute(
+                    select(func.count()).select_from(Account).where(Account.user_id == job.user_id)
+                )).scalar_one()
+            await db.commit()
+        if job is not None:
+            logger.info(f"Deleting user {job.user_id} (job {job.id}): {job.payments_total} payments, "
+                        f"{job.accounts_total} accounts, phase {job.phase}")
+        return job
+
+    async def _process(self, job: UserDeletionJob) -> None:
+        phase = job.phase
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    phase = await self._run_batch(db, job, phase)
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Deletion job {job.id} failed in phase {phase}: {e}", exc_info=True)
+                # Left running; another attempt starts when the lease runs out
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(UserDeletionJob).where(UserDeletionJob.id == job.id).values(last_error=str(e)[:2000])
+                    )
+                    await db.commit()
+                return
+            if phase == "done":
+                self.jobs_done += 1
+                logger.info(f"Deleted user {job.user_id} (job {job.id})")
+                return
+            if self._stopping:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(UserDeletionJob).where(UserDeletionJob.id == job.id).values(locked_until=None)
+                    )
+                    await db.commit()
+                return
+            await asyncio.sleep(self.pause)
+
+    async def _run_batch(self, db: AsyncSession, job: UserDeletionJob, phase: str) -> str:
+        """Run one batch of ``phase`` and record it; returns the phase of the next batch."""
+        progress = {}
+        next_phase = phase
+        if phase == "payments":
+            rows = (await db.execute(
+                DETACH_PAYMENTS, {"user_id": job.user_id, "limit": self.batch_rows}
+            )).rowcount
+            progress["payments_detached"] = UserDeletionJob.payments_detached + rows
+            if rows < self.batch_rows:
+                next_phase = "accounts"
+        elif phase == "accounts":
+            rows = (await db.execute(delete_accounts(job.user_id, self.batch_rows))).rowcount
+            progress["accounts_deleted"] = UserDeletionJob.accounts_deleted + rows
+            if rows < self.batch_rows:
+                next_phase = "user"
+        else:
+            await db.execute(delete(User).where(User.id == job.user_id, User.deleted_at.is_not(None)))
+            next_phase = "done"
+            progress.update(status="done", finished_at=func.now(), locked_until=None)
+
+        if next_phase != "done":
+            progress["locked_until"] = func.now() + LEASE
+        await db.execute(
+            update(UserDeletionJob)
+            .where(UserDeletionJob.id == job.id)
+            .values(phase=next_phase, batches=UserDeletionJob.batches + 1, **progress)
+        )
+        return next_phase
+
+
+deletion_worker = DeletionWorker(USER_DELETION_BATCH_ROWS, USER_DELETION_BATCH_PAUSE_MS / 1000, USER_DELETION_POLL_SECONDS)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session: Session) -> None:
+    # Released savepoints fire after_commit too
+    if not session.in_nested_transaction() and session.info.pop(SESSION_FLAG, False):
+        deletion_worker.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    if not session.in_nested_transaction():
+        session.info.pop(SESSION_FLAG, None)
@@ -0,0 +1,225 @@
+"""
+Postgres LISTEN/NOTIFY helpers.
+
+``PgListener`` keeps a dedicated LISTEN connection with automatic reconnects.
+Notifications are not queued for a session that is not listening, so
+everything published while the connection was down is lost. ``on_connect``
+runs after every (re)connect, once LISTEN is active, so the consumer can
+resynchronise, e.g. drop its whole cache. The application's consumers
+subscribe their channels on the shared ``pg_listener``, so a worker holds
+one LISTEN connection however many of them are enabled.
+
+``NotifyPublisher`` sends notifications after commit, one per batch window.
+A NOTIFY inside every transaction would serialize commits on Postgres'
+global notification queue lock.
+"""
+import asyncio
+import logging
+from typing import Callable, Iterable, Optional
+
+import asyncpg
+from sqlalchemy import text
+
+from app.core.config import DB_APPLICATION_NAME
+from app.db.session import asyncpg_dsn, read_only_engine
+
+logger = logging.getLogger(__name__)
+
+
+class PgListener:
+    """
+    Listen on Postgres channels from a background task.
+
+    Args:
+        channels: Channel name mapped to a callback receiving the payload
+        on_connect: Called after LISTEN is (re-)established
+        name: Suffix of the connection's application_name
+        health_interval: Seconds between liveness checks of an idle connection
+        max_backoff: Upper bound of the reconnect delay in seconds
+    """
+
+    def __init__(
+            self,
+            channels: Optional[dict[str, Callable[[str], None]]] = None,
+            on_connect: Optional[Callable[[], None]] = None,
+            name: str = "listener",
+            health_interval: float = 10.0,
+            max_backoff: float = 30.0,
+    ):
+        self.name = name
+        self.health_interval = health_interval
+        self.max_backoff = max_backoff
+        self.connects = 0
+        self._task: Optional[asyncio.Task] = None
+        self.channels: dict[str, Callable[[str], None]] = {}
+        self.on_connect: dict[str, Callable[[], None]] = {}
+        for channel, callback in (channels or {}).items():
+            self.subscribe(channel, callback, on_connect)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def subscribe(
+            self,
+            channel: str,
+            callback: Callable[[str], None],
+            on_connect: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """
+        Add a channel; must happen before ``start``.
+
+        Args:
+            channel: Notification channel
+            callback: Receives the payload of each notification
+            on_connect: Called after LISTEN on the channel is (re-)established
+
+        Raises:
+            RuntimeError: If the listener is already running
+        """
+        if self.running:
+            raise RuntimeError(f"Listener {self.name} is running, subscribe {channel} before start")
+        self.channels[channel] = callback
+        if on_connect is not None:
+            self.on_connect[channel] = on_connect
+
+    def start(self) -> None:
+        """Start listening, if any channel is subscribed."""
+        if self.channels and not self.running:
+            self._task = asyncio.create_task(self._run(), name=f"pg-{self.name}")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        backoff = 0.5
+        while True:
+            try:
+                await self._listen()
+                backoff = 0.5
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Listener {self.name} lost its connection: {e}, reconnecting in {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    async def _listen(self) -> None:
+        conn = await asyncpg.connect(
+            asyncpg_dsn(), server_settings={"application_name": f"{DB_APPLICATION_NAME}_{self.name}"}
+        )
+        closed = asyncio.Event()
+        conn.add_termination_listener(lambda _: closed.set())
+        try:
+            for channel, callback in self.channels.items():
+                await conn.add_listener(channel, self._dispatch(callback))
+
+            self.connects += 1
+            logger.info(f"Listener {self.name} listening on {', '.join(self.channels)}")
+            for channel, on_connect in self.on_connect.items():
+                try:
+                    on_connect()
+                except Exception as e:
+                    logger.error(f"Listener {self.name} failed to resynchronise {channel}: {e}")
+
+            while not closed.is_set():
+                try:
+                    await asyncio.wait_for(closed.wait(), self.health_interval)
+                except asyncio.TimeoutError:
+                    # A silently dropped connection never fires the termination listener
+                    await conn.fetchval("SELECT 1", timeout=self.health_interval)
+            raise ConnectionError("connection closed")
+        finally:
+            if not conn.is_closed():
+                conn.terminate()
+
+    def _dispatch(self, callback: Callable[[str], None]):
+        def handler(connection, pid, channel, payload):
+            try:
+                callback(payload)
+            except Exception as e:
+                logger.error(f"Listener {self.name} failed to handle a notification on {channel}: {e}")
+        return handler
+
+
+class NotifyPublisher:
+    """
+    Coalesces items enqueued within ``batch_ms`` into one ``pg_notify``.
+
+    Duplicate items are sent once, the others in the order they were first
+    enqueued. With ``max_items`` a larger batch is split into several
+    notifications, sent in order over one connection.
+
+    Args:
+        channel: Notification channel
+        batch_ms: Collection window in milliseconds
+        encode: Builds the payload from a batch of items
+        max_items: Items per notification, None for no limit
+    """
+
+    def __init__(
+            self,
+            channel: str,
+            batch_ms: float,
+            encode: Callable[[list[str]], str],
+            max_items: Optional[int] = None,
+    ):
+        self.channel = channel
+        self.batch_delay = batch_ms / 1000
+        self.encode = encode
+        self.max_items = max_items
+        self.published = 0
+        # dict as an insertion-ordered set
+        self._pending: dict[str, None] = {}
+        self._scheduled = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def enqueue(self, items: Iterable[str] = ()) -> None:
+        self._pending.update(dict.fromkeys(items))
+        self._scheduled = True
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_delay, self.flush)
+
+    def flush(self) -> None:
+        self._flush_handle = None
+        if not self._scheduled:
+            return
+        items, self._pending, self._scheduled = list(self._pending), {}, False
+        size = self.max_items or len(items) or 1
+        batches = [items[start:start + size] for start in range(0, len(items), size)] or [[]]
+        task = asyncio.create_task(self._send(batches, len(items)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batches: list[list[str]], items: int) -> None:
+        try:
+            # Autocommit connection: each notification goes out immediately
+            async with read_only_engine.connect() as conn:
+                for batch in batches:
+                    await conn.execute(
+                        text("SELECT pg_notify(:channel, :payload)"),
+                        {"channel": self.channel, "payload": self.encode(batch)},
+                    )
+                    self.published += 1
+        except Exception as e:
+            logger.error(f"Could not notify {self.channel} ({items} items): {e}")
+
+    async def stop(self) -> None:
+        """Send what is pending and wait for sends in flight."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+
+
+# Shared LISTEN connection of the application's consumers
+pg_listener = PgListener(name="listener")
@@ -0,0 +1,128 @@
+"""
+Schema revision check and on-demand Alembic upgrades.
+
+Importing Alembic costs more than a hundred milliseconds, and ``command.upgrade``
+also loads every migration script. Startup therefore only compares the
+revision stored in ``alembic_version`` with the heads of ``alembic/versions``.
+The heads are found by reading the ``revision``/``down_revision`` lines of the
+version files, without importing them. Alembic is imported only when an
+upgrade is actually needed.
+"""
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import DATABASE_URL, PROJECT_ROOT
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = PROJECT_ROOT / "alembic" / "versions"
+REVISION_RE = re.compile(r"^revision(?:\s*:[^=]*)?\s*=\s*['\"](\w+)['\"]", re.MULTILINE)
+DOWN_REVISION_RE = re.compile(r"^down_revision(?:\s*:[^=]*)?\s*=\s*(.+)$", re.MULTILINE)
+QUOTED_RE = re.compile(r"['\"](\w+)['\"]")
+
+
+class SchemaOutdatedError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class SchemaRevision:
+    current: frozenset[str]
+    heads: frozenset[str]
+
+    @property
+    def is_current(self) -> bool:
+        return self.current == self.heads
+
+
+@lru_cache
+def head_revisions() -> frozenset[str]:
+    """
+    Return the head revisions of ``alembic/versions``.
+
+    Raises:
+        RuntimeError: If a version file has no ``revision`` line
+    """
+    revisions = set()
+    parents = set()
+    for path in VERSIONS_DIR.glob("*.py"):
+        source = path.read_text(encoding="utf-8")
+        revision = REVISION_RE.search(source)
+        if revision is None:
+            raise RuntimeError(f"No revision found in {path.name}")
+        revisions.add(revision.group(1))
+        down_revision = DOWN_REVISION_RE.search(source)
+        if down_revision is not None:
+            parents.update(QUOTED_RE.findall(down_revision.group(1)))
+    return frozenset(revisions - parents)
+
+
+def current_revisions(conn: Connection) -> frozenset[str]:
+    """Return the revisions stored in ``alembic_version``, empty for a fresh database."""
+    exists = conn.execute(text("SELECT to_regclass('alembic_version') IS NOT NULL")).scalar()
+    if not exists:
+        return frozenset()
+    return frozenset(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+
+
+def check_schema_revision(conn: Connection) -> SchemaRevision:
+    """
+    Compare the database revision with the heads of the migration scripts.
+
+    Args:
+        conn: Synchronous connection (use ``AsyncConnection.run_sync`` from async code)
+
+    Returns:
+        SchemaRevision: Stored and expected revisions
+    """
+    revision = SchemaRevision(current_revisions(conn), head_revisions())
+    if not revision.is_current:
+        logger.warning(
+            f"Database schema is at {sorted(revision.current) or 'no revision'}, "
+            f"migrations head is {sorted(revision.heads)}"
+        )
+    return revision
+
+
+def upgrade_to_head() -> None:
+    """Run ``alembic upgrade head`` (blocking; Alembic is imported here)."""
+    from alembic import command
+    from alembic.config import Config
+
+    alembic_cfg = Config(PROJECT_ROOT / "alembic.ini")
+    alembic_cfg.set_main_option("script_location", str(PROJECT_ROOT / "alembic"))
+    alembic_cfg.set_main_option("sqlalchemy.url", DATABASE_URL)
+    command.upgrade(alembic_cfg, "head")
+
+
+async def ensure_schema_revision(mode: str) -> None:
+    """
+    Startup check of the schema revision.
+
+    Args:
+        mode: "upgrade" runs the migrations when behind, "fail" raises,
+            "warn" only logs, "off" skips the check
+
+    Raises:
+        SchemaOutdatedError: If the schema is behind and ``mode`` is "fail"
+    """
+    if mode == "off":
+        return
+    async with engine.connect() as conn:
+        revision = await conn.run_sync(check_schema_revision)
+    if revision.is_current:
+        return
+
+    if mode == "upgrade":
+        await asyncio.to_thread(upgrade_to_head)
+    elif mode == "fail":
+        raise SchemaOutdatedError(
+            f"Database schema is at {sorted(revision.current)}, expected {sorted(revision.heads)}"
+        )
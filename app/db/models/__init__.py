@@ -1,5 +1,9 @@
 from .account import Account
 from .payment import Payment
+from .payment_outbox import OutboxCheckpoint, PaymentOutbox
+from .payment_transaction import PaymentTransaction
 from .user import User, UserRole
+from .user_deletion_job import UserDeletionJob
 
-__all__ = ["User", "Account", "Payment", "UserRole"]
+__all__ = ["User", "Account", "Payment", "PaymentTransaction", "PaymentOutbox", "OutboxCheckpoint", "UserRole",
+           "UserDeletionJob"]
@@ -1,8 +1,9 @@
 from _decimal import Decimal
-from sqlalchemy import Column, BigInteger, Numeric, DateTime, ForeignKey
+from sqlalchemy import Column, BigInteger, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
+from app.core.money import from_minor_units
 from app.db.session import Base
 
 
@@ -12,17 +13,25 @@ class Account(Base):
 
     Each account has a balance and is associated with a single user.
     Users can have multiple accounts.
+    The balance is stored in minor units, see ``app.core.money``.
     """
     __tablename__ = "accounts"
 
-    id = Column(BigInteger, primary_key=True, index=True)
-    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    balance = Column(Numeric(scale=2), default=Decimal('0.00'), nullable=False)
+    # The primary key index already covers lookups by id; index=True would add a duplicate B-tree
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    balance_minor = Column(BigInteger, default=0, server_default="0", nullable=False)
+    # Incremented with every balance change, orders balance updates sent to clients
+    balance_version = Column(BigInteger, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     user = relationship("User", back_populates="accounts")
     payments = relationship("Payment", back_populates="account")
 
+    @property
+    def balance(self) -> Decimal:
+        return from_minor_units(self.balance_minor or 0)
+
     def __repr__(self):
         return f"<Account(id={self.id}, user_id={self.user_id}, balance={self.balance})>"
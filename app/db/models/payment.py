@@ -1,8 +1,11 @@
-from sqlalchemy import Column, BigInteger, Numeric, DateTime, ForeignKey
+from decimal import Decimal
+
+from sqlalchemy import Column, BigInteger, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
+from app.core.money import from_minor_units
 from app.db.session import Base
 
 
@@ -13,18 +16,30 @@ class Payment(Base):
     Each payment is associated with a user and an account.
     Financial records must be preserved even if the user or account is deleted.
     Therefore, foreign keys use SET NULL to maintain the record while allowing deletion.
+
+    The table is range-partitioned by month on ``created_at`` (see ``app.db.partitions``),
+    so the partition key is part of the primary key. Global uniqueness of
+    ``transaction_id`` is enforced by ``PaymentTransaction``.
+    The amount is stored in minor units, see ``app.core.money``.
     """
     __tablename__ = "payments"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+    # created_at comes back via RETURNING on insert instead of a refresh query
+    __mapper_args__ = {"eager_defaults": True}
 
     # transaction_id = Column(Text, primary_key=True, index=True)
-    transaction_id = Column(PG_UUID(as_uuid=True), primary_key=True, index=True)
-    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"))
-    account_id = Column(BigInteger, ForeignKey("accounts.id", ondelete="SET NULL"))
-    amount = Column(Numeric(scale=2), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    transaction_id = Column(PG_UUID(as_uuid=True), primary_key=True)
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"), index=True)
+    account_id = Column(BigInteger, ForeignKey("accounts.id", ondelete="SET NULL"), index=True)
+    amount_minor = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 
     user = relationship("User", back_populates="payments")
     account = relationship("Account", back_populates="payments")
 
+    @property
+    def amount(self) -> Decimal:
+        return from_minor_units(self.amount_minor)
+
     def __repr__(self):
         return f"<Payment(transaction_id='{self.transaction_id}', amount={self.amount}, account_id={self.account_id})>"
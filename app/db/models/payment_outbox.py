@@ -0,0 +1,40 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from app.db.session import Base
+
+
+class PaymentOutbox(Base):
+    """
+    Payment event written in the same transaction as the payment itself.
+
+    ``scripts.outbox_relay`` streams the rows to downstream systems in
+    ``(txid, id)`` order. ``txid`` is the id of the writing transaction. The
+    relay only reads rows of transactions older than every transaction still
+    running, so a row can never show up behind its checkpoint.
+    """
+    __tablename__ = "payment_outbox"
+    __table_args__ = (Index("ix_payment_outbox_position", "txid", "id"),)
+
+    id = Column(BigInteger, primary_key=True)
+    txid = Column(BigInteger, nullable=False, server_default=text("pg_current_xact_id()::text::bigint"))
+    event_type = Column(String(64), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<PaymentOutbox(id={self.id}, event_type='{self.event_type}')>"
+
+
+class OutboxCheckpoint(Base):
+    """Position of each relay consumer in ``payment_outbox``."""
+    __tablename__ = "outbox_checkpoints"
+
+    consumer = Column(Text, primary_key=True)
+    txid = Column(BigInteger, nullable=False)
+    outbox_id = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<OutboxCheckpoint(consumer='{self.consumer}', txid={self.txid}, outbox_id={self.outbox_id})>"
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DateTime
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+from app.db.session import Base
+
+
+class PaymentTransaction(Base):
+    """
+    Dedupe record of a processed payment transaction.
+
+    ``payments`` is partitioned by month, so its primary key cannot guarantee
+    that a ``transaction_id`` is unique across partitions. This slim table does,
+    and it is never archived, so duplicates are detected even for payments
+    whose partition has been detached. ``created_at`` points to the partition
+    holding the payment.
+    """
+    __tablename__ = "payment_transactions"
+
+    transaction_id = Column(PG_UUID(as_uuid=True), primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<PaymentTransaction(transaction_id='{self.transaction_id}', created_at={self.created_at})>"
@@ -18,16 +18,21 @@ class User(Base):
     Represents a user of the system.
 
     Users can have multiple accounts and can be either regular users or administrators.
+    A user with ``deleted_at`` set is being deleted in the background
+    (``UserDeletionJob``) and is treated as not existing.
     """
     __tablename__ = "users"
 
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    # The primary key index already covers lookups by id; index=True would add a duplicate B-tree
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
     full_name = Column(String(100), nullable=True)
     role = Column(SQLEnum(UserRole, name="userrole"), default=UserRole.USER, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set when deletion is requested; the row itself is removed by the deletion job
+    deleted_at = Column(DateTime(timezone=True))
 
     accounts = relationship("Account", back_populates="user", cascade="all, delete-orphan")
     payments = relationship("Payment", back_populates="user")
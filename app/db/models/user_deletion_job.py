@@ -0,0 +1,42 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text, text
+from sqlalchemy.sql import func
+
+from app.db.session import Base
+
+
+class UserDeletionJob(Base):
+    """
+    Background deletion of a user marked deleted, see ``app.db.deletion``.
+
+    The job detaches the user's payments, then deletes the accounts and
+    finally the user, each in batches of bounded size. ``phase`` and the
+    counters show its progress. A worker holds a job until ``locked_until``;
+    a job whose worker died is picked up again after that.
+    """
+    __tablename__ = "user_deletion_jobs"
+    __table_args__ = (
+        Index("ix_user_deletion_jobs_open", "id", postgresql_where=text("status IN ('pending', 'running')")),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    # No foreign key: the user row is gone when the job is done
+    user_id = Column(BigInteger, nullable=False, index=True)
+    email = Column(String(255), nullable=False)
+    requested_by = Column(BigInteger)
+    status = Column(String(16), nullable=False, server_default="pending")
+    phase = Column(String(16), nullable=False, server_default="payments")
+    payments_total = Column(BigInteger)
+    payments_detached = Column(BigInteger, nullable=False, server_default="0")
+    accounts_total = Column(BigInteger)
+    accounts_deleted = Column(BigInteger, nullable=False, server_default="0")
+    batches = Column(Integer, nullable=False, server_default="0")
+    attempts = Column(Integer, nullable=False, server_default="0")
+    last_error = Column(Text)
+    locked_until = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<UserDeletionJob(id={self.id}, user_id={self.user_id}, status='{self.status}')>"
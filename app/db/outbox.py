@@ -0,0 +1,56 @@
+"""
+Transactional outbox of payment events.
+
+The webhook inserts the event in the transaction that books the payment,
+as a CTE of the balance update (``queries.credit_account_with_event``), so
+it commits or rolls back with the payment and adds no round trip. After the
+commit, ``outbox_notifier`` wakes the relay. The wake-ups of all
+commits within ``OUTBOX_NOTIFY_BATCH_MS`` are coalesced into one
+notification, sent outside the transaction.
+"""
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import OUTBOX_CHANNEL, OUTBOX_NOTIFY_BATCH_MS
+from app.db.listener import NotifyPublisher
+from app.db.models import Payment
+
+PAYMENT_CREATED = "payment.created"
+SESSION_FLAG = "outbox_written"
+
+# The relay reads from its checkpoint, the payload only wakes it up
+outbox_notifier = NotifyPublisher(OUTBOX_CHANNEL, OUTBOX_NOTIFY_BATCH_MS, lambda _: "")
+
+
+def payment_event(payment: Payment) -> dict:
+    return {
+        "transaction_id": str(payment.transaction_id),
+        "user_id": payment.user_id,
+        "account_id": payment.account_id,
+        "amount_minor": payment.amount_minor,
+        "created_at": payment.created_at.isoformat(),
+    }
+
+
+def wake_relay_after_commit(db: AsyncSession) -> None:
+    """
+    Notify the relay once the current transaction commits.
+
+    Args:
+        db: Session whose transaction wrote outbox events
+    """
+    db.sync_session.info[SESSION_FLAG] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_committed(session: Session) -> None:
+    # Released savepoints fire after_commit too
+    if not session.in_nested_transaction() and session.info.pop(SESSION_FLAG, False):
+        outbox_notifier.enqueue()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    if not session.in_nested_transaction():
+        session.info.pop(SESSION_FLAG, None)
@@ -0,0 +1,177 @@
+"""
+Monthly range partitions of the ``payments`` table.
+
+Functions take a synchronous ``Connection`` so they can be used from Alembic
+migrations directly and from async code via ``AsyncConnection.run_sync``.
+"""
+from datetime import date, datetime, time, timezone
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+PAYMENTS_TABLE = "payments"
+DEFAULT_PARTITION = "payments_default"
+PARTITION_NAME_RE = re.compile(r"^payments_(\d{4})_(\d{2})$")
+
+# Serializes partition maintenance between workers starting at the same time.
+PARTITION_LOCK_ID = 7_302_019
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"payments_{month:%Y_%m}"
+
+
+def list_payment_partitions(conn: Connection) -> dict[str, Optional[date]]:
+    """
+    Return attached partitions of ``payments``.
+
+    Returns:
+        dict: Partition name mapped to the first day of its month
+            (``None`` for the default partition)
+    """
+    rows = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:table AS regclass)
+        ORDER BY c.relname
+    """), {"table": PAYMENTS_TABLE}).scalars()
+
+    partitions = {}
+    for name in rows:
+        match = PARTITION_NAME_RE.match(name)
+        partitions[name] = date(int(match[1]), int(match[2]), 1) if match else None
+    return partitions
+
+
+def create_payment_partition(conn: Connection, month: date) -> str:
+    """
+    Create and attach the partition for ``month``.
+
+    Rows of that month that already landed in the default partition are
+    moved into the new partition before it is attached.
+
+    Args:
+        conn: Connection inside a transaction
+        month: Any day of the month to create
+
+    Returns:
+        str: Name of the created partition
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    # Partition bounds are UTC month boundaries regardless of the server time zone
+    bounds = {
+        "start": datetime.combine(month, time.min, timezone.utc),
+        "end": datetime.combine(add_months(month, 1), time.min, timezone.utc),
+    }
+
+    conn.execute(text(
+        f"CREATE TABLE {name} (LIKE {PAYMENTS_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    ))
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE created_at >= :start AND created_at < :end
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), bounds)
+    conn.execute(text(
+        f"ALTER TABLE {PAYMENTS_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+    logger.info(f"Created payments partition {name}")
+    return name
+
+
+def ensure_payment_partitions(
+        conn: Connection,
+        months_ahead: int,
+        since: Optional[date] = None,
+) -> list[str]:
+    """
+    Create missing monthly partitions from ``since`` up to ``months_ahead`` months from now.
+
+    Args:
+        conn: Connection inside a transaction
+        months_ahead: How many future months must have a partition
+        since: First month to cover (defaults to the current month)
+
+    Returns:
+        list[str]: Names of the partitions that were created
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITION_LOCK_ID})
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PAYMENTS_TABLE} DEFAULT"))
+
+    current = month_start(datetime.now(timezone.utc).date())
+    month = month_start(since) if since else current
+    last = add_months(current, months_ahead)
+    existing = set(list_payment_partitions(conn).values())
+
+    created = []
+    while month <= last:
+        if month not in existing:
+            created.append(create_payment_partition(conn, month))
+        month = add_months(month, 1)
+    return created
+
+
+def archive_payment_partitions(
+        conn: Connection,
+        older_than_months: int,
+        archive_schema: str,
+        dry_run: bool = False,
+        lock_timeout: str = "5s",
+) -> list[str]:
+    """
+    Detach monthly partitions older than the cutoff and move them to ``archive_schema``.
+
+    Detached partitions keep their data, but the rows are no longer visible
+    through ``payments``. Dedupe keeps working because ``payment_transactions``
+    is never archived.
+
+    ``DETACH ... CONCURRENTLY`` is not allowed while a default partition exists,
+    so a plain (metadata-only) detach is used; ``lock_timeout`` makes it give up
+    instead of queueing webhook inserts behind its lock.
+
+    Args:
+        conn: Connection inside a transaction
+        older_than_months: Partitions whose month ends before
+            ``current month - older_than_months`` are archived
+        archive_schema: Target schema for detached partitions
+        dry_run: Only report what would be archived
+        lock_timeout: Maximal wait for the lock on ``payments``
+
+    Returns:
+        list[str]: Names of archived partitions
+    """
+    cutoff = add_months(month_start(datetime.now(timezone.utc).date()), -older_than_months)
+    candidates = [
+        name for name, month in list_payment_partitions(conn).items()
+        if month is not None and month < cutoff
+    ]
+    if dry_run:
+        return candidates
+
+    conn.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+    for name in candidates:
+        conn.execute(text(f"ALTER TABLE {PAYMENTS_TABLE} DETACH PARTITION {name}"))
+        conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
+        logger.info(f"Archived payments partition {name} to schema {archive_schema}")
+    return candidates
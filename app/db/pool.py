@@ -0,0 +1,167 @@
+from collections import deque
+import logging
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Connection-pool statistics of the current process."""
+
+    def __init__(self, window: int = 2048):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.peak_in_use = 0
+        self.peak_overflow = 0
+        self.pings = 0
+        self.stale_connections = 0
+        self._waits = deque(maxlen=window)
+        self._engine = None
+
+    def bind(self, engine) -> None:
+        """Attach the engine whose live pool counters are reported in snapshots."""
+        self._engine = engine
+
+    def record_checkout(self, wait: float, in_use: int, overflow: int) -> None:
+        self.checkouts += 1
+        self._waits.append(wait)
+        self.peak_in_use = max(self.peak_in_use, in_use)
+        self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_timeout(self) -> None:
+        self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        """Return current counters and checkout wait percentiles (milliseconds)."""
+        waits = list(self._waits)
+        pool = self._engine.pool if self._engine is not None else None
+        return {
+            "pool_size": pool.size() if pool else 0,
+            "in_use": pool.checkedout() if pool else 0,
+            "idle": pool.checkedin() if pool else 0,
+            "overflow": max(0, pool.overflow()) if pool else 0,
+            "peak_in_use": self.peak_in_use,
+            "peak_overflow": self.peak_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "pings": self.pings,
+            "stale_connections": self.stale_connections,
+            "wait_p50_ms": round(percentile(waits, 50) * 1000, 3),
+            "wait_p95_ms": round(percentile(waits, 95) * 1000, 3),
+            "wait_max_ms": round(max(waits, default=0.0) * 1000, 3),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that reports checkout latency, usage and timeouts to ``pool_metrics``."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_timeout()
+            logger.warning(
+                f"Connection pool timeout: {self.checkedout()} in use, overflow {self.overflow()}"
+            )
+            raise
+
+        pool_metrics.record_checkout(
+            time.perf_counter() - started,
+            self.checkedout(),
+            max(0, self.overflow()),
+        )
+        return connection
+
+
+def install_idle_pre_ping(engine, idle_seconds: float) -> None:
+    """
+    Ping a pooled connection on checkout only if it has been idle for a while.
+
+    Connections that were returned to the pool recently are handed out without
+    the extra round trip of ``pool_pre_ping``. A failed ping raises
+    ``DisconnectionError`` so the pool replaces the connection transparently.
+
+    Args:
+        engine: Async engine whose pool is instrumented
+        idle_seconds: Minimal idle time that triggers a ping
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "checkin")
+    def remember_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkout")
+    def ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+
+        pool_metrics.pings += 1
+        try:
+            sync_engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            pool_metrics.stale_connections += 1
+            raise exc.DisconnectionError(f"Idle connection failed pre-ping: {e}") from e
+
+
+def budget_pool_limits(
+        budget: int,
+        workers: int,
+        reserved_per_worker: int,
+        pool_size: int,
+        max_overflow: int,
+) -> tuple[int, int]:
+    """
+    Split a global connection budget into per-worker pool limits.
+
+    Every worker gets an equal share of ``budget`` minus the connections it
+    holds outside the pool (e.g. a LISTEN connection). The share is divided
+    between the steady pool and overflow in the configured proportion, and
+    never exceeds the configured limits.
+
+    Args:
+        budget: Connections all workers together may open, 0 disables budgeting
+        workers: Number of worker processes
+        reserved_per_worker: Connections per worker that don't come from the pool
+        pool_size: Configured ``DB_POOL_SIZE``
+        max_overflow: Configured ``DB_MAX_OVERFLOW``
+
+    Returns:
+        tuple[int, int]: ``pool_size`` and ``max_overflow`` for one worker
+
+    Raises:
+        ValueError: If a limit is negative, ``pool_size`` is 0 (no limit in
+            SQLAlchemy), or the budget can't give every worker at least one
+            pooled connection
+    """
+    if pool_size < 1 or max_overflow < 0:
+        raise ValueError(
+            f"DB_POOL_SIZE must be at least 1 and DB_MAX_OVERFLOW at least 0, "
+            f"got {pool_size} and {max_overflow}"
+        )
+    if budget < 0 or workers < 1:
+        raise ValueError(
+            f"DB_CONNECTION_BUDGET must be at least 0 and WEB_CONCURRENCY at least 1, got {budget} and {workers}"
+        )
+    if budget == 0:
+        return pool_size, max_overflow
+
+    share = budget // workers - reserved_per_worker
+    if share < 1:
+        raise ValueError(
+            f"DB_CONNECTION_BUDGET={budget} is too small for {workers} workers "
+            f"with {reserved_per_worker} reserved connections each"
+        )
+    share = min(share, pool_size + max_overflow)
+    worker_pool_size = max(1, share * pool_size // (pool_size + max_overflow))
+    return worker_pool_size, share - worker_pool_size
@@ -0,0 +1,111 @@
+"""
+Per-request SQL profiling.
+
+``install_query_profiling`` times every statement of an engine with the
+``before_cursor_execute``/``after_cursor_execute`` events. The time is added
+to the ``QueryProfile`` of the current request, which
+``QueryProfilingMiddleware`` keeps in the ``current_profile`` context
+variable. SQLAlchemy runs the events in a greenlet that shares the context
+of the awaiting task, so the statements of the request's session are
+attributed to it. Statements outside a request, e.g. of background workers,
+are only checked against the slow-query threshold.
+"""
+from contextvars import ContextVar
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text written to the log
+MAX_LOGGED_STATEMENT = 1000
+
+
+def shorten(statement: Optional[str]) -> str:
+    statement = " ".join((statement or "").split())
+    if len(statement) > MAX_LOGGED_STATEMENT:
+        return statement[:MAX_LOGGED_STATEMENT] + "..."
+    return statement
+
+
+class QueryProfile:
+    """
+    Statements of one request.
+
+    Args:
+        label: Request the profile belongs to, e.g. ``GET /api/users/me``
+        repeat_threshold: Executions of one statement above which it is
+            reported as a likely N+1 query; 0 disables the check
+    """
+
+    __slots__ = ("label", "repeat_threshold", "statements", "total", "slowest", "slowest_statement", "shapes")
+
+    def __init__(self, label: str, repeat_threshold: int = 0):
+        self.label = label
+        self.repeat_threshold = repeat_threshold
+        self.statements = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+        # Executions per SQL string; parameters are bound, so the string is the statement's shape
+        self.shapes: dict[str, int] = {}
+
+    def record(self, statement: str, duration: float) -> None:
+        self.statements += 1
+        self.total += duration
+        if duration > self.slowest:
+            self.slowest = duration
+            self.slowest_statement = statement
+        if self.repeat_threshold:
+            self.shapes[statement] = self.shapes.get(statement, 0) + 1
+
+    def repeated(self) -> list[tuple[str, int]]:
+        """Statements executed more than ``repeat_threshold`` times, most frequent first."""
+        return sorted(
+            ((statement, count) for statement, count in self.shapes.items() if count > self.repeat_threshold),
+            key=lambda item: -item[1],
+        )
+
+    def server_timing(self) -> bytes:
+        """Value of a ``Server-Timing`` header with the time spent in the database."""
+        return f'db;dur={self.total * 1000:.1f};desc="{self.statements} statements"'.encode()
+
+    def report(self) -> None:
+        """Log the request's summary at debug level and its repeated statements as warnings."""
+        for statement, count in self.repeated():
+            logger.warning(f"{self.label}: statement executed {count} times, likely an N+1 query: "
+                           f"{shorten(statement)}")
+        if self.statements and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{self.label}: {self.statements} statements, {self.total * 1000:.1f} ms in database, "
+                         f"slowest {self.slowest * 1000:.1f} ms: {shorten(self.slowest_statement)}")
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+
+
+def install_query_profiling(engine, slow_query_seconds: float) -> None:
+    """
+    Time every statement of ``engine`` and attribute it to the current request.
+
+    Args:
+        engine: Async engine to instrument
+        slow_query_seconds: Statements running at least this long are logged
+            with a warning; 0 disables the slow-query log
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        context.query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context.query_started
+        profile = current_profile.get()
+        if profile is not None:
+            profile.record(statement, duration)
+        if slow_query_seconds and duration >= slow_query_seconds:
+            request = f" in {profile.label}" if profile is not None else ""
+            logger.warning(f"Slow query{request} ({duration * 1000:.0f} ms): {shorten(statement)}")
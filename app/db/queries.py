@@ -0,0 +1,177 @@
+"""
+Hot-path statements defined once as lambda statements.
+
+``lambda_stmt`` caches the constructed statement and its cache key by the
+lambda's code location, so each request only binds new parameter values
+instead of rebuilding and re-hashing the ``select()``/``update()``.
+The compiled SQL string stays identical between calls, which also lets
+asyncpg reuse the statement prepared on the pooled connection.
+"""
+from sqlalchemy import String, any_, bindparam, delete, insert, lambda_stmt, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.dialects.postgresql.dml import Insert
+from sqlalchemy.sql.dml import Update
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from app.db.models import Account, Payment, PaymentOutbox, PaymentTransaction, User
+
+
+def user_by_id(user_id: int) -> StatementLambdaElement:
+    """User by id; users being deleted are not found."""
+    return lambda_stmt(lambda: select(User).where(User.id == user_id, User.deleted_at.is_(None)))
+
+
+def user_by_email(email: str) -> StatementLambdaElement:
+    """User by email, including users being deleted: their email stays taken until the row is gone."""
+    return lambda_stmt(lambda: select(User).where(User.email == email))
+
+
+def registered_emails(emails: list[str]) -> StatementLambdaElement:
+    """Emails of ``emails`` that belong to a user; one array parameter for any number of emails."""
+    emails_param = bindparam("emails", emails, type_=ARRAY(String))
+    return lambda_stmt(lambda: select(User.email).where(User.email == any_(emails_param)))
+
+
+def insert_user(email: str, hashed_password: str, full_name: str, role: str) -> StatementLambdaElement:
+    """
+    INSERT of one user that returns it, or nothing if the email is taken.
+
+    The single-row form of ``insert_users``: a multi-row ``values()`` is
+    compiled again on every call, this one is cached.
+    """
+    # Bound with the column type; as a closure variable it would be sent as VARCHAR
+    role_param = bindparam("role", role, type_=User.role.type)
+    # from_statement() makes the RETURNING rows User objects; inside a lambda
+    # statement the bare INSERT would return plain column rows
+    return lambda_stmt(
+        lambda: select(User).from_statement(
+            pg_insert(User)
+            .values(email=email, hashed_password=hashed_password, full_name=full_name, role=role_param)
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User)
+        )
+    )
+
+
+def insert_users(rows: list[dict]) -> Insert:
+    """
+    Multi-row INSERT of users that skips taken emails and returns the created users.
+
+    Not a lambda statement: the SQL changes with the number of rows.
+    """
+    return (
+        pg_insert(User)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
+    )
+
+
+def update_user_fields(user_id: int, values: dict) -> Update:
+    """
+    UPDATE of a user that returns the updated user; users being deleted are not matched.
+
+    Not a lambda statement: the SET clause changes with the updated fields.
+    """
+    return (
+        update(User)
+        .where(User.id == user_id, User.deleted_at.is_(None))
+        .values(**values)
+        .returning(User)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+
+
+def delete_user_by_id(user_id: int) -> StatementLambdaElement:
+    """DELETE of a user that returns its id, so a missing user needs no extra lookup."""
+    return lambda_stmt(
+        lambda: delete(User)
+        .where(User.id == user_id, User.deleted_at.is_(None))
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def users_with_accounts_export() -> StatementLambdaElement:
+    """Every user with each of their accounts, one row per account and users without accounts once."""
+    return lambda_stmt(
+        lambda: select(
+            User.id, User.email, User.full_name, User.role, User.created_at, Account.id, Account.balance_minor
+        )
+        .outerjoin(Account, Account.user_id == User.id)
+        .where(User.deleted_at.is_(None))
+        .order_by(User.id, Account.id)
+    )
+
+
+def account_by_id(account_id: int) -> StatementLambdaElement:
+    """Account by id; accounts of users being deleted are not found."""
+    return lambda_stmt(
+        lambda: select(Account)
+        .join(User, User.id == Account.user_id)
+        .where(Account.id == account_id, User.deleted_at.is_(None))
+    )
+
+
+def accounts_by_user(user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(Account).where(Account.user_id == user_id))
+
+
+def payments_by_user(user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(Payment).where(Payment.user_id == user_id))
+
+
+def payment_by_transaction(transaction_id, created_at) -> StatementLambdaElement:
+    # created_at lets the planner prune the lookup to a single monthly partition
+    return lambda_stmt(
+        lambda: select(Payment)
+        .where(Payment.transaction_id == transaction_id, Payment.created_at == created_at)
+    )
+
+
+def claim_transaction(transaction_id) -> StatementLambdaElement:
+    """Insert the dedupe record; returns ``created_at`` only if the transaction is new."""
+    return lambda_stmt(
+        lambda: pg_insert(PaymentTransaction)
+        .values(transaction_id=transaction_id)
+        .on_conflict_do_nothing(index_elements=[PaymentTransaction.transaction_id])
+        .returning(PaymentTransaction.created_at)
+    )
+
+
+def transaction_created_at(transaction_id) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(PaymentTransaction.created_at)
+        .where(PaymentTransaction.transaction_id == transaction_id)
+    )
+
+
+def credit_account(account_id: int, amount_minor: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: update(Account)
+        .where(Account.id == account_id)
+        .values(balance_minor=Account.balance_minor + amount_minor, balance_version=Account.balance_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def credit_account_with_event(
+        account_id: int,
+        amount_minor: int,
+        event_type: str,
+        payload: dict,
+) -> StatementLambdaElement:
+    """
+    ``credit_account`` that also writes an outbox event; returns the new balance and its version.
+
+    The event INSERT runs as a data-modifying CTE of the UPDATE, so it shares
+    the statement's round trip.
+    """
+    return lambda_stmt(
+        lambda: update(Account)
+        .where(Account.id == account_id)
+        .values(balance_minor=Account.balance_minor + amount_minor, balance_version=Account.balance_version + 1)
+        .add_cte(insert(PaymentOutbox).values(event_type=event_type, payload=payload).cte("outbox_event"))
+        .returning(Account.balance_minor, Account.balance_version)
+        .execution_options(synchronize_session=False)
+    )
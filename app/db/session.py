@@ -1,15 +1,68 @@
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
-from app.core.config import DATABASE_URL
+from app.core.config import (
+    DATABASE_URL,
+    DB_SESSION_MODE,
+    DB_APPLICATION_NAME,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_POOL_PRE_PING_IDLE_SECONDS,
+    DB_QUERY_CACHE_SIZE,
+    DB_PREPARED_STATEMENT_CACHE_SIZE,
+    WEB_CONCURRENCY,
+    DB_CONNECTION_BUDGET,
+    CACHE_ENABLED,
+    SSE_ENABLED,
+    SSE_FANOUT,
+    SQL_PROFILING_ENABLED,
+    SQL_SLOW_QUERY_MS,
+)
+from app.db.pool import InstrumentedAsyncPool, budget_pool_limits, install_idle_pre_ping, pool_metrics
+from app.db.profiling import install_query_profiling
+
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Connections a worker opens outside the pool: the LISTEN connection shared by
+# cache invalidation and the balance event fan-out
+RESERVED_CONNECTIONS = 1 if CACHE_ENABLED or (SSE_ENABLED and SSE_FANOUT == "notify") else 0
+
+POOL_SIZE, MAX_OVERFLOW = budget_pool_limits(
+    DB_CONNECTION_BUDGET, WEB_CONCURRENCY, RESERVED_CONNECTIONS, DB_POOL_SIZE, DB_MAX_OVERFLOW
+)
 
 engine = create_async_engine(
     DATABASE_URL,
     # echo=True,
-    pool_size=20,
-    max_overflow=10,
-    pool_pre_ping=True,
+    poolclass=InstrumentedAsyncPool,
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING == "always",
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+    connect_args={
+        "server_settings": {"application_name": DB_APPLICATION_NAME},
+        # Prepared statements are cached per pooled connection and reused
+        # for every execution of the same SQL on that connection.
+        "prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE_SIZE,
+    },
 )
+pool_metrics.bind(engine)
+
+if DB_POOL_PRE_PING == "idle":
+    install_idle_pre_ping(engine, DB_POOL_PRE_PING_IDLE_SECONDS)
+
+if SQL_PROFILING_ENABLED:
+    install_query_profiling(engine, SQL_SLOW_QUERY_MS / 1000)
+
+# Shares the pool with ``engine``; connections checked out through it skip
+# BEGIN/COMMIT entirely, which is all a read-only request needs.
+read_only_engine = engine.execution_options(isolation_level="AUTOCOMMIT")
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -20,17 +73,38 @@ AsyncSessionLocal = sessionmaker(
 Base = declarative_base()
 
 
-async def get_db() -> AsyncSession:
+def asyncpg_dsn() -> str:
+    """Return DATABASE_URL in the form accepted by ``asyncpg.connect``."""
+    return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+async def get_db(request: Request) -> AsyncSession:
     """
     Async session generator that handles automatic:
     - Commit on success
     - Rollback on failure
     - Session closing
+
+    FastAPI caches the dependency per request, so ``get_current_user`` and the
+    endpoint share one session. The session checks out a pool connection only
+    when the first statement runs.
+
+    In ``lazy`` mode (``DB_SESSION_MODE``) read-only requests are served by an
+    autocommit connection, and write requests skip COMMIT when no statement
+    was executed. ``transactional`` mode keeps the classic behaviour.
     """
+    lazy = DB_SESSION_MODE == "lazy"
+
+    if lazy and request.method in READ_ONLY_METHODS:
+        async with AsyncSessionLocal(bind=read_only_engine) as session:
+            yield session
+        return
+
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
+            if not lazy or session.in_transaction():
+                await session.commit()
         except Exception:
             await session.rollback()
             raise
@@ -1,11 +1,21 @@
-from _decimal import Decimal
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import update
 import hashlib
 import hmac
 import logging
 
-from app.db.models import Account, Payment, User
+from app.core.cache import accounts_key, publish_invalidation
+from app.core.events import publish_balance
+from app.core.money import to_minor_units
+from app.db.models import Account, Payment
+from app.db.outbox import PAYMENT_CREATED, payment_event, wake_relay_after_commit
+from app.db.queries import (
+    account_by_id,
+    claim_transaction,
+    credit_account_with_event,
+    payment_by_transaction,
+    transaction_created_at,
+    user_by_id,
+)
 from app.schemas.payment import WebhookResponse
 
 logger = logging.getLogger(__name__)
@@ -19,6 +29,9 @@ class WebhookService:
         """
         Verify webhook signature using HMAC-SHA256.
 
+        The amount is signed in its float string form (``100.5``, ``100.0``),
+        which is what payment systems have been signing all along.
+
         Args:
             payload: Webhook payload data
             received_signature: Signature received from webhook
@@ -30,7 +43,7 @@ class WebhookService:
         try:
             signature_data = ''.join([
                 str(payload['account_id']),
-                str(payload['amount']),
+                str(float(payload['amount'])),
                 str(payload['transaction_id']),
                 str(payload['user_id']),
                 secret_key
@@ -47,6 +60,40 @@ class WebhookService:
             logger.error(f"Error verifying signature: {e}")
             return False
 
+    @staticmethod
+    async def get_processed_transaction(db: AsyncSession, payload: dict) -> WebhookResponse:
+        """
+        Build the response for a transaction that was already processed.
+
+        Args:
+            db: Database session
+            payload: Webhook payload data
+
+        Returns:
+            WebhookResponse: Stored payment data, or the payload data if the
+                payment's partition has been archived
+        """
+        result = await db.execute(transaction_created_at(payload['transaction_id']))
+        created_at = result.scalar_one()
+
+        result = await db.execute(payment_by_transaction(payload['transaction_id'], created_at))
+        existing_payment = result.scalar_one_or_none()
+        if existing_payment is None:
+            return WebhookResponse(
+                **{key: payload[key] for key in ('transaction_id', 'user_id', 'account_id', 'amount')},
+                created_at=created_at,
+                message="Transaction already processed"
+            )
+
+        return WebhookResponse(
+            transaction_id=payload['transaction_id'],
+            user_id=existing_payment.user_id,
+            account_id=existing_payment.account_id,
+            amount=existing_payment.amount,
+            created_at=existing_payment.created_at,
+            message="Transaction already processed"
+        )
+
     @staticmethod
     async def process_webhook(
             db: AsyncSession,
@@ -70,20 +117,16 @@ class WebhookService:
         if not WebhookService.verify_signature(payload, payload['signature'], secret_key):
             raise ValueError("Invalid signature")
 
-        existing_payment = await db.get(Payment, payload['transaction_id'])
-        if existing_payment:
-            return WebhookResponse(
-                transaction_id=payload['transaction_id'],
-                user_id=existing_payment.user_id,
-                account_id=existing_payment.account_id,
-                amount=existing_payment.amount,
-                created_at=existing_payment.created_at,
-                message="Transaction already processed"
-            )
+        result = await db.execute(claim_transaction(payload['transaction_id']))
+        created_at = result.scalar_one_or_none()
+        if created_at is None:
+            return await WebhookService.get_processed_transaction(db, payload)
 
-        account = await db.get(Account, payload['account_id'])
+        result = await db.execute(account_by_id(payload['account_id']))
+        account = result.scalar_one_or_none()
         if not account:
-            user = await db.get(User, payload['user_id'])
+            result = await db.execute(user_by_id(payload['user_id']))
+            user = result.scalar_one_or_none()
             if not user:
                 raise ValueError(f"User with ID {payload['user_id']} not found")
 
@@ -94,22 +137,23 @@ class WebhookService:
             db.add(account)
             logger.info(f"Created new account {account.id} for user {user.id}")
 
+        amount_minor = to_minor_units(payload['amount'])
         payment = Payment(
             transaction_id=payload['transaction_id'],
             user_id=payload['user_id'],
             account_id=payload['account_id'],
-            amount=payload['amount'],
+            amount_minor=amount_minor,
+            created_at=created_at,
         )
         db.add(payment)
 
-        amount = Decimal(str(payload['amount'])).quantize(Decimal('0.01'))
-        await db.execute(
-            update(Account)
-            .where(Account.id == payload['account_id'])
-            .values(balance=Account.balance + amount)
-        )
-
-        await db.refresh(payment)
+        result = await db.execute(credit_account_with_event(
+            payload['account_id'], amount_minor, PAYMENT_CREATED, payment_event(payment)
+        ))
+        balance_minor, balance_version = result.one()
+        wake_relay_after_commit(db)
+        publish_invalidation(db, [accounts_key(account.user_id)])
+        publish_balance(db, account.user_id, account.id, balance_minor, balance_version)
 
         logger.info(f"Processed payment {payload['transaction_id']} for account {account.id}")
 
@@ -1,16 +1,61 @@
 from collections import defaultdict
 
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
-from typing import Optional
+from sqlalchemy import func, select, update
+from typing import AsyncIterator, Optional
 import logging
 
-from app.db.models import Account, User
-from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash
+from app.core.cache import accounts_key, publish_invalidation, user_key
+from app.core.config import (
+    USERS_EXPORT_BATCH_ROWS,
+    USERS_IMPORT_CHUNK_ROWS,
+    USERS_IMPORT_MAX_ERRORS,
+    USERS_IMPORT_MAX_RECORD_LENGTH,
+)
+from app.core.csv_io import CsvFormatError, format_csv_rows, read_csv_records
+from app.core.money import from_minor_units
+from app.db.deletion import create_deletion_job
+from app.db.models import Account, User, UserDeletionJob
+from app.db.queries import (
+    delete_user_by_id,
+    insert_user,
+    insert_users,
+    registered_emails,
+    update_user_fields,
+    user_by_email,
+    user_by_id,
+    users_with_accounts_export,
+)
+from app.db.session import engine, read_only_engine
+from app.schemas.user import (
+    UserBulkCreateResponse,
+    UserBulkResult,
+    UserBulkStatus,
+    UserCreate,
+    UserImportError,
+    UserImportResponse,
+    UserResponse,
+    UserUpdate,
+)
+from app.core.security import hash_passwords
 
 logger = logging.getLogger(__name__)
 
+# SQLSTATEs of constraint violations reported as invalid input
+NOT_NULL_VIOLATION = "23502"
+UNIQUE_VIOLATION = "23505"
+
+# 4 parameters per row, asyncpg allows at most 32767 per statement
+INSERT_CHUNK_ROWS = 5000
+
+EXPORT_COLUMNS = ["user_id", "email", "full_name", "role", "created_at", "account_id", "balance"]
+IMPORT_COLUMNS = ["email", "password", "full_name", "role"]
+IMPORT_REQUIRED_COLUMNS = {"email", "password", "full_name"}
+# Passwords are taken as they are: spaces around them are part of the password
+IMPORT_STRIPPED_COLUMNS = {"email", "full_name", "role"}
+
 
 class UserService:
     """Service layer for user management operations."""
@@ -18,13 +63,13 @@ class UserService:
     @staticmethod
     async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
         """Get user by ID."""
-        result = await db.execute(select(User).where(User.id == user_id))
+        result = await db.execute(user_by_id(user_id))
         return result.scalar_one_or_none()
 
     @staticmethod
     async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
         """Get user by email."""
-        result = await db.execute(select(User).where(User.email == email))
+        result = await db.execute(user_by_email(email))
         return result.scalar_one_or_none()
 
     @staticmethod
@@ -34,6 +79,7 @@ class UserService:
             select(User, Account)
             .outerjoin(Account,
                        User.id == Account.user_id)
+            .where(User.deleted_at.is_(None))
             .order_by(User.id)
             .offset(skip)
             .limit(limit)
@@ -54,53 +100,333 @@ class UserService:
 
     @staticmethod
     async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
-        """Create new user."""
-        existing_user = await UserService.get_user_by_email(db, user_data.email)
-        if existing_user:
-            raise ValueError(f"User with email {user_data.email} already exists")
+        """
+        Create new user with a single INSERT ... ON CONFLICT (email) DO NOTHING.
 
-        hashed_password = get_password_hash(user_data.password)
-        user = User(
-            email=user_data.email,
-            hashed_password=hashed_password,
-            full_name=user_data.full_name,
-            role=user_data.role.value
-        )
+        The unique email index decides whether the email is taken, so two
+        concurrent requests with the same email cannot both pass a check and
+        one of them fail on the INSERT.
+
+        Args:
+            db: Database session
+            user_data: User to create
+
+        Returns:
+            User: The created user
 
-        db.add(user)
-        await db.flush()
+        Raises:
+            ValueError: If a user with the email already exists
+        """
+        (hashed_password,) = await hash_passwords([user_data.password])
+        result = await db.execute(
+            insert_user(user_data.email, hashed_password, user_data.full_name, user_data.role.value)
+        )
+        user = result.scalar_one_or_none()
+        if user is None:
+            raise ValueError(f"User with email {user_data.email} already exists")
         return user
 
+    @staticmethod
+    async def create_users(db: AsyncSession, users: list[UserCreate]) -> UserBulkCreateResponse:
+        """
+        Create many users with one lookup and one INSERT per chunk of rows.
+
+        Items whose email is already registered, or used by an earlier item of
+        the same request, are reported and skipped; the others are created.
+        A user inserted concurrently with the same email is reported as
+        ``exists`` too, as the INSERT skips conflicting rows.
+
+        Does not commit: the lookup and the INSERTs run in the transaction of
+        ``db``. If ``db`` has no transaction open yet, the lookup runs on a
+        short-lived autocommit connection instead, so no connection is held
+        while the passwords are hashed; callers that want this end their
+        transaction before the call.
+
+        Args:
+            db: Database session
+            users: Users to create
+
+        Returns:
+            UserBulkCreateResponse: One result per item, in the order of ``users``
+        """
+        results: list[Optional[UserBulkResult]] = [None] * len(users)
+        first_index: dict[str, int] = {}
+        for index, user_data in enumerate(users):
+            email = user_data.email
+            if email in first_index:
+                results[index] = UserBulkResult(
+                    index=index, email=email, status=UserBulkStatus.DUPLICATE,
+                    detail=f"Email {email} is already used by item {first_index[email]}",
+                )
+            else:
+                first_index[email] = index
+
+        emails_query = registered_emails(list(first_index))
+        if db.in_transaction():
+            # The caller's transaction holds its connection through the hashing anyway
+            existing = set((await db.execute(emails_query)).scalars())
+        else:
+            # Short-lived connection, returned before the passwords are hashed
+            async with read_only_engine.connect() as conn:
+                existing = set((await conn.execute(emails_query)).scalars())
+
+        pending = []
+        for email, index in first_index.items():
+            if email in existing:
+                results[index] = UserBulkResult(
+                    index=index, email=email, status=UserBulkStatus.EXISTS,
+                    detail=f"User with email {email} already exists",
+                )
+            else:
+                pending.append(index)
+
+        hashed_passwords = await hash_passwords([users[index].password for index in pending])
+        rows = [
+            {
+                "email": users[index].email,
+                "hashed_password": hashed_password,
+                "full_name": users[index].full_name,
+                "role": users[index].role.value,
+            }
+            for index, hashed_password in zip(pending, hashed_passwords)
+        ]
+        created: dict[str, User] = {}
+        for start in range(0, len(rows), INSERT_CHUNK_ROWS):
+            result = await db.execute(insert_users(rows[start:start + INSERT_CHUNK_ROWS]))
+            created.update((user.email, user) for user in result.scalars())
+
+        for index in pending:
+            email = users[index].email
+            user = created.get(email)
+            if user is None:
+                results[index] = UserBulkResult(
+                    index=index, email=email, status=UserBulkStatus.EXISTS,
+                    detail=f"User with email {email} already exists",
+                )
+            else:
+                results[index] = UserBulkResult(
+                    index=index, email=email, status=UserBulkStatus.CREATED,
+                    user=UserResponse.model_validate(user),
+                )
+
+        logger.info(f"Bulk create: {len(created)} of {len(users)} users created")
+        return UserBulkCreateResponse(created=len(created), failed=len(users) - len(created), results=results)
+
+    @staticmethod
+    async def export_users_csv() -> AsyncIterator[bytes]:
+        """
+        Stream every user with their accounts as CSV, one row per account.
+
+        Rows are fetched from a server-side cursor ``USERS_EXPORT_BATCH_ROWS``
+        at a time, so memory does not grow with the number of users. The
+        cursor runs on its own connection, as the request's session is closed
+        before a streaming response starts.
+
+        Yields:
+            bytes: CSV text, the header first
+        """
+        yield format_csv_rows([EXPORT_COLUMNS]).encode()
+        async with engine.connect() as conn:
+            result = await conn.stream(
+                users_with_accounts_export(), execution_options={"yield_per": USERS_EXPORT_BATCH_ROWS}
+            )
+            async for rows in result.partitions():
+                yield format_csv_rows(
+                    (
+                        user_id,
+                        email,
+                        full_name or "",
+                        role.value,
+                        created_at.isoformat() if created_at else "",
+                        "" if account_id is None else account_id,
+                        "" if balance_minor is None else from_minor_units(balance_minor),
+                    )
+                    for user_id, email, full_name, role, created_at, account_id, balance_minor in rows
+                ).encode()
+
+    @staticmethod
+    async def import_users_csv(db: AsyncSession, chunks: AsyncIterator[bytes]) -> UserImportResponse:
+        """
+        Create users from an uploaded CSV file as it is received.
+
+        The header names the columns ``email``, ``password``, ``full_name``
+        and optionally ``role``; other columns are ignored. Rows are validated
+        as they are parsed and created ``USERS_IMPORT_CHUNK_ROWS`` at a time
+        through ``create_users``. Each chunk is committed, so an upload that
+        breaks off keeps the rows before it.
+
+        Args:
+            db: Database session
+            chunks: Raw request body
+
+        Returns:
+            UserImportResponse: Counts per outcome and the rows that were not created
+
+        Raises:
+            ValueError: If the header is missing or lacks a required column
+        """
+        records = read_csv_records(chunks, USERS_IMPORT_MAX_RECORD_LENGTH)
+        try:
+            _, header = await anext(records)
+        except StopAsyncIteration:
+            raise ValueError("CSV file is empty")
+        header = [name.strip().lower() for name in header]
+        missing = IMPORT_REQUIRED_COLUMNS - set(header)
+        if missing:
+            raise ValueError(f"CSV header lacks columns: {', '.join(sorted(missing))}")
+
+        report = UserImportResponse(rows=0, created=0, exists=0, duplicate=0, invalid=0)
+        chunk: list[tuple[int, UserCreate]] = []
+        try:
+            async for line, fields in records:
+                report.rows += 1
+                if len(fields) != len(header):
+                    UserService._import_failed(report, line, None, "invalid",
+                                               f"Expected {len(header)} fields, got {len(fields)}")
+                    continue
+                row = dict(zip(header, fields))
+                values = {
+                    column: row.get(column, "").strip() if column in IMPORT_STRIPPED_COLUMNS else row.get(column, "")
+                    for column in IMPORT_COLUMNS
+                }
+                try:
+                    # Empty cells fall back to the schema defaults, e.g. the USER role
+                    user_data = UserCreate.model_validate({column: value for column, value in values.items() if value})
+                except ValidationError as e:
+                    detail = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+                    UserService._import_failed(report, line, values["email"] or None, "invalid", detail)
+                    continue
+                chunk.append((line, user_data))
+                if len(chunk) >= USERS_IMPORT_CHUNK_ROWS:
+                    await UserService._import_chunk(db, chunk, report)
+                    chunk = []
+        except CsvFormatError as e:
+            report.aborted = str(e)
+        if chunk:
+            await UserService._import_chunk(db, chunk, report)
+        # Invalid rows are reported when parsed, the others when their chunk is inserted
+        report.errors.sort(key=lambda error: error.line)
+
+        logger.info(f"CSV import finished: {report.rows} rows, {report.created} users created"
+                    f"{f', aborted: {report.aborted}' if report.aborted else ''}")
+        return report
+
+    @staticmethod
+    async def _import_chunk(db: AsyncSession, chunk: list[tuple[int, UserCreate]], report: UserImportResponse) -> None:
+        result = await UserService.create_users(db, [user_data for _, user_data in chunk])
+        await db.commit()
+        for (line, _), item in zip(chunk, result.results):
+            if item.status == UserBulkStatus.CREATED:
+                report.created += 1
+            else:
+                UserService._import_failed(report, line, item.email, item.status.value, item.detail)
+        logger.info(f"CSV import: {report.rows} rows read, {report.created} users created")
+
+    @staticmethod
+    def _import_failed(report: UserImportResponse, line: int, email: Optional[str], status: str, detail: str) -> None:
+        setattr(report, status, getattr(report, status) + 1)
+        if len(report.errors) < USERS_IMPORT_MAX_ERRORS:
+            report.errors.append(UserImportError(line=line, email=email, status=status, detail=detail))
+        else:
+            report.errors_truncated = True
+
     @staticmethod
     async def update_user(db: AsyncSession, user_id: int, update_data: UserUpdate) -> Optional[User]:
-        """Update user data."""
-        user = await UserService.get_user_by_id(db, user_id)
-        if not user:
-            return None
+        """
+        Update user data with a single UPDATE ... RETURNING.
+
+        Args:
+            db: Database session
+            user_id: ID of the user to update
+            update_data: Fields to change; unset fields are kept
 
+        Returns:
+            Optional[User]: The updated user, None if the user does not exist
+
+        Raises:
+            ValueError: If the new email belongs to another user or a required field is set to null
+        """
         update_dict = update_data.model_dump(exclude_unset=True)
+        if not update_dict:
+            return await UserService.get_user_by_id(db, user_id)
 
         if "password" in update_dict:
-            update_dict["hashed_password"] = get_password_hash(update_dict.pop("password"))
-
-        if update_dict:
-            await db.execute(
-                update(User)
-                .where(User.id == user_id)
-                .values(**update_dict)
-            )
-            await db.flush()
-            await db.refresh(user)
+            (update_dict["hashed_password"],) = await hash_passwords([update_dict.pop("password")])
+        if update_dict.get("role") is not None:
+            update_dict["role"] = update_dict["role"].value
 
+        try:
+            result = await db.execute(update_user_fields(user_id, update_dict))
+        except IntegrityError as e:
+            sqlstate = getattr(e.orig, "sqlstate", None)
+            if sqlstate == UNIQUE_VIOLATION:
+                raise ValueError(f"User with email {update_dict['email']} already exists")
+            if sqlstate == NOT_NULL_VIOLATION:
+                nulls = [field for field, value in update_dict.items() if value is None]
+                raise ValueError(f"Fields cannot be null: {', '.join(nulls)}")
+            raise
+        user = result.scalar_one_or_none()
+        if user is not None:
+            publish_invalidation(db, [user_key(user_id)])
         return user
 
     @staticmethod
     async def delete_user(db: AsyncSession, user_id: int) -> bool:
-        """Delete user by ID."""
-        user = await UserService.get_user_by_id(db, user_id)
-        if not user:
+        """
+        Delete user by ID with a single DELETE ... RETURNING.
+
+        Args:
+            db: Database session
+            user_id: ID of the user to delete
+
+        Returns:
+            bool: False if the user does not exist
+        """
+        result = await db.execute(delete_user_by_id(user_id))
+        if result.scalar_one_or_none() is None:
             return False
 
-        await db.execute(delete(User).where(User.id == user_id))
-        # await db.flush()
+        publish_invalidation(db, [user_key(user_id), accounts_key(user_id)])
         return True
+
+    @staticmethod
+    async def request_user_deletion(db: AsyncSession, user_id: int,
+                                    requested_by: Optional[int] = None) -> Optional[UserDeletionJob]:
+        """
+        Mark a user deleted and create the job that removes the data in the background.
+
+        Args:
+            db: Database session
+            user_id: ID of the user to delete
+            requested_by: ID of the admin requesting the deletion
+
+        Returns:
+            Optional[UserDeletionJob]: The pending job, None if the user does not exist or is already being deleted
+        """
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id, User.deleted_at.is_(None))
+            .values(deleted_at=func.now())
+            .returning(User.email)
+        )
+        email = result.scalar_one_or_none()
+        if email is None:
+            return None
+
+        job = await create_deletion_job(db, user_id, email, requested_by)
+        publish_invalidation(db, [user_key(user_id), accounts_key(user_id)])
+        return job
+
+    @staticmethod
+    async def get_deletion_job(db: AsyncSession, job_id: int) -> Optional[UserDeletionJob]:
+        """Get a deletion job by ID."""
+        return await db.get(UserDeletionJob, job_id)
+
+    @staticmethod
+    async def get_deletion_jobs(db: AsyncSession, status: Optional[str] = None,
+                                limit: int = 100) -> list[UserDeletionJob]:
+        """Get the latest deletion jobs, optionally only those with ``status``."""
+        query = select(UserDeletionJob).order_by(UserDeletionJob.id.desc()).limit(limit)
+        if status is not None:
+            query = query.where(UserDeletionJob.status == status)
+        return list((await db.execute(query)).scalars())
@@ -1,27 +1,93 @@
 import asyncio
-import os
+import logging
 from contextlib import asynccontextmanager
 
-import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI
 
 from app.api.api import main_router
+from app.core.bulkhead import bulkheads
+from app.core.cache import invalidation_listener, invalidation_publisher
+from app.core.config import (
+    BULKHEADS_ENABLED,
+    CACHE_ENABLED,
+    DRAIN_TIMEOUT_SECONDS,
+    PAYMENTS_PARTITIONS_AUTOCREATE,
+    PAYMENTS_PARTITIONS_MONTHS_AHEAD,
+    REQUEST_PROFILING_ENABLED,
+    REQUEST_PROFILING_SAMPLE_RATE,
+    SCHEMA_REVISION_CHECK,
+    SQL_PROFILING_ENABLED,
+    SQL_REPEAT_WARN_THRESHOLD,
+    SQL_SERVER_TIMING,
+    USER_DELETION_WORKER_ENABLED,
+    WARMUP_CONNECTIONS,
+    WARMUP_ENABLED,
+    WARMUP_TIMEOUT_SECONDS,
+)
+from app.core.events import balance_hub, balance_publisher
+from app.core.lifecycle import drain, readiness
+from app.core.middleware import BulkheadMiddleware, DrainMiddleware, QueryProfilingMiddleware, RequestProfilingMiddleware
+from app.core.profiler import profile_store, request_sampler
+from app.core.security import shutdown_password_hashing
+from app.core.warmup import run_warm_up
+from app.db.deletion import deletion_worker
+from app.db.listener import pg_listener
+from app.db.migrations import ensure_schema_revision
+from app.db.outbox import outbox_notifier
+from app.db.partitions import ensure_payment_partitions
 from app.db.session import engine
-from scripts.fill_db import init_db_with_test_data, run_init_migrations
 
 load_dotenv()
 
 PORT = 8000
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    if os.getenv("ENVIRONMENT") == "development":
-        await asyncio.to_thread(run_init_migrations)
+    await ensure_schema_revision(SCHEMA_REVISION_CHECK)
+
+    if PAYMENTS_PARTITIONS_AUTOCREATE:
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(ensure_payment_partitions, PAYMENTS_PARTITIONS_MONTHS_AHEAD)
+        except Exception as e:
+            logger.error(f"Could not create payments partitions: {e}")
+
+    if CACHE_ENABLED:
+        invalidation_listener.start()
+    balance_hub.start(pg_listener)
+    pg_listener.start()
+    if USER_DELETION_WORKER_ENABLED:
+        deletion_worker.start()
+
+    warm_up_task = None
+    if WARMUP_ENABLED:
+        readiness.hold("warmup")
+        warm_up_task = asyncio.create_task(run_warm_up(app, WARMUP_CONNECTIONS, WARMUP_TIMEOUT_SECONDS))
+
+    drain.install_signal_handler(DRAIN_TIMEOUT_SECONDS)
 
     yield
 
+    # Normally drained already by the SIGTERM handler; covers other shutdowns
+    if not await drain.wait_drained(DRAIN_TIMEOUT_SECONDS):
+        logger.warning(f"Shutting down with {drain.in_flight} requests in flight")
+    drain.restore_signal_handler()
+
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+
+    await deletion_worker.stop()
+
+    await invalidation_publisher.stop()
+    await outbox_notifier.stop()
+    await balance_publisher.stop()
+    await balance_hub.stop()
+    await invalidation_listener.stop()
+    await pg_listener.stop()
+    shutdown_password_hashing()
     await engine.dispose()
 
 
@@ -35,11 +101,30 @@ app = FastAPI(
         {"name": "users", "description": "Operations with users"},
         {"name": "admin", "description": "Operations admin access required"},
         {"name": "webhooks", "description": "Operations with payments"},
+        {"name": "monitoring", "description": "Runtime metrics, admin access required"},
+        {"name": "health", "description": "Liveness and readiness probes"},
     ],
 )
 
+drain.on_drain(balance_hub.close_all)
+if REQUEST_PROFILING_ENABLED:
+    app.add_middleware(
+        RequestProfilingMiddleware,
+        sampler=request_sampler,
+        store=profile_store,
+        sample_rate=REQUEST_PROFILING_SAMPLE_RATE,
+    )
+if SQL_PROFILING_ENABLED:
+    app.add_middleware(
+        QueryProfilingMiddleware, repeat_threshold=SQL_REPEAT_WARN_THRESHOLD, server_timing=SQL_SERVER_TIMING
+    )
+if BULKHEADS_ENABLED:
+    app.add_middleware(BulkheadMiddleware, bulkheads=bulkheads)
+app.add_middleware(DrainMiddleware, drain=drain, exempt_prefixes=("/api/health",))
 app.include_router(main_router, prefix="/api")
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:app", host="127.0.0.1", port=PORT, reload=True)
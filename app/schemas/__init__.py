@@ -4,6 +4,10 @@ from .user import (
     UserResponse,
     UsersListResponse,
     UserWithAccountsResponse,
+    UserBulkCreate,
+    UserBulkCreateResponse,
+    UserImportResponse,
+    UserDeletionJobResponse,
 )
 from .auth import (
     Token,
@@ -24,4 +28,8 @@ __all__ = [
     "UserWithAccountsResponse",
     "UserCreate",
     "UserUpdate",
+    "UserBulkCreate",
+    "UserBulkCreateResponse",
+    "UserImportResponse",
+    "UserDeletionJobResponse",
 ]
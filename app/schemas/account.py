@@ -3,12 +3,15 @@ from typing import Optional, List
 
 from pydantic import BaseModel, Field
 
+from app.core.money import Money
+
 
 class AccountResponse(BaseModel):
     """Response schema for getting user's account."""
     id: int = Field(..., example=10)
     user_id: int = Field(..., example=100)
-    balance: float = Field(..., example=1000.67)
+    balance: Money = Field(..., example=1000.67)
+    balance_version: Optional[int] = Field(None, description="Incremented with every balance change", example=41)
     created_at: datetime = Field(..., example="2025-09-08T12:00:28.375614Z")
     updated_at: Optional[datetime] = Field(None, example="2025-09-08T12:00:28.375614Z")
 
@@ -19,4 +22,10 @@ class AccountResponse(BaseModel):
 class AccountListResponse(BaseModel):
     """Response schema for successful getting list of authorized user's accounts."""
 
-    accounts: List[AccountResponse] = Field(default_factory=list)
\ No newline at end of file
+    accounts: List[AccountResponse] = Field(default_factory=list)
+
+class BalanceEvent(BaseModel):
+    """Data of a ``balance`` event on the account event stream."""
+    account_id: int = Field(..., example=10)
+    balance: Money = Field(..., example=1050.67)
+    balance_version: int = Field(..., description="Newer balances have higher versions", example=42)
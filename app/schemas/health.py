@@ -0,0 +1,16 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class LivenessResponse(BaseModel):
+    """Schema for the liveness probe."""
+    status: str = Field(..., example="ok")
+    uptime_seconds: float = Field(..., example=12.5)
+
+
+class ReadinessResponse(BaseModel):
+    """Schema for the readiness probe."""
+    ready: bool = Field(..., example=False)
+    reasons: List[str] = Field(default_factory=list, description="What keeps the process out of rotation",
+                               example=["warmup"])
@@ -0,0 +1,92 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class PoolStatsResponse(BaseModel):
+    """Schema for connection pool statistics of the serving process."""
+    pool_size: int = Field(..., example=20)
+    in_use: int = Field(..., description="Connections currently checked out", example=4)
+    idle: int = Field(..., description="Connections waiting in the pool", example=16)
+    overflow: int = Field(..., description="Overflow connections currently open", example=0)
+    peak_in_use: int = Field(..., example=12)
+    peak_overflow: int = Field(..., example=2)
+    checkouts: int = Field(..., example=10500)
+    timeouts: int = Field(..., description="Checkouts that failed with pool timeout", example=0)
+    pings: int = Field(..., description="Idle pre-pings issued", example=37)
+    stale_connections: int = Field(..., description="Connections replaced after a failed pre-ping", example=1)
+    wait_p50_ms: float = Field(..., example=0.021)
+    wait_p95_ms: float = Field(..., example=0.094)
+    wait_max_ms: float = Field(..., example=12.5)
+
+
+class CacheStatsResponse(BaseModel):
+    """Schema for in-process cache and invalidation listener statistics of the serving process."""
+    enabled: bool = Field(..., example=True)
+    entries: int = Field(..., example=840)
+    hits: int = Field(..., example=15200)
+    misses: int = Field(..., example=910)
+    evictions: int = Field(..., description="Keys evicted by invalidation", example=64)
+    clears: int = Field(..., description="Full evictions (listener reconnects, oversized batches)", example=1)
+    stale_sets: int = Field(..., description="Loaded values not cached because their key was evicted meanwhile", example=2)
+    listening: bool = Field(..., description="Invalidation listener task is running", example=True)
+    connects: int = Field(..., description="Listener (re)connects since start", example=1)
+    notifications: int = Field(..., example=64)
+    batches: int = Field(..., description="Eviction batches applied", example=40)
+
+
+class EventStreamStatsResponse(BaseModel):
+    """Schema for balance event stream statistics of the serving process."""
+    enabled: bool = Field(..., example=True)
+    fanout: str = Field(..., description="local or notify", example="notify")
+    subscribers: int = Field(..., description="Open streams", example=4210)
+    users: int = Field(..., description="Users with at least one open stream", example=3980)
+    peak_subscribers: int = Field(..., example=5120)
+    max_subscribers: int = Field(..., example=10000)
+    delivered: int = Field(..., description="Balance updates handed to streams", example=18800)
+    stale: int = Field(..., description="Updates dropped because the stream held a newer balance", example=3)
+    rejected: int = Field(..., description="Streams refused by the connection limits", example=3)
+    notifications: int = Field(..., description="Notifications received from other workers", example=950)
+
+
+class BulkheadClassStats(BaseModel):
+    """Schema for the statistics of one traffic class."""
+    name: str = Field(..., description="webhooks, user_reads, admin or auth", example="admin")
+    limit: int = Field(..., description="Own cap of requests in flight, 0: shared capacity only", example=4)
+    queue_size: int = Field(..., example=100)
+    active: int = Field(..., description="Requests in flight", example=4)
+    queued: int = Field(..., description="Requests waiting for a slot", example=37)
+    peak_active: int = Field(..., example=4)
+    peak_queued: int = Field(..., example=100)
+    admitted: int = Field(..., example=5230)
+    rejected: int = Field(..., description="Requests refused because the queue was full", example=812)
+    timed_out: int = Field(..., description="Requests refused after waiting BULKHEAD_QUEUE_TIMEOUT_MS", example=15)
+    wait_p50_ms: float = Field(..., example=0.0)
+    wait_p95_ms: float = Field(..., example=640.2)
+    wait_max_ms: float = Field(..., example=4890.7)
+
+
+class BulkheadStatsResponse(BaseModel):
+    """Schema for traffic class bulkhead statistics of the serving process."""
+    enabled: bool = Field(..., example=True)
+    capacity: int = Field(..., description="Requests of all classes in flight at once", example=30)
+    reserved: int = Field(..., description="Part of the capacity only webhooks may use", example=8)
+    active: int = Field(..., example=12)
+    shared_active: int = Field(..., description="Requests in flight outside the webhooks class", example=10)
+    queue_timeout_ms: float = Field(..., example=5000)
+    classes: List[BulkheadClassStats]
+
+
+class RequestProfileSummary(BaseModel):
+    """Schema for a stored request profile, without its stacks."""
+    id: str = Field(..., example="1760857200-3f9c2a1b")
+    method: str = Field(..., example="GET")
+    path: str = Field(..., example="/api/admin/users")
+    status_code: int = Field(..., example=200)
+    wall_ms: float = Field(..., description="Duration of the request", example=182.4)
+    samples: int = Field(..., example=36)
+    awaiting_samples: int = Field(
+        ..., description="Samples taken while the request waited for I/O or other tasks", example=21
+    )
+    interval_ms: float = Field(..., description="Time between samples", example=2)
+    created_at: float = Field(..., description="Unix time the request started", example=1760857200.12)
@@ -4,13 +4,15 @@ import re
 from uuid import UUID
 from datetime import datetime
 
+from app.core.money import Money
+
 
 class WebhookBase(BaseModel):
     """Base schema for webhook payload validation."""
     transaction_id: UUID = Field(..., description="Unique transaction ID from payment system")
     user_id: int = Field(..., gt=0, description="User ID in our system")
     account_id: int = Field(..., gt=0, description="Account ID in our system")
-    amount: float = Field(..., gt=0, description="Payment amount (must be positive)")
+    amount: Money = Field(..., gt=0, description="Payment amount (must be positive, at most 2 decimal places)")
 
 
 class WebhookRequest(WebhookBase):
@@ -4,6 +4,7 @@ from enum import Enum
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 
+from app.core.config import USERS_BULK_MAX_ITEMS
 from app.schemas.account import AccountResponse
 
 
@@ -118,3 +119,79 @@ class UsersListResponse(BaseModel):
                 "total_count": 100
             }
         }
+
+
+class UserBulkCreate(BaseModel):
+    """Schema for creating many users in one request."""
+    users: List[UserCreate] = Field(..., min_length=1, max_length=USERS_BULK_MAX_ITEMS)
+
+
+class UserBulkStatus(str, Enum):
+    CREATED = "created"
+    EXISTS = "exists"
+    DUPLICATE = "duplicate"
+
+
+class UserBulkResult(BaseModel):
+    """Outcome of one item of a bulk create request."""
+    index: int = Field(..., description="Position of the item in the request", example=0)
+    email: EmailStr = Field(..., example="new_user@example.com")
+    status: UserBulkStatus = Field(..., description="created, exists (email already registered) or duplicate "
+                                                    "(email used by an earlier item)", example="created")
+    user: Optional[UserResponse] = None
+    detail: Optional[str] = Field(None, example="User with email new_user@example.com already exists")
+
+
+class UserBulkCreateResponse(BaseModel):
+    """Schema for the result of a bulk create request, one result per item in request order."""
+    created: int = Field(..., example=498)
+    failed: int = Field(..., example=2)
+    results: List[UserBulkResult] = Field(default_factory=list)
+
+
+class UserImportError(BaseModel):
+    """A row of a CSV import that did not create a user."""
+    line: int = Field(..., description="Line of the CSV file the row starts on", example=12)
+    email: Optional[str] = Field(None, example="new_user@example.com")
+    status: str = Field(..., description="invalid, exists or duplicate", example="exists")
+    detail: str = Field(..., example="User with email new_user@example.com already exists")
+
+
+class UserImportResponse(BaseModel):
+    """Schema for the result of a CSV import."""
+    rows: int = Field(..., description="Data rows read", example=10000)
+    created: int = Field(..., example=9990)
+    exists: int = Field(..., example=6)
+    duplicate: int = Field(..., example=1)
+    invalid: int = Field(..., example=3)
+    errors: List[UserImportError] = Field(default_factory=list, description="Rows not created, "
+                                                                            "up to USERS_IMPORT_MAX_ERRORS")
+    errors_truncated: bool = Field(False, description="True if more rows failed than are listed")
+    aborted: Optional[str] = Field(None, description="Why the import stopped early; rows before it are kept",
+                                   example="Unterminated quoted field in record starting at line 5000")
+
+
+class UserDeletionJobResponse(BaseModel):
+    """Schema for the status of a background user deletion."""
+    id: int = Field(..., example=17)
+    user_id: int = Field(..., example=100)
+    email: str = Field(..., example="merchant@example.com")
+    requested_by: Optional[int] = Field(None, example=1)
+    status: str = Field(..., description="pending, running or done", example="running")
+    phase: str = Field(..., description="payments (unlinking payments), accounts, user or done",
+                       example="payments")
+    payments_total: Optional[int] = Field(None, description="Payments to unlink, counted when the job starts",
+                                          example=2500000)
+    payments_detached: int = Field(..., example=1200000)
+    accounts_total: Optional[int] = Field(None, example=3)
+    accounts_deleted: int = Field(..., example=0)
+    batches: int = Field(..., example=240)
+    attempts: int = Field(..., description="Times a worker took the job", example=1)
+    last_error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,62 @@
+"""
+Gunicorn settings for the multi-process production run mode.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The application is imported once in the master (``preload_app``) and the
+workers are forked from it, which saves start-up time and memory per worker.
+Nothing opens a database connection at import time. ``post_fork`` still
+drops any inherited pool state, so a worker never shares a socket with
+its siblings.
+
+Workers: ``WEB_CONCURRENCY``. Each worker sizes its pool from
+``DB_CONNECTION_BUDGET`` (see ``app.db.pool.budget_pool_limits``), so the
+worker count must not be overridden with ``-w``/``--workers``: gunicorn
+refuses to start if it differs from ``WEB_CONCURRENCY``.
+"""
+import os
+import sys
+
+from app.core.config import DB_CONNECTION_BUDGET, WEB_CONCURRENCY
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = WEB_CONCURRENCY
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+accesslog = os.getenv("ACCESS_LOG") or None
+
+
+def nworkers_changed(server, new_value, old_value):
+    # Runs before the preloaded application is imported. Pools, the SSE
+    # fan-out and the hashing threads are sized for WEB_CONCURRENCY workers.
+    if old_value is None:
+        if new_value != WEB_CONCURRENCY:
+            sys.exit(
+                f"gunicorn was started with {new_value} workers, but WEB_CONCURRENCY={WEB_CONCURRENCY}; "
+                f"set WEB_CONCURRENCY={new_value} instead of -w/--workers"
+            )
+    elif DB_CONNECTION_BUDGET and new_value > WEB_CONCURRENCY:
+        server.log.error(
+            f"{new_value} workers exceed DB_CONNECTION_BUDGET={DB_CONNECTION_BUDGET}, "
+            f"which was split between WEB_CONCURRENCY={WEB_CONCURRENCY} workers"
+        )
+
+
+def when_ready(server):
+    from app.db.session import MAX_OVERFLOW, POOL_SIZE, RESERVED_CONNECTIONS
+
+    per_worker = POOL_SIZE + MAX_OVERFLOW + RESERVED_CONNECTIONS
+    server.log.info(
+        f"{workers} workers, pool_size={POOL_SIZE} max_overflow={MAX_OVERFLOW} per worker, "
+        f"up to {per_worker * workers} database connections"
+    )
+
+
+def post_fork(server, worker):
+    from app.db.session import engine
+
+    # Forget connections inherited from the master without closing them,
+    # closing would terminate the master's sessions
+    engine.sync_engine.dispose(close=False)
@@ -0,0 +1,150 @@
+"""
+Latency and round trips of the admin user writes.
+
+Drives the admin endpoints in-process (no HTTP server) against the database
+from ``DATABASE_URL``, one request at a time so the latency is that of the
+request itself:
+
+- ``create``:         ``POST /api/admin/users`` with a new email
+- ``create_existing``: the same emails again (400)
+- ``update``:         ``PATCH /api/admin/users/{id}`` of ``full_name``
+- ``update_missing``: ``PATCH`` of a user id that does not exist (404)
+- ``delete``:         ``DELETE /api/admin/users/{id}`` in ``sync`` mode
+- ``delete_missing``: ``DELETE`` of a user id that does not exist (404)
+
+``statements`` counts the SQL statements per request, each one a round trip
+to the database; BEGIN and COMMIT are not counted. Password hashing is
+part of ``create``; run with ``BCRYPT_ROUNDS=4`` to measure the database
+path. Created users (``admin-writes-bench-<n>@example.com``) are deleted by
+the ``delete`` step.
+
+Usage:
+    BCRYPT_ROUNDS=4 python -m scripts.benchmarks.admin_writes --requests 500
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from sqlalchemy import delete, event, select
+
+from app.api.endpoints import admin
+from app.core.security import create_access_token
+from app.db import session as db_session
+from app.db.models import User, UserRole
+from app.main import app
+from scripts.benchmarks.common import asgi_request, json_body, print_table, summarize
+
+EMAIL_PREFIX = "admin-writes-bench-"
+MISSING_USER_ID = 2 ** 62
+
+
+class StatementCounter:
+    """Counts the statements sent by the engine's connections."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(db_session.engine.sync_engine, "before_cursor_execute", self._executed)
+
+    def _executed(self, *args) -> None:
+        self.count += 1
+
+
+async def admin_headers() -> dict:
+    async with db_session.AsyncSessionLocal() as db:
+        admin_id = (await db.execute(
+            select(User.id).where(User.role == UserRole.ADMIN, User.deleted_at.is_(None)).order_by(User.id).limit(1)
+        )).scalar_one_or_none()
+    if admin_id is None:
+        sys.exit("No admin user found, run `python -m scripts.generate_data` first")
+    return {"authorization": f"Bearer {create_access_token({'sub': str(admin_id), 'role': 'ADMIN'})}"}
+
+
+async def delete_bench_users() -> None:
+    async with db_session.AsyncSessionLocal() as db:
+        await db.execute(delete(User).where(User.email.like(f"{EMAIL_PREFIX}%")))
+        await db.commit()
+
+
+async def measure(name: str, requests: list, expected: int, counter: StatementCounter) -> tuple[dict, list]:
+    """Send ``requests`` (method, path, headers, body) one by one; returns the summary row and the response bodies."""
+    latencies, bodies = [], []
+    errors = 0
+    statements = counter.count
+    started = time.perf_counter()
+    for method, path, headers, body in requests:
+        request_started = time.perf_counter()
+        status_code, response = await asgi_request(app, method, path, headers=headers, body=body)
+        latencies.append(time.perf_counter() - request_started)
+        bodies.append(response)
+        if status_code != expected:
+            errors += 1
+            if errors == 1:
+                print(f"{name}: expected {expected}, got {status_code}: {response[:200]!r}", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+    row = {
+        "operation": name,
+        **summarize(latencies, elapsed, errors),
+        "statements": round((counter.count - statements) / len(requests), 2),
+    }
+    return row, bodies
+
+
+async def main(args: argparse.Namespace) -> None:
+    admin.USER_DELETION_MODE = "sync"
+    headers = await admin_headers()
+    await delete_bench_users()
+    counter = StatementCounter()
+
+    def create_request(number: int) -> tuple:
+        request_headers, body = json_body({
+            "email": f"{EMAIL_PREFIX}{number}@example.com",
+            "password": f"password-{number}",
+            "full_name": f"Admin Writes {number}",
+        })
+        return "POST", "/api/admin/users", {**headers, **request_headers}, body
+
+    def update_request(user_id: int, number: int) -> tuple:
+        request_headers, body = json_body({"full_name": f"Admin Writes Updated {number}"})
+        return "PATCH", f"/api/admin/users/{user_id}", {**headers, **request_headers}, body
+
+    # Warms up the pool, the statement caches and the code paths
+    await measure("warm-up", [create_request(-1)], 201, counter)
+
+    creates = [create_request(number) for number in range(args.requests)]
+    rows = []
+    row, bodies = await measure("create", creates, 201, counter)
+    rows.append(row)
+    user_ids = [json.loads(body)["id"] for body in bodies if b'"id"' in body]
+
+    rows.append((await measure("create_existing", creates, 400, counter))[0])
+    rows.append((await measure(
+        "update", [update_request(user_id, number) for number, user_id in enumerate(user_ids)], 200, counter
+    ))[0])
+    rows.append((await measure(
+        "update_missing", [update_request(MISSING_USER_ID, number) for number in range(args.requests)], 404, counter
+    ))[0])
+    rows.append((await measure(
+        "delete", [("DELETE", f"/api/admin/users/{user_id}", headers, b"") for user_id in user_ids], 204, counter
+    ))[0])
+    rows.append((await measure(
+        "delete_missing",
+        [("DELETE", f"/api/admin/users/{MISSING_USER_ID}", headers, b"") for _ in range(args.requests)],
+        404, counter,
+    ))[0])
+
+    await delete_bench_users()
+    await db_session.engine.dispose()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, ["operation", "count", "errors", "statements", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per operation")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    asyncio.run(main(parser.parse_args()))
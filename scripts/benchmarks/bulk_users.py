@@ -0,0 +1,180 @@
+"""
+Throughput of user provisioning: one request per user vs the bulk endpoint.
+
+Starts a single uvicorn process with ``--rounds`` bcrypt rounds and creates
+``--users`` users three times:
+
+- ``single``: ``POST /api/admin/users`` per user, ``--concurrency`` in flight
+- ``bulk``: ``POST /api/admin/users/bulk`` with ``--batch-size`` users per request
+- ``bulk_existing``: the same bulk requests again, every item reported as ``exists``
+
+Each run uses its own emails (``bulk-bench-<run>-<n>@example.com``), which
+are deleted before and after the benchmark. The cost of bcrypt grows with
+2^rounds, so the default of 4 rounds measures the request and database
+path; run with ``--rounds 12`` and fewer users to see hashing dominate.
+
+Usage:
+    python -m scripts.benchmarks.bulk_users --users 10000 --rounds 4
+    python -m scripts.benchmarks.bulk_users --users 200 --rounds 12 --batch-size 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import asyncpg
+
+from app.core.config import PROJECT_ROOT
+from app.core.security import create_access_token
+from app.db.session import asyncpg_dsn
+from scripts.benchmarks.common import HttpClient, json_body, print_table, run_concurrently
+from scripts.benchmarks.sse import wait_ready
+
+HOST = "127.0.0.1"
+EMAIL_PREFIX = "bulk-bench-"
+
+
+async def admin_id() -> int:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        user_id = await conn.fetchval("SELECT id FROM users WHERE role = 'ADMIN' ORDER BY id LIMIT 1")
+    finally:
+        await conn.close()
+    if user_id is None:
+        sys.exit("No admin user found, run `python -m scripts.generate_data` first")
+    return user_id
+
+
+async def delete_bench_users() -> int:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        result = await conn.execute("DELETE FROM users WHERE email LIKE $1", f"{EMAIL_PREFIX}%")
+    finally:
+        await conn.close()
+    return int(result.split()[-1])
+
+
+def new_user(run: str, number: int) -> dict:
+    return {
+        "email": f"{EMAIL_PREFIX}{run}-{number}@example.com",
+        "password": f"password-{number}",
+        "full_name": f"Bench User {number}",
+        "role": "USER",
+    }
+
+
+async def create_single(port: int, headers: dict, users: int, concurrency: int) -> dict:
+    clients = {}
+
+    async def create(number: int) -> bool:
+        # One keep-alive connection per worker task
+        client = clients.setdefault(asyncio.current_task(), HttpClient(HOST, port))
+        request_headers, body = json_body(new_user("single", number))
+        status_code, _ = await client.request("POST", "/api/admin/users", {**headers, **request_headers}, body)
+        return status_code == 201
+
+    try:
+        return await run_concurrently(create, users, concurrency)
+    finally:
+        for client in clients.values():
+            await client.close()
+
+
+async def create_bulk(port: int, headers: dict, users: int, batch_size: int) -> tuple[dict, dict]:
+    """Send the batches one after another; returns the summary and the item count per status."""
+    client = HttpClient(HOST, port)
+    latencies = []
+    statuses: dict[str, int] = {}
+    errors = 0
+    started = time.perf_counter()
+    try:
+        for start in range(0, users, batch_size):
+            batch = [new_user("bulk", number) for number in range(start, min(users, start + batch_size))]
+            request_headers, body = json_body({"users": batch})
+            request_started = time.perf_counter()
+            status_code, response = await client.request(
+                "POST", "/api/admin/users/bulk", {**headers, **request_headers}, body
+            )
+            latencies.append(time.perf_counter() - request_started)
+            if status_code != 200:
+                errors += 1
+                continue
+            for result in json.loads(response)["results"]:
+                statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    finally:
+        await client.close()
+    elapsed = time.perf_counter() - started
+    return {"requests": len(latencies), "errors": errors, "elapsed": elapsed, "latencies": latencies}, statuses
+
+
+def row(mode: str, users: int, elapsed: float, requests: int, errors: int, latencies: list) -> dict:
+    return {
+        "mode": mode,
+        "users": users,
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "users_per_s": round(users / elapsed, 1),
+        "p50_request_ms": round(sorted(latencies)[len(latencies) // 2] * 1000, 1) if latencies else "",
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    token = create_access_token({"sub": str(await admin_id()), "role": "ADMIN"})
+    headers = {"Authorization": f"Bearer {token}"}
+    deleted = await delete_bench_users()
+    if deleted:
+        print(f"Deleted {deleted} users of an earlier run", file=sys.stderr)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", str(args.port),
+         "--log-level", "warning"],
+        cwd=PROJECT_ROOT,
+        env=dict(
+            os.environ,
+            PYTHONPATH=str(PROJECT_ROOT),
+            BCRYPT_ROUNDS=str(args.rounds),
+            USERS_BULK_MAX_ITEMS=str(max(args.batch_size, 1000)),
+            **({"PASSWORD_HASH_WORKERS": str(args.hash_workers)} if args.hash_workers else {}),
+        ),
+    )
+    rows = []
+    try:
+        await wait_ready(server, args.port)
+
+        if not args.skip_single:
+            started = time.perf_counter()
+            summary = await create_single(args.port, headers, args.users, args.concurrency)
+            rows.append({
+                **row("single", args.users, time.perf_counter() - started, summary["count"], summary["errors"], []),
+                "p50_request_ms": summary["p50_ms"],
+            })
+
+        for mode, expected in (("bulk", "created"), ("bulk_existing", "exists")):
+            summary, statuses = await create_bulk(args.port, headers, args.users, args.batch_size)
+            if statuses.get(expected, 0) != args.users:
+                print(f"{mode}: expected {args.users} {expected}, got {statuses}", file=sys.stderr)
+            rows.append(row(mode, args.users, summary["elapsed"], summary["requests"], summary["errors"],
+                            summary["latencies"]))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        await delete_bench_users()
+
+    print(f"\nbcrypt rounds: {args.rounds}, CPUs: {os.cpu_count()}")
+    print_table(rows, ["mode", "users", "requests", "errors", "seconds", "users_per_s", "p50_request_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=4, help="bcrypt work factor of the server")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Users per bulk request")
+    parser.add_argument("--concurrency", type=int, default=16, help="Single requests in flight")
+    parser.add_argument("--hash-workers", type=int, default=0, help="PASSWORD_HASH_WORKERS, 0 keeps the default")
+    parser.add_argument("--skip-single", action="store_true", help="Only run the bulk modes")
+    parser.add_argument("--port", type=int, default=8770)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,177 @@
+"""
+Webhook latency while admin reads flood the server, with and without bulkheads.
+
+For each of ``BULKHEADS_ENABLED=false`` and ``true`` the server is started
+with gunicorn on a local port, and signed webhooks are posted at
+``--concurrency`` for ``--seconds``:
+
+- ``alone``: only the webhooks
+- ``flood``: the same webhooks while ``--flood-concurrency`` connections
+  request ``--flood-path`` (admin reads) back to back
+
+Admin responses are counted as served (200), rejected by the bulkhead (503)
+and other. The pool and bulkhead statistics of the server are read at the end
+of the flood. The check fails (exit code 1) if webhooks errored during the
+flood with bulkheads on, or if their p95 exceeded ``--max-p95-ms``. With
+bulkheads the flood can still slow webhooks down on the CPU the admitted
+admin requests use, but webhooks no longer wait for connections.
+
+Needs existing accounts and an admin user (``python -m scripts.generate_data``).
+
+Usage:
+    python -m scripts.benchmarks.bulkhead_flood --seconds 20 --flood-concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import signal
+import sys
+import time
+import uuid
+from collections import Counter
+
+from app.core.config import WEBHOOK_SECRET_KEY
+from scripts.benchmarks.common import HttpClient, json_body, print_table, summarize
+from scripts.benchmarks.request_profiling import admin_headers
+from scripts.benchmarks.workers import HOST, load_accounts, start_server, wait_ready
+from scripts.fill_db import create_signature
+
+
+async def post_webhooks(port: int, accounts: list, deadline: float) -> tuple[list, int]:
+    """Post webhooks over one connection until ``deadline``; returns the latencies and errors."""
+    latencies = []
+    errors = 0
+    client = HttpClient(HOST, port)
+    try:
+        while time.perf_counter() < deadline:
+            account_id, user_id = random.choice(accounts)
+            payload = {
+                "transaction_id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "account_id": account_id,
+                "amount": round(random.uniform(1, 500), 2),
+            }
+            payload["signature"] = create_signature(payload, WEBHOOK_SECRET_KEY)
+            headers, body = json_body(payload)
+            started = time.perf_counter()
+            try:
+                status_code, _ = await client.request("POST", "/api/webhooks/payment", headers, body)
+            except (OSError, ConnectionError):
+                status_code = 0
+            latencies.append(time.perf_counter() - started)
+            errors += status_code != 200
+    finally:
+        await client.close()
+    return latencies, errors
+
+
+async def flood(port: int, path: str, headers: dict, deadline: float, statuses: Counter) -> None:
+    """Request ``path`` over one connection until ``deadline``, counting the response statuses."""
+    client = HttpClient(HOST, port)
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                status_code, _ = await client.request("GET", path, headers)
+            except (OSError, ConnectionError):
+                status_code = 0
+            statuses[status_code] += 1
+            if status_code == 503:
+                # As a client honouring Retry-After would, but without stalling the flood
+                await asyncio.sleep(0.05)
+    finally:
+        await client.close()
+
+
+async def get_json(port: int, path: str, headers: dict) -> dict:
+    client = HttpClient(HOST, port)
+    try:
+        status_code, body = await client.request("GET", path, headers)
+    finally:
+        await client.close()
+    return json.loads(body) if status_code == 200 else {}
+
+
+async def run_phase(port: int, accounts: list, headers: dict, args: argparse.Namespace, flooded: bool) -> dict:
+    statuses = Counter()
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    floods = [
+        asyncio.create_task(flood(port, args.flood_path, headers, deadline, statuses))
+        for _ in range(args.flood_concurrency if flooded else 0)
+    ]
+    results = await asyncio.gather(*(post_webhooks(port, accounts, deadline) for _ in range(args.concurrency)))
+    # Statistics while the flood is still in flight
+    stats = {
+        "pool": await get_json(port, "/api/admin/monitoring/pool", headers),
+        "bulkheads": await get_json(port, "/api/admin/monitoring/bulkheads", headers),
+    }
+    await asyncio.gather(*floods)
+    latencies = [latency for result in results for latency in result[0]]
+    summary = summarize(latencies, time.perf_counter() - started, sum(result[1] for result in results))
+    return {
+        **summary,
+        "admin_ok": statuses[200],
+        "admin_503": statuses[503],
+        "admin_other": sum(count for status_code, count in statuses.items() if status_code not in (200, 503)),
+        "stats": stats,
+    }
+
+
+def main(args: argparse.Namespace) -> int:
+    accounts = asyncio.run(load_accounts(args.accounts))
+    if not accounts:
+        sys.exit("No accounts found, run `python -m scripts.generate_data` first")
+    headers = asyncio.run(admin_headers())
+
+    rows = []
+    for enabled in (False, True):
+        server = start_server(args.workers, args.port, args.budget, {"BULKHEADS_ENABLED": str(enabled).lower()})
+        try:
+            asyncio.run(wait_ready(args.port))
+            for flooded in (False, True):
+                result = asyncio.run(run_phase(args.port, accounts, headers, args, flooded))
+                stats = result.pop("stats")
+                row = {"bulkheads": "on" if enabled else "off", "phase": "flood" if flooded else "alone", **result}
+                if flooded:
+                    row["pool_peak"] = stats["pool"].get("peak_in_use", "")
+                    row["pool_timeouts"] = stats["pool"].get("timeouts", "")
+                    classes = {c["name"]: c for c in stats["bulkheads"].get("classes", [])} if enabled else {}
+                    if "admin" in classes:
+                        row["admin_queued"] = classes["admin"]["queued"]
+                        row["webhook_wait_p95_ms"] = classes["webhooks"]["wait_p95_ms"]
+                rows.append(row)
+                print(f"  bulkheads {row['bulkheads']}, {row['phase']}: webhook p95 {row['p95_ms']} ms", flush=True)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+    print(f"\n{args.flood_concurrency} connections flooding {args.flood_path}, "
+          f"{args.concurrency} posting webhooks, {args.seconds:.0f}s per phase")
+    print_table(rows, [
+        "bulkheads", "phase", "count", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms",
+        "admin_ok", "admin_503", "admin_other", "pool_peak", "pool_timeouts", "admin_queued", "webhook_wait_p95_ms",
+    ])
+
+    flooded = rows[3]
+    print(f"\nwebhook p95 under the flood: {flooded['p95_ms']} ms with bulkheads, {rows[1]['p95_ms']} ms without")
+    if flooded["errors"] or flooded["p95_ms"] > args.max_p95_ms:
+        print(f"❌ webhooks errored or their p95 exceeded {args.max_p95_ms:.0f} ms")
+        return 1
+    print("✅ webhooks kept their capacity")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=20, help="Duration of each phase")
+    parser.add_argument("--concurrency", type=int, default=4, help="Connections posting webhooks")
+    parser.add_argument("--flood-concurrency", type=int, default=100, help="Connections flooding admin reads")
+    parser.add_argument("--flood-path", default="/api/admin/users?limit=100")
+    parser.add_argument("--max-p95-ms", type=float, default=1000,
+                        help="Allowed webhook p95 under the flood with bulkheads on")
+    parser.add_argument("--workers", type=int, default=1, help="Gunicorn workers")
+    parser.add_argument("--budget", type=int, default=0, help="DB_CONNECTION_BUDGET for the server, 0: default pool")
+    parser.add_argument("--accounts", type=int, default=10_000, help="Accounts to spread webhooks over")
+    parser.add_argument("--port", type=int, default=8766)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.core.config import PROJECT_ROOT
+from app.core.stats import percentile
+
+
+async def asgi_request(
+        app,
+        method: str,
+        path: str,
+        headers: Optional[dict] = None,
+        body: bytes = b"",
+) -> tuple[int, bytes]:
+    """
+    Send a single request straight into an ASGI app, bypassing the network.
+
+    Args:
+        app: ASGI application
+        method: HTTP method
+        path: Request path, optionally with a query string
+        headers: Request headers
+        body: Raw request body
+
+    Returns:
+        tuple[int, bytes]: Response status code and body
+    """
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+    request_sent = False
+    response_done = asyncio.Event()
+    status_code = 0
+    chunks = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    return status_code, b"".join(chunks)
+
+
+def json_body(data: dict) -> tuple[dict, bytes]:
+    """Encode a JSON request body together with its content type header."""
+    return {"content-type": "application/json"}, json.dumps(data).encode()
+
+
+def summarize(latencies: list, elapsed: float, errors: int = 0) -> dict:
+    """
+    Build a latency/throughput summary.
+
+    Args:
+        latencies: Per-operation latencies in seconds
+        elapsed: Wall time of the whole run in seconds
+        errors: Number of failed operations
+
+    Returns:
+        dict: Summary with latencies in milliseconds
+    """
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+async def run_concurrently(
+        operation: Callable[[int], Awaitable[bool]],
+        total: int,
+        concurrency: int,
+) -> dict:
+    """
+    Run ``operation`` ``total`` times with at most ``concurrency`` in flight.
+
+    Args:
+        operation: Coroutine factory receiving the call number, returns success flag
+        total: Number of operations
+        concurrency: Number of concurrent workers
+
+    Returns:
+        dict: Summary produced by ``summarize``
+    """
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for number in counter:
+            started = time.perf_counter()
+            ok = await operation(number)
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def machine_info() -> dict:
+    """Machine, interpreter and git commit a result was measured with."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "python": platform.python_version(),
+        "python_implementation": platform.python_implementation(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+def print_table(rows: list[dict], columns: list[str]) -> None:
+    """Print a list of dicts as an aligned text table."""
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).ljust(widths[c]) for c in columns))
+
+
+class HttpClient:
+    """
+    Minimal keep-alive HTTP/1.1 client for load generation against a real server.
+
+    Handles ``Content-Length`` responses only, which is what the API returns.
+
+    Args:
+        host: Server host
+        port: Server port
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(
+            self,
+            method: str,
+            path: str,
+            headers: Optional[dict] = None,
+            body: bytes = b"",
+    ) -> tuple[int, bytes]:
+        """
+        Send one request, reconnecting if the server closed the connection.
+
+        Returns:
+            tuple[int, bytes]: Response status code and body
+        """
+        if self._writer is None or self._writer.is_closing():
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            await self.close()
+            raise ConnectionError("connection closed by server")
+        status_code = int(status_line.split()[1])
+        length = 0
+        keep_alive = True
+        while (line := await self._reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                keep_alive = False
+        response_body = await self._reader.readexactly(length) if length else b""
+        if not keep_alive:
+            await self.close()
+        return status_code, response_body
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,193 @@
+"""
+Throughput and server memory of the CSV user import and export.
+
+Starts a single uvicorn process with ``--rounds`` bcrypt rounds, then:
+
+- ``import``: uploads ``--users`` generated users to ``/api/admin/users/import``
+  as a chunked request body, generated while it is sent
+- ``export``: downloads ``/api/admin/users/export`` and counts its rows
+
+The server's RSS is sampled from ``/proc`` every 50 ms. With a streaming
+import and a server-side cursor for the export, the peak over the idle
+baseline should not grow with ``--users`` or with the size of the tables;
+run with two sizes to compare. Imported users are deleted afterwards.
+
+Usage:
+    python -m scripts.benchmarks.csv_users --users 20000
+    python -m scripts.benchmarks.csv_users --users 100000 --rounds 4
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+import asyncpg
+
+from app.core.config import PROJECT_ROOT
+from app.core.security import create_access_token
+from app.db.session import asyncpg_dsn
+from scripts.benchmarks.common import print_table
+from scripts.benchmarks.sse import rss_mb, wait_ready
+
+HOST = "127.0.0.1"
+EMAIL_PREFIX = "csv-bench-"
+UPLOAD_CHUNK_ROWS = 1000
+
+
+async def admin_id() -> int:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        user_id = await conn.fetchval("SELECT id FROM users WHERE role = 'ADMIN' ORDER BY id LIMIT 1")
+    finally:
+        await conn.close()
+    if user_id is None:
+        sys.exit("No admin user found, run `python -m scripts.generate_data` first")
+    return user_id
+
+
+async def delete_bench_users() -> int:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        result = await conn.execute("DELETE FROM users WHERE email LIKE $1", f"{EMAIL_PREFIX}%")
+    finally:
+        await conn.close()
+    return int(result.split()[-1])
+
+
+def csv_chunks(users: int):
+    """CSV text of ``users`` generated users, ``UPLOAD_CHUNK_ROWS`` rows per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["email", "full_name", "password", "role"])
+    for number in range(users):
+        writer.writerow([f"{EMAIL_PREFIX}{number}@example.com", f"CSV Bench {number}", f"password-{number}", "USER"])
+        if (number + 1) % UPLOAD_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.getvalue():
+        yield buffer.getvalue().encode()
+
+
+async def read_head(reader: asyncio.StreamReader) -> tuple[int, dict]:
+    head = (await reader.readuntil(b"\r\n\r\n")).decode().split("\r\n")
+    headers = {}
+    for line in head[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return int(head[0].split()[1]), headers
+
+
+async def upload(port: int, token: str, users: int) -> dict:
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        writer.write(
+            f"POST /api/admin/users/import HTTP/1.1\r\nHost: {HOST}\r\nAuthorization: Bearer {token}\r\n"
+            f"Content-Type: text/csv\r\nTransfer-Encoding: chunked\r\n\r\n".encode()
+        )
+        for chunk in csv_chunks(users):
+            writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        status_code, headers = await read_head(reader)
+        body = await reader.readexactly(int(headers["content-length"]))
+    finally:
+        writer.close()
+    if status_code != 200:
+        raise RuntimeError(f"Import failed with status {status_code}: {body[:200]!r}")
+    return json.loads(body)
+
+
+async def download(port: int, token: str) -> tuple[int, int]:
+    """Read the export and return its size in bytes and its data rows."""
+    reader, writer = await asyncio.open_connection(HOST, port)
+    size = lines = 0
+    try:
+        writer.write(f"GET /api/admin/users/export HTTP/1.1\r\nHost: {HOST}\r\n"
+                     f"Authorization: Bearer {token}\r\n\r\n".encode())
+        status_code, _ = await read_head(reader)
+        if status_code != 200:
+            raise RuntimeError(f"Export failed with status {status_code}")
+        while chunk_size := int((await reader.readuntil(b"\r\n")).strip(), 16):
+            chunk = await reader.readexactly(chunk_size + 2)
+            size += chunk_size
+            lines += chunk.count(b"\r\n") - 1
+        await reader.readuntil(b"\r\n")
+    finally:
+        writer.close()
+    # Names with line breaks would count double; the generated data has none
+    return size, lines - 1
+
+
+async def sample_rss(pid: int, peak: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        peak[0] = max(peak[0], rss_mb(pid))
+        await asyncio.sleep(0.05)
+
+
+async def measured(pid: int, operation):
+    """Run ``operation`` and return its result, wall time and peak RSS."""
+    peak = [rss_mb(pid)]
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(pid, peak, stop))
+    started = time.perf_counter()
+    try:
+        result = await operation
+    finally:
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+    return result, elapsed, peak[0]
+
+
+async def run(args: argparse.Namespace) -> None:
+    token = create_access_token({"sub": str(await admin_id()), "role": "ADMIN"})
+    deleted = await delete_bench_users()
+    if deleted:
+        print(f"Deleted {deleted} users of an earlier run", file=sys.stderr)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", str(args.port),
+         "--log-level", "warning"],
+        cwd=PROJECT_ROOT,
+        env=dict(os.environ, PYTHONPATH=str(PROJECT_ROOT), BCRYPT_ROUNDS=str(args.rounds)),
+    )
+    rows = []
+    try:
+        await wait_ready(server, args.port)
+        # Warms up the export path before the baseline
+        await download(args.port, token)
+        baseline = rss_mb(server.pid)
+
+        report, elapsed, peak = await measured(server.pid, upload(args.port, token, args.users))
+        if report["created"] != args.users:
+            print(f"Import created {report['created']} of {args.users} users: {report}", file=sys.stderr)
+        rows.append({"operation": "import", "rows": report["rows"], "seconds": round(elapsed, 2),
+                     "rows_per_s": round(report["rows"] / elapsed, 1), "peak_rss_mb": round(peak, 1),
+                     "over_baseline_mb": round(peak - baseline, 1)})
+
+        (size, exported), elapsed, peak = await measured(server.pid, download(args.port, token))
+        rows.append({"operation": "export", "rows": exported, "seconds": round(elapsed, 2),
+                     "rows_per_s": round(exported / elapsed, 1), "peak_rss_mb": round(peak, 1),
+                     "over_baseline_mb": round(peak - baseline, 1), "mb": round(size / 2 ** 20, 1)})
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        await delete_bench_users()
+
+    print(f"\nbcrypt rounds: {args.rounds}, RSS baseline: {baseline:.1f} MB")
+    print_table(rows, ["operation", "rows", "seconds", "rows_per_s", "peak_rss_mb", "over_baseline_mb", "mb"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20_000, help="Users in the uploaded file")
+    parser.add_argument("--rounds", type=int, default=4, help="bcrypt work factor of the server")
+    parser.add_argument("--port", type=int, default=8771)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,179 @@
+"""
+SIGTERM under load: checks that shutdown drains webhooks instead of cutting them off.
+
+Starts the server with gunicorn, posts signed webhooks at ``--concurrency``,
+and sends SIGTERM to the master after ``--after`` seconds. Clients keep
+posting until the server is gone. Then every webhook sent is looked up in
+``payment_transactions`` and classified:
+
+- ``ok``: 200 and stored
+- ``rejected``: 503 while draining and not stored
+- ``not_sent``: connection refused or closed before a response, not stored
+  (the provider retries it)
+- ``lost``: stored but no response came back (the provider retries a
+  payment that was already booked)
+- ``inconsistent``: 200 but not stored, or an error status but stored
+
+The check fails (exit code 1) on any ``lost`` or ``inconsistent`` webhook, or
+if the server needed SIGKILL.
+
+Usage:
+    python -m scripts.benchmarks.drain --workers 2 --concurrency 32 --after 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+
+import asyncpg
+
+from app.core.config import PROJECT_ROOT, WEBHOOK_SECRET_KEY
+from app.db.session import asyncpg_dsn
+from scripts.benchmarks.common import HttpClient, json_body, print_table
+from scripts.fill_db import create_signature
+
+HOST = "127.0.0.1"
+
+
+async def load_accounts(limit: int) -> list[tuple[int, int]]:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        rows = await conn.fetch("SELECT id, user_id FROM accounts ORDER BY random() LIMIT $1", limit)
+    finally:
+        await conn.close()
+    return [(row["id"], row["user_id"]) for row in rows]
+
+
+async def stored_transactions(transaction_ids: list[str]) -> set[str]:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        rows = await conn.fetch(
+            "SELECT transaction_id::text FROM payment_transactions WHERE transaction_id = ANY($1::uuid[])",
+            transaction_ids,
+        )
+    finally:
+        await conn.close()
+    return {row[0] for row in rows}
+
+
+async def wait_ready(port: int, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        client = HttpClient(HOST, port)
+        try:
+            status_code, _ = await client.request("GET", "/api/health/ready")
+            if status_code == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            await client.close()
+        await asyncio.sleep(0.1)
+    raise TimeoutError(f"Server on port {port} not ready within {timeout}s")
+
+
+async def load(port: int, accounts: list, concurrency: int, server: subprocess.Popen) -> list[tuple[str, int]]:
+    """Post webhooks until the server stops answering; status 0 means no response."""
+    results = []
+
+    async def worker():
+        client = HttpClient(HOST, port)
+        try:
+            while server.poll() is None:
+                account_id, user_id = random.choice(accounts)
+                payload = {
+                    "transaction_id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "account_id": account_id,
+                    "amount": round(random.uniform(1, 500), 2),
+                }
+                payload["signature"] = create_signature(payload, WEBHOOK_SECRET_KEY)
+                headers, body = json_body(payload)
+                try:
+                    status_code, _ = await client.request("POST", "/api/webhooks/payment", headers, body)
+                except (OSError, asyncio.IncompleteReadError):
+                    await client.close()
+                    status_code = 0
+                results.append((payload["transaction_id"], status_code))
+                if status_code in (0, 503):
+                    await asyncio.sleep(0.05)
+        finally:
+            await client.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def classify(status_code: int, stored: bool) -> str:
+    if status_code == 200:
+        return "ok" if stored else "inconsistent"
+    if status_code == 0:
+        return "lost" if stored else "not_sent"
+    if status_code == 503:
+        return "inconsistent" if stored else "rejected"
+    return "inconsistent" if stored else f"status_{status_code}"
+
+
+async def run(args: argparse.Namespace) -> int:
+    accounts = await load_accounts(args.accounts)
+    if not accounts:
+        sys.exit("No accounts found, run `python -m scripts.generate_data` first")
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", str(PROJECT_ROOT / "gunicorn.conf.py"), "app.main:app"],
+        cwd=PROJECT_ROOT,
+        env=dict(
+            os.environ,
+            PYTHONPATH=str(PROJECT_ROOT),
+            WEB_CONCURRENCY=str(args.workers),
+            BIND=f"{HOST}:{args.port}",
+            DRAIN_TIMEOUT_SECONDS=str(args.drain_timeout),
+            GRACEFUL_TIMEOUT=str(int(args.drain_timeout) + 10),
+        ),
+    )
+    killed = False
+    try:
+        await wait_ready(args.port)
+        load_task = asyncio.create_task(load(args.port, accounts, args.concurrency, server))
+        await asyncio.sleep(args.after)
+        sigterm_at = time.monotonic()
+        server.send_signal(signal.SIGTERM)
+        try:
+            await asyncio.to_thread(server.wait, args.drain_timeout + 15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            killed = True
+        shutdown_s = time.monotonic() - sigterm_at
+        results = await load_task
+    finally:
+        if server.poll() is None:
+            server.kill()
+
+    stored = await stored_transactions([transaction_id for transaction_id, _ in results])
+    outcomes = Counter(classify(status_code, transaction_id in stored) for transaction_id, status_code in results)
+    print()
+    print_table([{"outcome": outcome, "count": count} for outcome, count in sorted(outcomes.items())],
+                ["outcome", "count"])
+    print(f"\nShutdown took {shutdown_s:.2f}s after SIGTERM, exit code {server.returncode}"
+          f"{' (killed)' if killed else ''}")
+
+    failed = killed or outcomes["lost"] or outcomes["inconsistent"]
+    print("FAILED" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--after", type=float, default=5, help="Seconds of load before SIGTERM")
+    parser.add_argument("--drain-timeout", type=float, default=20)
+    parser.add_argument("--accounts", type=int, default=1000, help="Accounts to spread webhooks over")
+    parser.add_argument("--port", type=int, default=8768)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,133 @@
+"""
+Concurrency check of the admin user writes on the same email.
+
+Drives the admin endpoints in-process against the database from
+``DATABASE_URL``. For each of ``--rounds`` emails:
+
+- ``create``: ``--concurrency`` simultaneous ``POST /api/admin/users`` with that email
+- ``update``: ``--concurrency`` simultaneous ``PATCH /api/admin/users/{id}``
+  of different users to one new email
+
+Exactly one request per round may succeed (201/200), every other one must
+be answered with 400, and the email must belong to exactly one user
+afterwards. Any other status, e.g. a 500 from a unique violation that
+escaped as a server error, fails the check with exit status 1.
+
+Usage:
+    BCRYPT_ROUNDS=4 python -m scripts.benchmarks.duplicate_emails --rounds 50 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import sys
+from collections import Counter
+
+from sqlalchemy import delete, func, select
+
+from app.core.security import create_access_token
+from app.db import session as db_session
+from app.db.models import User, UserRole
+from app.main import app
+from scripts.benchmarks.common import asgi_request, json_body, print_table
+
+EMAIL_PREFIX = "duplicate-emails-check-"
+
+
+async def admin_headers() -> dict:
+    async with db_session.AsyncSessionLocal() as db:
+        admin_id = (await db.execute(
+            select(User.id).where(User.role == UserRole.ADMIN, User.deleted_at.is_(None)).order_by(User.id).limit(1)
+        )).scalar_one_or_none()
+    if admin_id is None:
+        sys.exit("No admin user found, run `python -m scripts.generate_data` first")
+    return {"authorization": f"Bearer {create_access_token({'sub': str(admin_id), 'role': 'ADMIN'})}"}
+
+
+async def delete_check_users() -> None:
+    async with db_session.AsyncSessionLocal() as db:
+        await db.execute(delete(User).where(User.email.like(f"{EMAIL_PREFIX}%")))
+        await db.commit()
+
+
+async def owners(email: str) -> int:
+    async with db_session.AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(User).where(User.email == email))).scalar_one()
+
+
+async def race(requests: list) -> Counter:
+    """Send all ``requests`` (method, path, headers, body) at once and count the response statuses."""
+    responses = await asyncio.gather(*(
+        asgi_request(app, method, path, headers=headers, body=body) for method, path, headers, body in requests
+    ))
+    for status_code, body in responses:
+        if status_code not in (200, 201, 400):
+            print(f"Unexpected {status_code}: {body[:200]!r}", file=sys.stderr)
+    return Counter(status_code for status_code, _ in responses)
+
+
+def check(operation: str, statuses: list[Counter], owner_counts: list[int], success: int) -> dict:
+    total = sum(statuses, Counter())
+    failed_rounds = sum(
+        1 for counts, owner_count in zip(statuses, owner_counts)
+        if counts[success] != 1 or counts[400] != sum(counts.values()) - 1 or owner_count != 1
+    )
+    return {
+        "operation": operation,
+        "rounds": len(statuses),
+        "succeeded": total[success],
+        "rejected_400": total[400],
+        "other": sum(count for status_code, count in total.items() if status_code not in (success, 400)),
+        "failed_rounds": failed_rounds,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    headers = await admin_headers()
+    await delete_check_users()
+
+    def create_request(email: str, number: int) -> tuple:
+        request_headers, body = json_body({
+            "email": email, "password": f"password-{number}", "full_name": f"Duplicate Check {number}",
+        })
+        return "POST", "/api/admin/users", {**headers, **request_headers}, body
+
+    def update_request(user_id: int, email: str) -> tuple:
+        request_headers, body = json_body({"email": email})
+        return "PATCH", f"/api/admin/users/{user_id}", {**headers, **request_headers}, body
+
+    rows = []
+    try:
+        create_statuses, create_owners = [], []
+        for number in range(args.rounds):
+            email = f"{EMAIL_PREFIX}create-{number}@example.com"
+            create_statuses.append(await race([create_request(email, n) for n in range(args.concurrency)]))
+            create_owners.append(await owners(email))
+        rows.append(check("create", create_statuses, create_owners, 201))
+
+        # Users whose emails are changed to one shared email per round
+        user_ids = []
+        for number in range(args.concurrency):
+            status_code, body = await asgi_request(
+                app, *create_request(f"{EMAIL_PREFIX}source-{number}@example.com", number)
+            )
+            user_ids.append(json.loads(body)["id"])
+        update_statuses, update_owners = [], []
+        for number in range(args.rounds):
+            email = f"{EMAIL_PREFIX}update-{number}@example.com"
+            update_statuses.append(await race([update_request(user_id, email) for user_id in user_ids]))
+            update_owners.append(await owners(email))
+        rows.append(check("update", update_statuses, update_owners, 200))
+    finally:
+        await delete_check_users()
+        await db_session.engine.dispose()
+
+    print_table(rows, ["operation", "rounds", "succeeded", "rejected_400", "other", "failed_rounds"])
+    if any(row["failed_rounds"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=50, help="Emails raced for")
+    parser.add_argument("--concurrency", type=int, default=20, help="Simultaneous requests per email")
+    asyncio.run(main(parser.parse_args()))
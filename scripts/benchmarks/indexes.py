@@ -0,0 +1,145 @@
+"""
+Write throughput of the webhook path with the old and the audited index set.
+
+Creates ``users``/``accounts``/``payments`` copies in a scratch schema twice:
+
+- ``before``: PK-duplicate indexes on ``users.id``, ``accounts.id`` and
+  ``payments.transaction_id``, no index on the payments foreign keys
+- ``after``:  duplicates dropped, ``payments.user_id`` and
+  ``payments.account_id`` indexed (current migration head)
+
+and runs concurrent webhook-shaped transactions against each: insert a
+payment and credit the account balance. A user-history lookup is measured
+too, since that is what the new foreign key indexes are for.
+
+Usage:
+    python -m scripts.benchmarks.indexes --users 10000 --payments 500000 --transactions 20000
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import asyncpg
+
+from app.db.session import asyncpg_dsn
+from scripts.benchmarks.common import print_table, run_concurrently
+
+SCHEMA = "bench_indexes"
+
+INDEX_SETS = {
+    "before": [
+        "CREATE INDEX ix_users_id ON {schema}.users (id)",
+        "CREATE INDEX ix_accounts_id ON {schema}.accounts (id)",
+        "CREATE INDEX ix_payments_transaction_id ON {schema}.payments (transaction_id)",
+    ],
+    "after": [
+        "CREATE INDEX ix_payments_user_id ON {schema}.payments (user_id)",
+        "CREATE INDEX ix_payments_account_id ON {schema}.payments (account_id)",
+    ],
+}
+
+
+async def setup(conn: asyncpg.Connection, layout: str, users: int, payments: int) -> None:
+    schema = f"{SCHEMA}_{layout}"
+    await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {schema}")
+    await conn.execute(f"""
+        CREATE TABLE {schema}.users (
+            id BIGSERIAL PRIMARY KEY,
+            email VARCHAR UNIQUE NOT NULL
+        );
+        CREATE TABLE {schema}.accounts (
+            id BIGINT PRIMARY KEY,
+            user_id BIGINT NOT NULL REFERENCES {schema}.users (id) ON DELETE CASCADE,
+            balance NUMERIC(10, 2) NOT NULL DEFAULT 0
+        );
+        CREATE INDEX ix_accounts_user_id ON {schema}.accounts (user_id);
+        CREATE TABLE {schema}.payments (
+            transaction_id UUID PRIMARY KEY,
+            user_id BIGINT REFERENCES {schema}.users (id) ON DELETE SET NULL,
+            account_id BIGINT REFERENCES {schema}.accounts (id) ON DELETE SET NULL,
+            amount NUMERIC(10, 2) NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+    for statement in INDEX_SETS[layout]:
+        await conn.execute(statement.format(schema=schema))
+
+    await conn.execute(f"""
+        INSERT INTO {schema}.users (email)
+        SELECT 'user' || n || '@example.com' FROM generate_series(1, $1) n
+    """, users)
+    await conn.execute(f"INSERT INTO {schema}.accounts (id, user_id) SELECT id, id FROM {schema}.users")
+    await conn.execute(f"""
+        INSERT INTO {schema}.payments (transaction_id, user_id, account_id, amount)
+        SELECT gen_random_uuid(), u, u, round((random() * 100)::numeric, 2)
+        FROM (SELECT (random() * ($1 - 1))::bigint + 1 AS u FROM generate_series(1, $2)) generated
+    """, users, payments)
+    await conn.execute(f"ANALYZE {schema}.users, {schema}.accounts, {schema}.payments")
+
+
+async def measure(pool: asyncpg.Pool, layout: str, users: int, transactions: int, concurrency: int) -> list[dict]:
+    schema = f"{SCHEMA}_{layout}"
+
+    async def webhook(_: int) -> bool:
+        account_id = random.randint(1, users)
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    f"INSERT INTO {schema}.payments (transaction_id, user_id, account_id, amount) "
+                    f"VALUES ($1, $2, $2, 10.00)",
+                    uuid.uuid4(), account_id,
+                )
+                await conn.execute(
+                    f"UPDATE {schema}.accounts SET balance = balance + 10.00 WHERE id = $1", account_id
+                )
+        return True
+
+    async def history(_: int) -> bool:
+        async with pool.acquire() as conn:
+            await conn.fetch(f"SELECT * FROM {schema}.payments WHERE user_id = $1", random.randint(1, users))
+        return True
+
+    results = [{"layout": layout, "operation": "webhook tx", **await run_concurrently(webhook, transactions, concurrency)}]
+    results.append({
+        "layout": layout,
+        "operation": "user history",
+        **await run_concurrently(history, min(transactions, 2000), concurrency),
+    })
+
+    async with pool.acquire() as conn:
+        size = await conn.fetchval(f"SELECT pg_indexes_size('{schema}.payments') + pg_indexes_size('{schema}.accounts')")
+    results[0]["index_mb"] = round(size / 1024 / 1024, 1)
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    pool = await asyncpg.create_pool(asyncpg_dsn(), min_size=args.concurrency, max_size=args.concurrency)
+    results = []
+    try:
+        for layout in INDEX_SETS:
+            started = time.perf_counter()
+            await setup(conn, layout, args.users, args.payments)
+            print(f"  {layout}: loaded in {time.perf_counter() - started:.1f}s", flush=True)
+            results += await measure(pool, layout, args.users, args.transactions, args.concurrency)
+        print()
+        print_table(results, ["layout", "operation", "rps", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "index_mb"])
+    finally:
+        await pool.close()
+        if not args.keep:
+            for layout in INDEX_SETS:
+                await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA}_{layout} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--payments", type=int, default=500_000, help="Preloaded payments per layout")
+    parser.add_argument("--transactions", type=int, default=20_000, help="Measured webhook transactions")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA}_* schemas afterwards")
+    asyncio.run(main(parser.parse_args()))
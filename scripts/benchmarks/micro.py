@@ -0,0 +1,276 @@
+"""
+Microbenchmarks of the CPU-bound hot paths, without a database.
+
+- ``verify_signature``: ``WebhookService.verify_signature`` of a valid and a
+  forged signature
+- ``tokens``: ``create_access_token`` and ``validate_token``
+- ``webhook_request``: ``WebhookRequest`` validation of a valid payload and
+  of one with a malformed signature (the regex check fails)
+- ``payments_response`` / ``users_response``: building ``PaymentListResponse``
+  and ``UsersListResponse`` from ORM objects the way the endpoints do
+  (``build``), and FastAPI's serialization of the built response to the
+  JSON body (``serialize``), for every row count of ``--rows``
+
+Each benchmark is calibrated to run at least ``--min-time`` per round and
+repeated for ``--min-rounds`` rounds or ``--max-time`` seconds, whichever is
+longer, like pytest-benchmark. Statistics are per call. A full run takes a
+few minutes, most of it at 100k rows; ``--rows 10,1000`` is quicker. ``--json`` saves the
+results with the machine and commit they were measured on; ``--compare``
+shows the change of the median against such a file.
+
+Usage:
+    python -m scripts.benchmarks.micro --json micro-before.json
+    python -m scripts.benchmarks.micro --compare micro-before.json --json micro-after.json
+    python -m scripts.benchmarks.micro -k tokens
+"""
+import argparse
+import gc
+import json
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app.api.endpoints import admin, users
+from app.core.config import WEBHOOK_SECRET_KEY
+from app.core.dependencies import validate_token
+from app.core.security import create_access_token
+from app.db.models import Account, Payment, User, UserRole
+from app.db.utils.payment import WebhookService
+from app.schemas import AccountResponse, PaymentListResponse, PaymentResponse, UserResponse
+from app.schemas.payment import WebhookRequest
+from app.schemas.user import UsersListResponse, UserWithAccountsResponse
+from scripts.benchmarks.common import machine_info, print_table
+from scripts.fill_db import create_signature
+
+NOW = datetime(2025, 9, 8, 12, 0, tzinfo=timezone.utc)
+
+
+def resolve(coroutine):
+    """Run a coroutine that never suspends, without an event loop."""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError("Coroutine suspended")
+
+
+def webhook_payload(number: int) -> dict:
+    payload = {
+        "transaction_id": str(uuid.UUID(int=number, version=4)),
+        "user_id": 10 + number,
+        "account_id": 100 + number,
+        "amount": 100.5,
+    }
+    payload["signature"] = create_signature(payload, WEBHOOK_SECRET_KEY)
+    return payload
+
+
+def make_payments(rows: int) -> list[Payment]:
+    return [
+        Payment(
+            transaction_id=uuid.UUID(int=number, version=4),
+            user_id=1,
+            account_id=1 + number % 3,
+            amount_minor=1000 + number,
+            created_at=NOW - timedelta(minutes=number),
+        )
+        for number in range(rows)
+    ]
+
+
+def make_users(rows: int) -> dict:
+    """Users with 1-3 accounts each, shaped like ``UserService.get_all_users_with_accounts``."""
+    user_data = {}
+    for number in range(rows):
+        user = User(
+            id=number + 1, email=f"user_{number}@example.com", full_name=f"User {number}",
+            role=UserRole.USER, created_at=NOW, updated_at=None,
+        )
+        accounts = [
+            Account(id=number * 3 + index, user_id=number + 1, balance_minor=10050 * index, created_at=NOW)
+            for index in range(1 + number % 3)
+        ]
+        user_data[user.id] = {"user": user, "accounts": accounts}
+    return user_data
+
+
+def build_payments(payments: list[Payment]) -> PaymentListResponse:
+    # As in ger_users_payments
+    return PaymentListResponse(payments=[PaymentResponse.model_validate(payment) for payment in payments])
+
+
+def build_users(user_data: dict) -> UsersListResponse:
+    # As in get_users_with_accounts
+    user_responses = []
+    for data in user_data.values():
+        account_responses = [AccountResponse.model_validate(account) for account in data["accounts"]]
+        user_response = UserResponse.model_validate(data["user"])
+        user_responses.append(UserWithAccountsResponse(**user_response.model_dump(), accounts=account_responses))
+    return UsersListResponse(users=user_responses, total_count=len(user_responses))
+
+
+def route(router, path: str, method: str = "GET"):
+    return next(r for r in router.routes if r.path == path and method in r.methods)
+
+
+def serializer(endpoint_route, response) -> Callable[[], bytes]:
+    """Response model validation, serialization and JSON rendering of ``response`` as FastAPI runs them."""
+    def serialize() -> bytes:
+        content = resolve(serialize_response(
+            field=endpoint_route.response_field,
+            response_content=response,
+            exclude_none=endpoint_route.response_model_exclude_none,
+            is_coroutine=True,
+        ))
+        return JSONResponse(content).body
+    return serialize
+
+
+def benchmarks(rows: list[int]) -> list[tuple[str, str, dict, Callable]]:
+    """All benchmarks as (group, name, params, zero-argument function); the setup runs here, not in the timing."""
+    payload = webhook_payload(1)
+    forged = dict(payload, signature="0" * 64)
+    malformed = dict(payload, signature="Z" * 64)
+    token = create_access_token({"sub": "123", "role": "USER"})
+    token_data = {"sub": "123", "role": "USER"}
+
+    def validate_malformed() -> None:
+        try:
+            WebhookRequest.model_validate(malformed)
+        except ValueError:
+            pass
+
+    cases = [
+        ("verify_signature", "valid", {},
+         lambda: WebhookService.verify_signature(payload, payload["signature"], WEBHOOK_SECRET_KEY)),
+        ("verify_signature", "forged", {},
+         lambda: WebhookService.verify_signature(forged, forged["signature"], WEBHOOK_SECRET_KEY)),
+        ("tokens", "create_access_token", {}, lambda: create_access_token(token_data)),
+        ("tokens", "validate_token", {}, lambda: resolve(validate_token(token))),
+        ("webhook_request", "valid", {}, lambda: WebhookRequest.model_validate(payload)),
+        ("webhook_request", "malformed_signature", {}, validate_malformed),
+    ]
+
+    payments_route = route(users.router, "/users/payments")
+    users_route = route(admin.router, "/admin/users")
+    for count in rows:
+        payments = make_payments(count)
+        payments_response = build_payments(payments)
+        cases.append(("payments_response", "build", {"rows": count}, lambda payments=payments: build_payments(payments)))
+        cases.append(("payments_response", "serialize", {"rows": count}, serializer(payments_route, payments_response)))
+        user_data = make_users(count)
+        users_response = build_users(user_data)
+        cases.append(("users_response", "build", {"rows": count}, lambda user_data=user_data: build_users(user_data)))
+        cases.append(("users_response", "serialize", {"rows": count}, serializer(users_route, users_response)))
+    return cases
+
+
+def run_benchmark(function: Callable, min_time: float, max_time: float, min_rounds: int) -> dict:
+    """
+    Time ``function`` in rounds of calibrated iterations.
+
+    Returns:
+        dict: Per-call statistics in seconds, with the rounds and iterations per round
+    """
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        duration = time.perf_counter() - started
+        if duration >= min_time:
+            break
+        iterations *= 10 if duration < min_time / 10 else 2
+
+    rounds = max(min_rounds, int(max_time / duration))
+    timings = []
+    gc.collect()
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        timings.append((time.perf_counter() - started) / iterations)
+
+    quartiles = statistics.quantiles(timings, n=4) if len(timings) > 1 else [timings[0]] * 3
+    return {
+        "min": min(timings),
+        "max": max(timings),
+        "mean": statistics.fmean(timings),
+        "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "median": statistics.median(timings),
+        "iqr": quartiles[2] - quartiles[0],
+        "ops": 1 / statistics.fmean(timings),
+        "rounds": rounds,
+        "iterations": iterations,
+    }
+
+
+def full_name(group: str, name: str, params: dict) -> str:
+    suffix = "".join(f"[{key}={value}]" for key, value in params.items())
+    return f"{group}.{name}{suffix}"
+
+
+def format_time(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.2f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.3f} s"
+
+
+def main(args: argparse.Namespace) -> None:
+    previous = {}
+    if args.compare:
+        previous = {entry["fullname"]: entry for entry in json.loads(Path(args.compare).read_text())["benchmarks"]}
+
+    results = []
+    rows = []
+    for group, name, params, function in benchmarks([int(count) for count in args.rows.split(",")]):
+        fullname = full_name(group, name, params)
+        if args.k and args.k not in fullname:
+            continue
+        stats = run_benchmark(function, args.min_time, args.max_time, args.min_rounds)
+        results.append({"group": group, "name": name, "fullname": fullname, "params": params, "stats": stats})
+        row = {
+            "benchmark": fullname,
+            "median": format_time(stats["median"]),
+            "min": format_time(stats["min"]),
+            "iqr": format_time(stats["iqr"]),
+            "ops": f"{stats['ops']:,.0f}" if stats["ops"] >= 100 else f"{stats['ops']:.2f}",
+            "rounds": stats["rounds"],
+        }
+        if fullname in previous:
+            before = previous[fullname]["stats"]["median"]
+            row["change"] = f"{(stats['median'] / before - 1) * 100:+.1f}%"
+        rows.append(row)
+        print(f"  {fullname}: {row['median']}", file=sys.stderr, flush=True)
+
+    print_table(rows, ["benchmark", "median", "min", "iqr", "ops", "rounds", *(["change"] if previous else [])])
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "machine_info": machine_info(),
+            "datetime": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "options": {"min_time": args.min_time, "max_time": args.max_time, "min_rounds": args.min_rounds},
+            "benchmarks": results,
+        }, indent=2))
+        print(f"\nResults saved to {args.json}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10,1000,10000,100000", help="Comma separated row counts of the responses")
+    parser.add_argument("--min-time", type=float, default=0.005, help="Minimal seconds per round")
+    parser.add_argument("--max-time", type=float, default=1.0, help="Seconds to spend per benchmark")
+    parser.add_argument("--min-rounds", type=int, default=3)
+    parser.add_argument("-k", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--json", help="Save the results to this file")
+    parser.add_argument("--compare", help="Results file to compare the medians with")
+    main(parser.parse_args())
@@ -0,0 +1,164 @@
+"""
+NUMERIC vs BIGINT minor units on the balance update and aggregation paths.
+
+Builds ``accounts``/``payments`` copies with both money representations in a
+scratch schema and measures:
+
+- concurrent ``balance = balance + amount`` updates (the webhook credit)
+- ``sum(amount)`` over the whole table
+- ``sum(amount)`` grouped by account over the whole table (reconciliation)
+- ``sum(amount)`` of a single account through the account_id index
+- per-webhook conversion in Python: ``Decimal(str(amount)).quantize`` (previous
+  code) vs ``to_minor_units`` (current code)
+
+Usage:
+    python -m scripts.benchmarks.money --accounts 100000 --payments 5000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from decimal import Decimal
+
+import asyncpg
+
+from app.core.money import to_minor_units
+from app.db.session import asyncpg_dsn
+from scripts.benchmarks.common import print_table, run_concurrently, summarize
+
+SCHEMA = "bench_money"
+LAYOUTS = {
+    "numeric": {"type": "NUMERIC", "amount": "round((random() * 1000)::numeric, 2)", "credit": Decimal("10.50")},
+    "bigint": {"type": "BIGINT", "amount": "(random() * 100000)::bigint", "credit": 1050},
+}
+
+
+async def setup(conn: asyncpg.Connection, accounts: int, payments: int) -> None:
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    for layout, spec in LAYOUTS.items():
+        await conn.execute(f"""
+            CREATE TABLE {SCHEMA}.accounts_{layout} (
+                id BIGINT PRIMARY KEY,
+                balance {spec['type']} NOT NULL DEFAULT 0
+            );
+            CREATE TABLE {SCHEMA}.payments_{layout} (
+                id BIGSERIAL PRIMARY KEY,
+                account_id BIGINT NOT NULL,
+                amount {spec['type']} NOT NULL
+            );
+        """)
+        await conn.execute(
+            f"INSERT INTO {SCHEMA}.accounts_{layout} (id) SELECT generate_series(1, $1)", accounts
+        )
+        await conn.execute(f"""
+            INSERT INTO {SCHEMA}.payments_{layout} (account_id, amount)
+            SELECT (random() * ($1 - 1))::bigint + 1, {spec['amount']}
+            FROM generate_series(1, $2)
+        """, accounts, payments)
+        await conn.execute(f"CREATE INDEX ON {SCHEMA}.payments_{layout} (account_id)")
+        await conn.execute(f"VACUUM ANALYZE {SCHEMA}.accounts_{layout}, {SCHEMA}.payments_{layout}")
+
+
+async def timed(operation, count: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(count):
+        op_started = time.perf_counter()
+        await operation()
+        latencies.append(time.perf_counter() - op_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def measure(conn: asyncpg.Connection, pool: asyncpg.Pool, args: argparse.Namespace) -> list[dict]:
+    results = []
+    for layout, spec in LAYOUTS.items():
+        accounts = f"{SCHEMA}.accounts_{layout}"
+        payments = f"{SCHEMA}.payments_{layout}"
+
+        async def credit(_: int) -> bool:
+            async with pool.acquire() as pooled:
+                await pooled.execute(
+                    f"UPDATE {accounts} SET balance = balance + $2 WHERE id = $1",
+                    random.randint(1, args.accounts), spec["credit"],
+                )
+            return True
+
+        results.append({
+            "layout": layout,
+            "operation": "credit update",
+            **await run_concurrently(credit, args.updates, args.concurrency),
+        })
+        results.append({
+            "layout": layout,
+            "operation": "sum (full)",
+            **await timed(lambda: conn.fetchval(f"SELECT sum(amount) FROM {payments}"), args.aggregations),
+        })
+        results.append({
+            "layout": layout,
+            "operation": "sum by account (full)",
+            **await timed(lambda: conn.fetch(f"SELECT account_id, sum(amount) FROM {payments} GROUP BY 1"),
+                          args.aggregations),
+        })
+        results.append({
+            "layout": layout,
+            "operation": "sum of one account",
+            **await timed(lambda: conn.fetchval(
+                f"SELECT sum(amount) FROM {payments} WHERE account_id = $1", random.randint(1, args.accounts)
+            ), 2000),
+        })
+        size = await conn.fetchval(f"SELECT pg_table_size('{payments}')")
+        results[-1]["table_mb"] = round(size / 1024 / 1024, 1)
+    return results
+
+
+def measure_conversion(iterations: int) -> list[dict]:
+    amounts = [round(random.uniform(0.01, 10_000), 2) for _ in range(1000)]
+    decimals = [Decimal(str(amount)) for amount in amounts]
+    conversions = {
+        "numeric": lambda i: Decimal(str(amounts[i])).quantize(Decimal('0.01')),
+        "bigint": lambda i: to_minor_units(decimals[i]),
+    }
+    results = []
+    for layout, convert in conversions.items():
+        started = time.perf_counter()
+        for n in range(iterations):
+            convert(n % 1000)
+        elapsed = time.perf_counter() - started
+        results.append({
+            "layout": layout,
+            "operation": "python conversion",
+            "rps": round(iterations / elapsed),
+            "mean_ms": round(elapsed / iterations * 1000, 6),
+        })
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    pool = await asyncpg.create_pool(asyncpg_dsn(), min_size=args.concurrency, max_size=args.concurrency)
+    try:
+        started = time.perf_counter()
+        await setup(conn, args.accounts, args.payments)
+        print(f"Loaded in {time.perf_counter() - started:.1f}s", flush=True)
+        results = await measure(conn, pool, args)
+        results += measure_conversion(args.conversions)
+        print()
+        print_table(results, ["layout", "operation", "rps", "mean_ms", "p50_ms", "p95_ms", "table_mb"])
+    finally:
+        await pool.close()
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=100_000)
+    parser.add_argument("--payments", type=int, default=5_000_000)
+    parser.add_argument("--updates", type=int, default=20_000, help="Measured credit updates per layout")
+    parser.add_argument("--aggregations", type=int, default=5, help="Full-table aggregations per layout")
+    parser.add_argument("--conversions", type=int, default=1_000_000, help="Python conversions per layout")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA} schema afterwards")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,185 @@
+"""
+Insert and query benchmark: plain vs monthly-partitioned ``payments``.
+
+Builds both layouts in a scratch schema, bulk-loads ``--rows`` payments spread
+over ``--months`` months (server-side ``generate_series``, so loading 100M rows
+needs a few hours and ~40GB of disk per layout), then measures:
+
+- webhook-shaped single-row inserts (partitioned: dedupe row + payment)
+- dedupe lookup by ``transaction_id``
+- recent payment history of one user
+- VACUUM of the plain table vs the current month's partition
+
+Usage:
+    python -m scripts.benchmarks.partitions --rows 100000000 --months 24
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+import asyncpg
+
+from app.db.partitions import add_months, month_start
+from app.db.session import asyncpg_dsn
+from scripts.benchmarks.common import print_table, summarize
+
+SCHEMA = "bench_partitions"
+USERS = 100_000
+
+
+async def setup(conn: asyncpg.Connection, months: int) -> None:
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    await conn.execute(f"""
+        CREATE TABLE {SCHEMA}.plain (
+            transaction_id UUID PRIMARY KEY,
+            user_id BIGINT, account_id BIGINT, amount NUMERIC NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE INDEX ON {SCHEMA}.plain (transaction_id);
+        CREATE INDEX ON {SCHEMA}.plain (user_id);
+
+        CREATE TABLE {SCHEMA}.partitioned (
+            transaction_id UUID NOT NULL,
+            user_id BIGINT, account_id BIGINT, amount NUMERIC NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (transaction_id, created_at)
+        ) PARTITION BY RANGE (created_at);
+        CREATE INDEX ON {SCHEMA}.partitioned (user_id);
+        CREATE TABLE {SCHEMA}.dedupe (
+            transaction_id UUID PRIMARY KEY,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+
+    current = month_start(datetime.now(timezone.utc).date())
+    for offset in range(-months, 2):
+        month = add_months(current, offset)
+        await conn.execute(
+            f"CREATE TABLE {SCHEMA}.p_{month:%Y_%m} PARTITION OF {SCHEMA}.partitioned "
+            f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+        )
+
+
+async def load(conn: asyncpg.Connection, rows: int, months: int, batch: int) -> list[dict]:
+    generated = f"""
+        SELECT gen_random_uuid() AS transaction_id,
+               (random() * {USERS})::bigint + 1 AS user_id,
+               (random() * {USERS * 2})::bigint + 1 AS account_id,
+               round((random() * 1000)::numeric, 2) AS amount,
+               now() - random() * interval '{months * 30} days' AS created_at
+        FROM generate_series(1, $1)
+    """
+    targets = {
+        "plain": f"INSERT INTO {SCHEMA}.plain {generated}",
+        "partitioned": f"""
+            WITH generated AS ({generated}),
+            deduped AS (
+                INSERT INTO {SCHEMA}.dedupe SELECT transaction_id, created_at FROM generated
+            )
+            INSERT INTO {SCHEMA}.partitioned SELECT * FROM generated
+        """,
+    }
+
+    results = []
+    for layout, statement in targets.items():
+        started = time.perf_counter()
+        loaded = 0
+        while loaded < rows:
+            size = min(batch, rows - loaded)
+            await conn.execute(statement, size)
+            loaded += size
+            elapsed = time.perf_counter() - started
+            print(f"  {layout}: {loaded:,}/{rows:,} rows, {loaded / elapsed:,.0f} rows/s", flush=True)
+        await conn.execute(f"ANALYZE {SCHEMA}.{layout}")
+        results.append({"layout": layout, "operation": "bulk load", "rps": round(rows / (time.perf_counter() - started))})
+    return results
+
+
+async def timed(operation, count: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(count):
+        op_started = time.perf_counter()
+        await operation()
+        latencies.append(time.perf_counter() - op_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def measure(conn: asyncpg.Connection, count: int) -> list[dict]:
+    sample_tx = await conn.fetchval(f"SELECT transaction_id FROM {SCHEMA}.dedupe LIMIT 1")
+    recent = "created_at >= now() - interval '30 days'"
+
+    async def insert_plain():
+        async with conn.transaction():
+            await conn.execute(
+                f"INSERT INTO {SCHEMA}.plain (transaction_id, user_id, account_id, amount) VALUES ($1, 1, 1, 1.00)",
+                uuid.uuid4(),
+            )
+
+    async def insert_partitioned():
+        async with conn.transaction():
+            created_at = await conn.fetchval(
+                f"INSERT INTO {SCHEMA}.dedupe (transaction_id) VALUES ($1) "
+                f"ON CONFLICT DO NOTHING RETURNING created_at",
+                transaction_id := uuid.uuid4(),
+            )
+            await conn.execute(
+                f"INSERT INTO {SCHEMA}.partitioned (transaction_id, user_id, account_id, amount, created_at) "
+                f"VALUES ($1, 1, 1, 1.00, $2)",
+                transaction_id, created_at,
+            )
+
+    operations = [
+        ("plain", "webhook insert", insert_plain),
+        ("partitioned", "webhook insert", insert_partitioned),
+        ("plain", "dedupe lookup", lambda: conn.fetchrow(
+            f"SELECT 1 FROM {SCHEMA}.plain WHERE transaction_id = $1", sample_tx)),
+        ("partitioned", "dedupe lookup", lambda: conn.fetchrow(
+            f"SELECT 1 FROM {SCHEMA}.dedupe WHERE transaction_id = $1", sample_tx)),
+        ("plain", "user history (30d)", lambda: conn.fetch(
+            f"SELECT * FROM {SCHEMA}.plain WHERE user_id = $1 AND {recent}", 42)),
+        ("partitioned", "user history (30d)", lambda: conn.fetch(
+            f"SELECT * FROM {SCHEMA}.partitioned WHERE user_id = $1 AND {recent}", 42)),
+    ]
+
+    results = []
+    for layout, name, operation in operations:
+        results.append({"layout": layout, "operation": name, **await timed(operation, count)})
+
+    current = f"p_{month_start(datetime.now(timezone.utc).date()):%Y_%m}"
+    for layout, table in (("plain", "plain"), ("partitioned", current)):
+        started = time.perf_counter()
+        await conn.execute(f"VACUUM {SCHEMA}.{table}")
+        results.append({
+            "layout": layout,
+            "operation": f"vacuum {table}",
+            "mean_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        await setup(conn, args.months)
+        results = await load(conn, args.rows, args.months, args.batch)
+        results += await measure(conn, args.operations)
+        print()
+        print_table(results, ["layout", "operation", "rps", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--batch", type=int, default=1_000_000, help="Rows per INSERT ... SELECT")
+    parser.add_argument("--operations", type=int, default=2000, help="Iterations per measured operation")
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA} schema afterwards")
+    asyncio.run(main(parser.parse_args()))
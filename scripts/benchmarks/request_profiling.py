@@ -0,0 +1,105 @@
+"""
+Overhead of the on-demand request profiler.
+
+Runs in-process (no HTTP server):
+
+- ``bare`` / ``untriggered``: a trivial ASGI app on its own and wrapped in
+  ``RequestProfilingMiddleware``, with the headers of an API request but no
+  ``X-Profile``; the difference is what every request pays
+- ``api`` / ``api_profiled``: ``GET /api/admin/users`` of the real app
+  without and with ``X-Profile: 1`` and an admin token, against the
+  database from ``DATABASE_URL``; the difference is the cost of a profiled
+  request, whose reports are written to a temporary directory
+
+Usage:
+    python -m scripts.benchmarks.request_profiling --requests 20000 --api-requests 200
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+
+from sqlalchemy import select
+
+from app.core import profiler
+from app.core.middleware import RequestProfilingMiddleware
+from app.core.security import create_access_token
+from app.db import session as db_session
+from app.db.models import User, UserRole
+from app.main import app
+from scripts.benchmarks.common import asgi_request, print_table, summarize
+
+
+async def trivial_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def admin_headers() -> dict:
+    async with db_session.AsyncSessionLocal() as db:
+        admin_id = (await db.execute(
+            select(User.id).where(User.role == UserRole.ADMIN, User.deleted_at.is_(None)).order_by(User.id).limit(1)
+        )).scalar_one_or_none()
+    if admin_id is None:
+        sys.exit("No admin user found, run `python -m scripts.generate_data` first")
+    return {"authorization": f"Bearer {create_access_token({'sub': str(admin_id), 'role': 'ADMIN'})}"}
+
+
+async def measure(name: str, target, path: str, headers: dict, requests: int) -> dict:
+    for _ in range(min(requests, 100)):
+        await asgi_request(target, "GET", path, headers=headers)
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        request_started = time.perf_counter()
+        status_code, _ = await asgi_request(target, "GET", path, headers=headers)
+        latencies.append(time.perf_counter() - request_started)
+        if status_code != 200:
+            errors += 1
+    row = {"case": name, **summarize(latencies, time.perf_counter() - started, errors)}
+    row["mean_us"] = round(row["mean_ms"] * 1000, 1)
+    return row
+
+
+async def main(args: argparse.Namespace) -> None:
+    headers = {
+        **await admin_headers(),
+        "accept": "application/json",
+        "user-agent": "benchmark",
+        "accept-encoding": "gzip, deflate",
+        "host": "benchmark",
+    }
+    store = profiler.ProfileStore(tempfile.mkdtemp(prefix="request_profiling_bench_"), keep=args.api_requests)
+    wrapped = RequestProfilingMiddleware(trivial_app, sampler=profiler.request_sampler, store=store)
+    # Profiled requests of the real app go to the temporary store as well
+    profiler.profile_store.directory = store.directory
+
+    rows = [
+        await measure("bare", trivial_app, "/", headers, args.requests),
+        await measure("untriggered", wrapped, "/", headers, args.requests),
+        await measure("api", app, "/api/admin/users?limit=100", headers, args.api_requests),
+        await measure("api_profiled", app, "/api/admin/users?limit=100", {**headers, "x-profile": "1"},
+                      args.api_requests),
+    ]
+    reports = await store.summaries()
+    samples = sum(report["samples"] for report in reports) / len(reports) if reports else 0
+    await db_session.engine.dispose()
+
+    if args.json:
+        print(json.dumps({"rows": rows, "mean_samples_per_profile": samples}, indent=2))
+        return
+    print_table(rows, ["case", "count", "errors", "mean_us", "p50_ms", "p95_ms", "p99_ms"])
+    print(f"\nuntriggered overhead: {rows[1]['mean_us'] - rows[0]['mean_us']:.1f} us per request")
+    print(f"profiled request: +{rows[3]['mean_ms'] - rows[2]['mean_ms']:.3f} ms, "
+          f"{samples:.1f} samples per profile ({len(reports)} reports)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per trivial-app case")
+    parser.add_argument("--api-requests", type=int, default=200, help="Requests per real-app case")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,83 @@
+"""
+Request-level benchmark of ``get_db`` session modes.
+
+Drives ``/api/users/me``, ``/api/users/accounts`` and the payment webhook
+in-process (no HTTP server) against the database from ``DATABASE_URL``.
+Expects the development test data: user 1 with account 1.
+
+Usage:
+    python -m scripts.benchmarks.session_modes --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import uuid
+
+from app.core.config import WEBHOOK_SECRET_KEY
+from app.core.security import create_access_token
+from app.db import session as db_session
+from app.main import app
+from scripts.benchmarks.common import asgi_request, json_body, print_table, run_concurrently
+from scripts.fill_db import create_signature
+
+USER_ID = 1
+ACCOUNT_ID = 1
+
+
+def webhook_payload() -> dict:
+    payload = {
+        "transaction_id": str(uuid.uuid4()),
+        "user_id": USER_ID,
+        "account_id": ACCOUNT_ID,
+        "amount": 1.0,
+    }
+    payload["signature"] = create_signature(payload, WEBHOOK_SECRET_KEY)
+    return payload
+
+
+async def bench_mode(mode: str, total: int, concurrency: int) -> list[dict]:
+    db_session.DB_SESSION_MODE = mode
+    auth = {"authorization": f"Bearer {create_access_token({'sub': str(USER_ID), 'role': 'USER'})}"}
+
+    async def get(path):
+        status_code, _ = await asgi_request(app, "GET", path, headers=auth)
+        return status_code == 200
+
+    async def webhook(_):
+        headers, body = json_body(webhook_payload())
+        status_code, _ = await asgi_request(app, "POST", "/api/webhooks/payment", headers=headers, body=body)
+        return status_code == 200
+
+    scenarios = {
+        "/users/me": lambda _: get("/api/users/me"),
+        "/users/accounts": lambda _: get("/api/users/accounts"),
+        "/webhooks/payment": webhook,
+    }
+
+    rows = []
+    for name, operation in scenarios.items():
+        await run_concurrently(operation, min(total, 50), concurrency)
+        result = await run_concurrently(operation, total, concurrency)
+        rows.append({"mode": mode, "endpoint": name, **result})
+    return rows
+
+
+async def main(args: argparse.Namespace) -> None:
+    rows = []
+    for mode in args.modes.split(","):
+        rows.extend(await bench_mode(mode, args.requests, args.concurrency))
+    await db_session.engine.dispose()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, ["mode", "endpoint", "count", "errors", "rps", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--modes", default="transactional,lazy")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    asyncio.run(main(parser.parse_args()))
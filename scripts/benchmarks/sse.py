@@ -0,0 +1,244 @@
+"""
+Server memory and CPU per idle balance event stream, and push latency under that load.
+
+Starts a single uvicorn process with local fan-out and opens event streams
+of distinct users in steps up to ``--steps``' last value. After each step
+the server's RSS is read from ``/proc``. The growth over a warmed-up baseline,
+divided by the number of streams, is the memory per idle stream. This
+includes uvicorn's connection, the response task and the hub subscription.
+The cache is disabled, so the users and accounts it would hold for the snapshots
+are not counted.
+
+With all streams open, the script measures:
+- server CPU while the streams only get heartbeats, over ``--idle`` seconds
+- the time from posting a webhook to the ``balance`` event on the owner's
+  stream, for ``--probes`` users
+- RSS after all streams are closed again
+
+Usage:
+    python -m scripts.benchmarks.sse --steps 1000,5000,10000 --idle 30 --probes 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import uuid
+
+import asyncpg
+
+from app.core.config import PROJECT_ROOT, WEBHOOK_SECRET_KEY
+from app.core.security import create_access_token
+from app.db.session import asyncpg_dsn
+from scripts.benchmarks.common import HttpClient, json_body, print_table, summarize
+from scripts.fill_db import create_signature
+
+HOST = "127.0.0.1"
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"No VmRSS for process {pid}")
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        # Fields after the parenthesised command name; utime and stime are 14 and 15
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+async def load_users(limit: int) -> list[tuple[int, int]]:
+    """Users with their first account, one row per user."""
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        rows = await conn.fetch(
+            "SELECT user_id, min(id) AS account_id FROM accounts GROUP BY user_id ORDER BY user_id LIMIT $1", limit
+        )
+    finally:
+        await conn.close()
+    return [(row["user_id"], row["account_id"]) for row in rows]
+
+
+async def wait_ready(server: subprocess.Popen, port: int, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        client = HttpClient(HOST, port)
+        try:
+            status_code, _ = await client.request("GET", "/api/health/ready")
+            if status_code == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            await client.close()
+        await asyncio.sleep(0.1)
+    raise TimeoutError(f"Server on port {port} not ready within {timeout}s")
+
+
+class EventStream:
+    """Client side of one event stream over a raw connection."""
+
+    def __init__(self, user_id: int, account_id: int):
+        self.user_id = user_id
+        self.account_id = account_id
+        self.reader: asyncio.StreamReader
+        self.writer: asyncio.StreamWriter
+
+    async def open(self, port: int) -> None:
+        self.reader, self.writer = await asyncio.open_connection(HOST, port)
+        token = create_access_token({"sub": str(self.user_id), "role": "USER"})
+        self.writer.write(
+            f"GET /api/users/accounts/events HTTP/1.1\r\nHost: {HOST}\r\n"
+            f"Authorization: Bearer {token}\r\nAccept: text/event-stream\r\n\r\n".encode()
+        )
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status_line = head.split(b"\r\n", 1)[0]
+        if b" 200 " not in status_line:
+            raise RuntimeError(f"Stream of user {self.user_id} refused: {status_line.decode()}")
+        await self.next_event(b"event: accounts")
+
+    async def next_event(self, marker: bytes) -> None:
+        """Read until a chunk containing ``marker`` arrives."""
+        while True:
+            # Chunked transfer: size line, then the chunk
+            size = int((await self.reader.readuntil(b"\r\n")).strip(), 16)
+            chunk = await self.reader.readexactly(size + 2)
+            if marker in chunk:
+                return
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def open_streams(streams: list[EventStream], port: int, concurrency: int) -> None:
+    remaining = iter(streams)
+
+    async def worker():
+        for stream in remaining:
+            await stream.open(port)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def push_latencies(streams: list[EventStream], port: int) -> list[float]:
+    client = HttpClient(HOST, port)
+    latencies = []
+    try:
+        for stream in streams:
+            payload = {
+                "transaction_id": str(uuid.uuid4()),
+                "user_id": stream.user_id,
+                "account_id": stream.account_id,
+                "amount": round(random.uniform(1, 500), 2),
+            }
+            payload["signature"] = create_signature(payload, WEBHOOK_SECRET_KEY)
+            headers, body = json_body(payload)
+            started = time.perf_counter()
+            received = asyncio.create_task(stream.next_event(b"event: balance"))
+            status_code, _ = await client.request("POST", "/api/webhooks/payment", headers, body)
+            if status_code != 200:
+                received.cancel()
+                raise RuntimeError(f"Webhook failed with status {status_code}")
+            await asyncio.wait_for(received, 10)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        await client.close()
+    return latencies
+
+
+async def run(args: argparse.Namespace) -> None:
+    steps = sorted(int(step) for step in args.steps.split(","))
+    users = await load_users(steps[-1] + args.warm_up)
+    if len(users) < steps[-1] + args.warm_up:
+        sys.exit(f"Need {steps[-1] + args.warm_up} users with accounts, found {len(users)}")
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < steps[-1] + 100:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, steps[-1] + 1000), hard))
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", str(args.port),
+         "--log-level", "warning", "--backlog", "4096"],
+        cwd=PROJECT_ROOT,
+        env=dict(
+            os.environ,
+            PYTHONPATH=str(PROJECT_ROOT),
+            CACHE_ENABLED="false",
+            SSE_FANOUT="local",
+            SSE_MAX_CONNECTIONS=str(steps[-1] + args.warm_up),
+            SSE_HEARTBEAT_SECONDS=str(args.heartbeat),
+        ),
+    )
+    streams = [EventStream(user_id, account_id) for user_id, account_id in users]
+    rows = []
+    try:
+        await wait_ready(server, args.port)
+
+        # Code paths, statement caches and allocator arenas warmed before the baseline
+        warm_up, streams = streams[:args.warm_up], streams[args.warm_up:]
+        await open_streams(warm_up, args.port, args.concurrency)
+        for stream in warm_up:
+            stream.close()
+        await asyncio.sleep(args.settle)
+        baseline = rss_mb(server.pid)
+        rows.append({"streams": 0, "rss_mb": round(baseline, 1), "delta_mb": 0.0, "kb_per_stream": ""})
+
+        opened = 0
+        for step in steps:
+            started = time.perf_counter()
+            await open_streams(streams[opened:step], args.port, args.concurrency)
+            elapsed = time.perf_counter() - started
+            print(f"Opened {step - opened} streams in {elapsed:.1f}s", file=sys.stderr)
+            opened = step
+            await asyncio.sleep(args.settle)
+            rss = rss_mb(server.pid)
+            rows.append({
+                "streams": step,
+                "rss_mb": round(rss, 1),
+                "delta_mb": round(rss - baseline, 1),
+                "kb_per_stream": round((rss - baseline) * 1024 / step, 2),
+            })
+
+        cpu_before = cpu_seconds(server.pid)
+        await asyncio.sleep(args.idle)
+        idle_cpu = (cpu_seconds(server.pid) - cpu_before) / args.idle * 100
+
+        latencies = await push_latencies(random.sample(streams[:opened], args.probes), args.port)
+
+        for stream in streams[:opened]:
+            stream.close()
+        await asyncio.sleep(args.settle)
+        closed_rss = rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    print()
+    print_table(rows, ["streams", "rss_mb", "delta_mb", "kb_per_stream"])
+    print(f"\nIdle CPU with {opened} streams, heartbeat every {args.heartbeat}s: {idle_cpu:.1f}% of one core")
+    print(f"RSS after closing all streams: {closed_rss:.1f} MB")
+    print(f"\nWebhook to balance event with {opened} streams open:")
+    summary = summarize(latencies, sum(latencies))
+    print_table([summary], ["count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", default="1000,5000,10000", help="Open streams at each measurement")
+    parser.add_argument("--warm-up", type=int, default=200, help="Streams opened and closed before the baseline")
+    parser.add_argument("--concurrency", type=int, default=50, help="Streams being opened at the same time")
+    parser.add_argument("--settle", type=float, default=3.0, help="Seconds to wait before reading RSS")
+    parser.add_argument("--idle", type=float, default=30.0, help="Seconds of idle CPU measurement")
+    parser.add_argument("--heartbeat", type=float, default=15.0)
+    parser.add_argument("--probes", type=int, default=50, help="Webhooks whose push latency is measured")
+    parser.add_argument("--port", type=int, default=8769)
+    asyncio.run(run(parser.parse_args()))
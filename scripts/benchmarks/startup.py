@@ -0,0 +1,136 @@
+"""
+Cold start: import time of ``app.main`` and time to the first served request.
+
+Every measurement runs in a fresh interpreter:
+
+- ``import app.main`` with ``-X importtime``: total time and the packages
+  that take most of it
+- ``alembic upgrade head`` on an up-to-date database: the step development
+  startup used to run on every boot
+- uvicorn start until ``GET /openapi.json`` first answers 200, for each
+  ``SCHEMA_REVISION_CHECK`` mode
+
+Usage:
+    python -m scripts.benchmarks.startup --runs 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from app.core.config import PROJECT_ROOT
+from scripts.benchmarks.common import HttpClient, print_table
+
+HOST = "127.0.0.1"
+
+
+def python(*args: str, **env: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=PROJECT_ROOT, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=str(PROJECT_ROOT), **env), check=True,
+    )
+
+
+def parse_importtime(stderr: str) -> tuple[float, dict[str, float]]:
+    """
+    Return the cumulative import time of ``app.main`` and the self time of
+    every top-level package (all its submodules together), in ms.
+    """
+    total = 0.0
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if name == "app.main":
+            total = int(cumulative_us) / 1000
+        packages[name.split(".")[0]] += int(self_us) / 1000
+    return total, packages
+
+
+def measure_import(runs: int, top: int) -> tuple[dict, list[dict]]:
+    totals = []
+    packages = defaultdict(list)
+    for _ in range(runs):
+        total, per_package = parse_importtime(python("-X", "importtime", "-c", "import app.main").stderr)
+        totals.append(total)
+        for name, elapsed in per_package.items():
+            packages[name].append(elapsed)
+
+    heaviest = sorted(packages.items(), key=lambda item: -statistics.median(item[1]))[:top]
+    return (
+        {"step": "import app.main", "median_ms": round(statistics.median(totals), 1), "max_ms": round(max(totals), 1)},
+        [{"package": name, "median_ms": round(statistics.median(times), 1)} for name, times in heaviest],
+    )
+
+
+def measure_upgrade(runs: int) -> dict:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        python("-c", "from app.db.migrations import upgrade_to_head; upgrade_to_head()")
+        times.append((time.perf_counter() - started) * 1000)
+    return {"step": "alembic upgrade head (process)", "median_ms": round(statistics.median(times), 1),
+            "max_ms": round(max(times), 1)}
+
+
+async def wait_first_response(server: subprocess.Popen, port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        client = HttpClient(HOST, port)
+        try:
+            status_code, _ = await client.request("GET", "/openapi.json")
+            if status_code == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            await client.close()
+        await asyncio.sleep(0.01)
+    raise TimeoutError(f"No response on port {port} within {timeout}s")
+
+
+def measure_first_request(runs: int, port: int, mode: str) -> dict:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", str(port)],
+            cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            env=dict(os.environ, PYTHONPATH=str(PROJECT_ROOT), SCHEMA_REVISION_CHECK=mode),
+        )
+        try:
+            asyncio.run(wait_first_response(server, port, timeout=60))
+            times.append((time.perf_counter() - started) * 1000)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return {"step": f"first request ({mode})", "median_ms": round(statistics.median(times), 1),
+            "max_ms": round(max(times), 1)}
+
+
+def main(args: argparse.Namespace) -> None:
+    import_row, packages = measure_import(args.runs, args.top)
+    rows = [import_row, measure_upgrade(args.runs)]
+    for mode in args.modes.split(","):
+        rows.append(measure_first_request(args.runs, args.port, mode))
+
+    print_table(rows, ["step", "median_ms", "max_ms"])
+    print()
+    print_table(packages, ["package", "median_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", default="off,warn,upgrade", help="SCHEMA_REVISION_CHECK modes to start with")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest imported packages to show")
+    parser.add_argument("--port", type=int, default=8766)
+    main(parser.parse_args())
@@ -0,0 +1,92 @@
+"""
+Per-query CPU overhead of statement construction and compilation.
+
+Executes each hot query against an in-memory SQLite database (no network,
+no server), so the timings are dominated by SQLAlchemy's own work:
+
+- ``uncached``: fresh ``select()`` per call with the compiled cache disabled
+- ``fresh``:    fresh ``select()`` per call, compiled cache enabled (previous code)
+- ``lambda``:   statements from ``app.db.queries`` (current code)
+
+Usage:
+    python -m scripts.benchmarks.statements --iterations 20000
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+
+from app.db import queries
+from app.db.models import Account, Payment, User
+from app.db.session import Base
+from scripts.benchmarks.common import print_table
+
+CREATED_AT = datetime(2025, 9, 8, tzinfo=timezone.utc)
+
+FRESH = {
+    "user_by_id": lambda: select(User).where(User.id == 1),
+    "accounts_by_user": lambda: select(Account).where(Account.user_id == 1),
+    "payments_by_user": lambda: select(Payment).where(Payment.user_id == 1),
+    "payment_by_transaction": lambda: select(Payment).where(
+        Payment.transaction_id == uuid.UUID(int=1), Payment.created_at == CREATED_AT
+    ),
+    "credit_account": lambda: (
+        update(Account)
+        .where(Account.id == 1)
+        .values(balance_minor=Account.balance_minor + 100, balance_version=Account.balance_version + 1)
+        .execution_options(synchronize_session=False)
+    ),
+}
+LAMBDA = {
+    "user_by_id": lambda: queries.user_by_id(1),
+    "accounts_by_user": lambda: queries.accounts_by_user(1),
+    "payments_by_user": lambda: queries.payments_by_user(1),
+    "payment_by_transaction": lambda: queries.payment_by_transaction(uuid.UUID(int=1), CREATED_AT),
+    "credit_account": lambda: queries.credit_account(1, 100),
+}
+
+
+def measure(session: Session, factory, iterations: int, execution_options: dict) -> float:
+    """Return mean microseconds per build + execute of the statement."""
+    for _ in range(100):
+        session.execute(factory(), execution_options=execution_options)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        session.execute(factory(), execution_options=execution_options)
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main(args: argparse.Namespace) -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    rows = []
+    with Session(engine) as session:
+        for name in FRESH:
+            uncached = measure(session, FRESH[name], args.iterations, {"compiled_cache": None})
+            fresh = measure(session, FRESH[name], args.iterations, {})
+            cached = measure(session, LAMBDA[name], args.iterations, {})
+            rows.append({
+                "query": name,
+                "uncached_us": round(uncached, 2),
+                "fresh_us": round(fresh, 2),
+                "lambda_us": round(cached, 2),
+                "saved_vs_fresh": f"{(1 - cached / fresh) * 100:.1f}%",
+            })
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows, ["query", "uncached_us", "fresh_us", "lambda_us", "saved_vs_fresh"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    main(parser.parse_args())
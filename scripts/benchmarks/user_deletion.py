@@ -0,0 +1,204 @@
+"""
+Deleting a user with a large payment history, in the request or as a background job.
+
+Seeds a merchant with ``--accounts`` accounts and ``--payments`` payments,
+starts a single uvicorn process with ``USER_DELETION_MODE=--mode`` and posts
+webhooks to other users' accounts at ``--concurrency`` while the merchant is
+deleted. Reported:
+
+- the time until ``DELETE /api/admin/users/{id}`` answers
+- in ``job`` mode, the time until the job is ``done``, polled via
+  ``/api/admin/users/deletions/{job_id}``
+- webhook latency while the deletion runs, and the longest time a single
+  statement of the deletion held its locks (the longest batch in ``job``
+  mode, the whole DELETE in ``sync`` mode)
+
+Usage:
+    python -m scripts.benchmarks.user_deletion --mode sync --payments 1000000
+    python -m scripts.benchmarks.user_deletion --mode job --payments 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+
+import asyncpg
+
+from app.core.config import PROJECT_ROOT, WEBHOOK_SECRET_KEY
+from app.core.security import create_access_token
+from app.db.session import asyncpg_dsn
+from scripts.benchmarks.common import HttpClient, json_body, print_table, summarize
+from scripts.benchmarks.sse import wait_ready
+from scripts.fill_db import create_signature
+
+HOST = "127.0.0.1"
+MERCHANT_EMAIL = "deletion-bench-merchant@example.com"
+
+
+async def seed_merchant(conn: asyncpg.Connection, accounts: int, payments: int) -> int:
+    await conn.execute("DELETE FROM users WHERE email = $1", MERCHANT_EMAIL)
+    user_id = await conn.fetchval(
+        "INSERT INTO users (email, hashed_password, full_name, role) VALUES ($1, 'x', 'Deletion Bench', 'USER') "
+        "RETURNING id",
+        MERCHANT_EMAIL,
+    )
+    account_ids = [
+        row["id"] for row in await conn.fetch(
+            "INSERT INTO accounts (id, user_id) "
+            "SELECT (SELECT coalesce(max(id), 0) FROM accounts) + g, $1 FROM generate_series(1, $2) g RETURNING id",
+            user_id, accounts,
+        )
+    ]
+    # Spread over the last days, i.e. over the current and maybe the previous monthly partition
+    await conn.execute(
+        """
+        INSERT INTO payments (transaction_id, user_id, account_id, amount_minor, created_at)
+        SELECT gen_random_uuid(), $1, ($2::bigint[])[1 + g % array_length($2::bigint[], 1)], 100,
+               now() - (g % 72) * interval '1 hour'
+        FROM generate_series(1, $3) g
+        """,
+        user_id, account_ids, payments,
+    )
+    await conn.execute("ANALYZE payments")
+    return user_id
+
+
+async def other_accounts(conn: asyncpg.Connection, user_id: int, limit: int) -> list[tuple[int, int]]:
+    rows = await conn.fetch(
+        "SELECT a.id, a.user_id FROM accounts a JOIN users u ON u.id = a.user_id "
+        "WHERE a.user_id <> $1 AND u.deleted_at IS NULL ORDER BY random() LIMIT $2",
+        user_id, limit,
+    )
+    return [(row["id"], row["user_id"]) for row in rows]
+
+
+async def webhook_load(port: int, accounts: list, concurrency: int, stop: asyncio.Event) -> list[tuple[float, float]]:
+    """Post webhooks until ``stop``; returns (start time, latency) per successful webhook."""
+    samples = []
+
+    async def worker():
+        client = HttpClient(HOST, port)
+        try:
+            while not stop.is_set():
+                account_id, user_id = random.choice(accounts)
+                payload = {
+                    "transaction_id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "account_id": account_id,
+                    "amount": 1.0,
+                }
+                payload["signature"] = create_signature(payload, WEBHOOK_SECRET_KEY)
+                headers, body = json_body(payload)
+                started = time.perf_counter()
+                status_code, _ = await client.request("POST", "/api/webhooks/payment", headers, body)
+                if status_code == 200:
+                    samples.append((started, time.perf_counter() - started))
+        finally:
+            await client.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+async def longest_lock_ms(conn: asyncpg.Connection, stop: asyncio.Event) -> float:
+    """Sample how long the deletion's current statement has been running, as an upper bound of its lock time."""
+    longest = 0.0
+    while not stop.is_set():
+        value = await conn.fetchval(
+            "SELECT max(extract(epoch FROM clock_timestamp() - xact_start)) FROM pg_stat_activity "
+            "WHERE state <> 'idle' AND (query ILIKE 'UPDATE payments%' OR query ILIKE 'DELETE FROM accounts%' "
+            "OR query ILIKE 'DELETE FROM users%')"
+        )
+        longest = max(longest, (value or 0) * 1000)
+        await asyncio.sleep(0.01)
+    return longest
+
+
+async def run(args: argparse.Namespace) -> None:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    monitor = await asyncpg.connect(asyncpg_dsn())
+    try:
+        started = time.perf_counter()
+        user_id = await seed_merchant(conn, args.accounts, args.payments)
+        print(f"Seeded user {user_id} with {args.payments} payments in {time.perf_counter() - started:.1f}s",
+              file=sys.stderr)
+        accounts = await other_accounts(conn, user_id, 1000)
+        admin_id = await conn.fetchval("SELECT id FROM users WHERE role = 'ADMIN' AND deleted_at IS NULL "
+                                       "ORDER BY id LIMIT 1")
+    finally:
+        await conn.close()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(admin_id), 'role': 'ADMIN'})}"}
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", str(args.port),
+         "--log-level", "warning"],
+        cwd=PROJECT_ROOT,
+        env=dict(
+            os.environ,
+            PYTHONPATH=str(PROJECT_ROOT),
+            USER_DELETION_MODE=args.mode,
+            USER_DELETION_BATCH_ROWS=str(args.batch_rows),
+            USER_DELETION_POLL_SECONDS="0.5",
+        ),
+    )
+    try:
+        await wait_ready(server, args.port)
+        stop = asyncio.Event()
+        load = asyncio.create_task(webhook_load(args.port, accounts, args.concurrency, stop))
+        locks = asyncio.create_task(longest_lock_ms(monitor, stop))
+        await asyncio.sleep(args.warm_up)
+
+        client = HttpClient(HOST, args.port)
+        deletion_started = time.perf_counter()
+        status_code, body = await client.request("DELETE", f"/api/admin/users/{user_id}", headers)
+        response_s = time.perf_counter() - deletion_started
+        if status_code not in (202, 204):
+            raise RuntimeError(f"DELETE failed with status {status_code}: {body[:200]!r}")
+        job = json.loads(body) if status_code == 202 else None
+        while job is not None and job["status"] != "done":
+            await asyncio.sleep(0.2)
+            _, body = await client.request("GET", f"/api/admin/users/deletions/{job['id']}", headers)
+            job = json.loads(body)
+            if job.get("last_error"):
+                raise RuntimeError(f"Deletion job failed: {job['last_error']}")
+        done_s = time.perf_counter() - deletion_started
+        deletion_ended = time.perf_counter()
+        await client.close()
+
+        stop.set()
+        samples = await load
+        longest_lock = await locks
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        await monitor.close()
+
+    during = [latency for started, latency in samples if deletion_started <= started <= deletion_ended]
+    before = [latency for started, latency in samples if started < deletion_started]
+    print(f"\nmode={args.mode}, {args.payments} payments, {args.accounts} accounts, "
+          f"batch={args.batch_rows if args.mode == 'job' else '-'}")
+    batches = f" ({job['batches']} batches)" if job else ""
+    print(f"DELETE answered in {response_s * 1000:.0f} ms, user gone after {done_s:.2f}s{batches}")
+    print(f"Longest deletion transaction seen: {longest_lock:.0f} ms\n")
+    rows = [
+        {"webhooks": "before", **summarize(before, args.warm_up)},
+        {"webhooks": "during", **summarize(during, done_s)},
+    ]
+    print_table(rows, ["webhooks", "count", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["job", "sync"], default="job")
+    parser.add_argument("--payments", type=int, default=1_000_000, help="Payments of the deleted merchant")
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--batch-rows", type=int, default=5000, help="USER_DELETION_BATCH_ROWS")
+    parser.add_argument("--concurrency", type=int, default=8, help="Webhooks in flight")
+    parser.add_argument("--warm-up", type=float, default=3.0, help="Seconds of webhook load before the DELETE")
+    parser.add_argument("--port", type=int, default=8772)
+    asyncio.run(run(parser.parse_args()))
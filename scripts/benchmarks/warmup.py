@@ -0,0 +1,163 @@
+"""
+Latency of the first requests a fresh worker serves, with and without warm-up.
+
+For each mode, a single uvicorn process is started with ``WARMUP_ENABLED``
+set accordingly. Once ``/api/health/ready`` answers 200, ``--requests``
+requests are sent right away, mixed round-robin:
+- ``GET /api/users/me``
+- ``GET /api/users/accounts``
+- ``GET /api/users/payments``
+- ``POST /api/webhooks/payment``
+Users and accounts are picked from the existing data.
+Latencies are reported for the first 10, the next 90 and the remaining requests.
+
+Usage:
+    python -m scripts.benchmarks.warmup --requests 1000 --runs 3
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+
+import asyncpg
+
+from app.core.config import PROJECT_ROOT, WEBHOOK_SECRET_KEY
+from app.core.security import create_access_token
+from app.db.session import asyncpg_dsn
+from scripts.benchmarks.common import HttpClient, json_body, print_table, summarize
+from scripts.fill_db import create_signature
+
+HOST = "127.0.0.1"
+BUCKETS = [(0, 10, "1-10"), (10, 100, "11-100"), (100, None, "101-")]
+
+
+async def load_accounts(limit: int) -> list[tuple[int, int]]:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        rows = await conn.fetch("SELECT id, user_id FROM accounts ORDER BY random() LIMIT $1", limit)
+    finally:
+        await conn.close()
+    return [(row["id"], row["user_id"]) for row in rows]
+
+
+def build_requests(accounts: list, count: int) -> list[tuple[str, str, dict, bytes]]:
+    requests = []
+    for n in range(count):
+        account_id, user_id = random.choice(accounts)
+        auth = {"authorization": f"Bearer {create_access_token({'sub': str(user_id), 'role': 'USER'})}"}
+        kind = n % 4
+        if kind == 3:
+            payload = {
+                "transaction_id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "account_id": account_id,
+                "amount": round(random.uniform(1, 500), 2),
+            }
+            payload["signature"] = create_signature(payload, WEBHOOK_SECRET_KEY)
+            headers, body = json_body(payload)
+            requests.append(("POST", "/api/webhooks/payment", headers, body))
+        else:
+            path = ("/api/users/me", "/api/users/accounts", "/api/users/payments")[kind]
+            requests.append(("GET", path, auth, b""))
+    return requests
+
+
+async def wait_ready(server: subprocess.Popen, port: int, timeout: float = 60) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        client = HttpClient(HOST, port)
+        try:
+            status_code, _ = await client.request("GET", "/api/health/ready")
+            if status_code == 200:
+                return time.perf_counter() - started
+        except OSError:
+            pass
+        finally:
+            await client.close()
+        await asyncio.sleep(0.01)
+    raise TimeoutError(f"Server on port {port} not ready within {timeout}s")
+
+
+async def send(port: int, requests: list, concurrency: int) -> tuple[list[float], list[bool]]:
+    latencies = [0.0] * len(requests)
+    failed = [False] * len(requests)
+    remaining = iter(enumerate(requests))
+
+    async def worker():
+        client = HttpClient(HOST, port)
+        try:
+            for index, (method, path, headers, body) in remaining:
+                started = time.perf_counter()
+                status_code, _ = await client.request(method, path, headers, body)
+                latencies[index] = time.perf_counter() - started
+                failed[index] = status_code != 200
+        finally:
+            await client.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, failed
+
+
+def run_once(warmup: bool, requests: list, args: argparse.Namespace) -> tuple[float, list[float], list[bool]]:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", str(args.port)],
+        cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=dict(
+            os.environ,
+            PYTHONPATH=str(PROJECT_ROOT),
+            WARMUP_ENABLED=str(warmup).lower(),
+            # One warmed connection per concurrent client
+            WARMUP_CONNECTIONS=str(args.concurrency),
+        ),
+    )
+    try:
+        ready_after = asyncio.run(wait_ready(server, args.port))
+        latencies, failed = asyncio.run(send(args.port, requests, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return ready_after, latencies, failed
+
+
+def main(args: argparse.Namespace) -> None:
+    accounts = asyncio.run(load_accounts(args.accounts))
+    if not accounts:
+        sys.exit("No accounts found, run `python -m scripts.generate_data` first")
+
+    rows = []
+    for warmup in (False, True):
+        ready_times = []
+        runs = []
+        for _ in range(args.runs):
+            ready_after, latencies, failed = run_once(warmup, build_requests(accounts, args.requests), args)
+            ready_times.append(ready_after)
+            runs.append((latencies, failed))
+
+        for start, end, label in BUCKETS:
+            bucket = [latency for latencies, _ in runs for latency in latencies[start:end]]
+            errors = sum(sum(failed[start:end]) for _, failed in runs)
+            rows.append({
+                "warmup": "on" if warmup else "off",
+                "requests": label,
+                "ready_s": round(sum(ready_times) / len(ready_times), 2),
+                **summarize(bucket, sum(bucket), errors),
+            })
+
+    print_table(rows, ["warmup", "requests", "ready_s", "count", "errors", "mean_ms", "p50_ms", "p95_ms", "p99_ms",
+                       "max_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh server starts per mode")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--accounts", type=int, default=1000, help="Accounts to pick users and webhooks from")
+    parser.add_argument("--port", type=int, default=8767)
+    main(parser.parse_args())
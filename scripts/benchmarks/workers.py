@@ -0,0 +1,162 @@
+"""
+Webhook throughput of the gunicorn run mode with 1..N worker processes.
+
+For every worker count, the server is started with ``gunicorn.conf.py`` on a
+local port. Then ``--requests`` signed webhooks are posted over keep-alive
+connections by ``--clients`` client processes. The webhooks are spread over
+existing accounts (run ``scripts.generate_data`` first), so the run measures
+the server rather than lock contention on one balance row.
+``DB_CONNECTION_BUDGET`` is held constant, so pools shrink per worker as N grows.
+
+Usage:
+    python -m scripts.benchmarks.workers --workers 1,2,4,8 --requests 20000 --concurrency 64
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from typing import Optional
+
+import asyncpg
+
+from app.core.config import PROJECT_ROOT, WEBHOOK_SECRET_KEY
+from app.db.session import asyncpg_dsn
+from scripts.benchmarks.common import HttpClient, json_body, print_table, summarize
+from scripts.fill_db import create_signature
+
+HOST = "127.0.0.1"
+
+
+async def load_accounts(limit: int) -> list[tuple[int, int]]:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        rows = await conn.fetch("SELECT id, user_id FROM accounts ORDER BY random() LIMIT $1", limit)
+    finally:
+        await conn.close()
+    return [(row["id"], row["user_id"]) for row in rows]
+
+
+def start_server(workers: int, port: int, budget: int, env: Optional[dict] = None) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        DB_CONNECTION_BUDGET=str(budget),
+        BIND=f"{HOST}:{port}",
+        ENVIRONMENT="production",
+        PYTHONPATH=str(PROJECT_ROOT),
+        **(env or {}),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", str(PROJECT_ROOT / "gunicorn.conf.py"), "app.main:app"],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(port: int, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        client = HttpClient(HOST, port)
+        try:
+            status_code, _ = await client.request("GET", "/openapi.json")
+            if status_code == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            await client.close()
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"Server on port {port} did not become ready")
+
+
+async def post_webhooks(port: int, accounts: list, total: int, concurrency: int) -> tuple[list, int, float]:
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        client = HttpClient(HOST, port)
+        try:
+            for _ in remaining:
+                account_id, user_id = random.choice(accounts)
+                payload = {
+                    "transaction_id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "account_id": account_id,
+                    "amount": round(random.uniform(1, 500), 2),
+                }
+                payload["signature"] = create_signature(payload, WEBHOOK_SECRET_KEY)
+                headers, body = json_body(payload)
+                started = time.perf_counter()
+                try:
+                    status_code, _ = await client.request("POST", "/api/webhooks/payment", headers, body)
+                except (OSError, ConnectionError):
+                    status_code = 0
+                latencies.append(time.perf_counter() - started)
+                errors += status_code != 200
+        finally:
+            await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def client_process(job: tuple) -> tuple[list, int, float]:
+    return asyncio.run(post_webhooks(*job))
+
+
+def run_clients(port: int, accounts: list, total: int, concurrency: int, clients: int) -> dict:
+    jobs = [(port, accounts, total // clients, max(1, concurrency // clients)) for _ in range(clients)]
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(client_process, jobs)
+    latencies = [latency for result in results for latency in result[0]]
+    errors = sum(result[1] for result in results)
+    return summarize(latencies, max(result[2] for result in results), errors)
+
+
+def main(args: argparse.Namespace) -> None:
+    accounts = asyncio.run(load_accounts(args.accounts))
+    if not accounts:
+        sys.exit("No accounts found, run `python -m scripts.generate_data` first")
+
+    rows = []
+    for workers in [int(n) for n in args.workers.split(",")]:
+        server = start_server(workers, args.port, args.budget)
+        try:
+            asyncio.run(wait_ready(args.port))
+            run_clients(args.port, accounts, args.warmup, args.concurrency, args.clients)
+            summary = run_clients(args.port, accounts, args.requests, args.concurrency, args.clients)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+        rows.append({"workers": workers, **summary})
+        print(f"  {workers} workers: {summary['rps']} rps", flush=True)
+
+    base = rows[0]["rps"] or 1
+    for row in rows:
+        row["speedup"] = f"{row['rps'] / base:.2f}x"
+    print(f"\nCPU cores: {os.cpu_count()}, connection budget: {args.budget}")
+    print_table(rows, ["workers", "count", "errors", "rps", "speedup", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=",".join(str(2 ** n) for n in range((os.cpu_count() or 1).bit_length())),
+                        help="Comma separated worker counts")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent connections over all clients")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Client processes generating load")
+    parser.add_argument("--budget", type=int, default=80, help="DB_CONNECTION_BUDGET for the server")
+    parser.add_argument("--accounts", type=int, default=10_000, help="Accounts to spread webhooks over")
+    parser.add_argument("--port", type=int, default=8765)
+    main(parser.parse_args())
@@ -0,0 +1,242 @@
+"""
+Generate a large synthetic data set for capacity testing.
+
+Users, accounts and payments are bulk-loaded with ``COPY`` in batches of
+``--batch-users`` users, one transaction per batch:
+
+- every user gets 1-``--max-accounts`` accounts (geometric distribution)
+- payments per account follow a Pareto distribution, so most accounts have a
+  handful of payments and a few have thousands
+- ``created_at`` of users is spread uniformly over the last ``--months``
+  months, payments fall between the creation of their account and now
+- ``accounts.balance_minor`` is the exact sum of the generated payments
+- every payment gets its ``payment_transactions`` dedupe row
+
+Ids are taken from the tables' sequences, so the generator can run against
+a database that already has data. Passwords are bcrypt-hashed once per
+distinct password (``--passwords``) instead of once per user.
+
+Usage:
+    python -m scripts.generate_data --users 1000000 --payments-per-account 20 --months 24
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+
+from app.core.config import PAYMENTS_PARTITIONS_MONTHS_AHEAD
+from app.core.security import get_password_hash
+from app.db.partitions import ensure_payment_partitions
+from app.db.session import asyncpg_dsn, engine
+
+USER_COLUMNS = ("id", "email", "hashed_password", "full_name", "role", "created_at")
+ACCOUNT_COLUMNS = ("id", "user_id", "balance_minor", "created_at")
+PAYMENT_COLUMNS = ("transaction_id", "user_id", "account_id", "amount_minor", "created_at")
+TRANSACTION_COLUMNS = ("transaction_id", "created_at")
+
+
+def password_for(user_id: int, passwords: int) -> str:
+    return f"loadtest_password_{user_id % passwords}"
+
+
+def email_for(user_id: int) -> str:
+    return f"loadtest_{user_id}@example.com"
+
+
+class Generator:
+    """
+    Builds COPY records for one batch of users at a time.
+
+    Args:
+        args: Parsed command line arguments
+        hashes: Precomputed password hashes, indexed by ``user_id % len(hashes)``
+    """
+
+    def __init__(self, args: argparse.Namespace, hashes: list[str]):
+        self.args = args
+        self.hashes = hashes
+        self.random = random.Random(args.seed)
+        self.now = datetime.now(timezone.utc)
+        self.span = timedelta(days=args.months * 30).total_seconds()
+        # Pareto with shape a and scale x_m has mean a * x_m / (a - 1)
+        alpha = args.pareto_alpha
+        self.pareto_scale = args.payments_per_account * (alpha - 1) / alpha
+
+    def moment(self, earliest: datetime) -> datetime:
+        seconds = (self.now - earliest).total_seconds()
+        return earliest + timedelta(seconds=self.random.random() * seconds)
+
+    def accounts_count(self) -> int:
+        count = 1
+        while count < self.args.max_accounts and self.random.random() < 0.3:
+            count += 1
+        return count
+
+    def payments_count(self) -> int:
+        count = int(self.pareto_scale * self.random.paretovariate(self.args.pareto_alpha))
+        return min(count, self.args.max_payments_per_account)
+
+    def amount(self) -> int:
+        """Payment amount in minor units, log-normal with a median around 30.00."""
+        return max(1, int(self.random.lognormvariate(8.0, 1.2)))
+
+    def transaction_id(self) -> uuid.UUID:
+        return uuid.UUID(int=self.random.getrandbits(128), version=4)
+
+    def batch(
+            self,
+            user_ids: list[int],
+            accounts_per_user: list[int],
+            account_ids: list[int],
+    ) -> dict[str, list[tuple]]:
+        """
+        Generate the rows of one batch.
+
+        Args:
+            user_ids: Ids reserved for the batch's users
+            accounts_per_user: Number of accounts of each user, from ``accounts_count``
+            account_ids: Ids reserved for the batch's accounts, consumed in order
+
+        Returns:
+            dict: Table name mapped to its COPY records
+        """
+        users, accounts, payments, transactions = [], [], [], []
+        account_ids = iter(account_ids)
+        for user_id, accounts_count in zip(user_ids, accounts_per_user):
+            user_created = self.now - timedelta(seconds=self.random.random() * self.span)
+            users.append((
+                user_id,
+                email_for(user_id),
+                self.hashes[user_id % len(self.hashes)],
+                f"Load Test User {user_id}",
+                "USER",
+                user_created,
+            ))
+            for _ in range(accounts_count):
+                account_id = next(account_ids)
+                account_created = self.moment(user_created)
+                balance = 0
+                for _ in range(self.payments_count()):
+                    amount = self.amount()
+                    balance += amount
+                    transaction_id = self.transaction_id()
+                    created_at = self.moment(account_created)
+                    payments.append((transaction_id, user_id, account_id, amount, created_at))
+                    transactions.append((transaction_id, created_at))
+                accounts.append((account_id, user_id, balance, account_created))
+
+        return {
+            "users": users,
+            "accounts": accounts,
+            "payments": payments,
+            "payment_transactions": transactions,
+        }
+
+
+async def sync_sequence(conn: asyncpg.Connection, table: str) -> None:
+    """
+    Move the table's id sequence past ``max(id)``.
+
+    Accounts are created with ids supplied by webhooks, so the sequence
+    usually lags behind the data.
+    """
+    await conn.execute(f"""
+        SELECT setval(pg_get_serial_sequence('{table}', 'id'), max(id))
+        FROM {table}
+        HAVING max(id) >= (SELECT last_value FROM {table}_id_seq)
+    """)
+
+
+async def reserve_ids(conn: asyncpg.Connection, table: str, count: int) -> list[int]:
+    """Take ``count`` ids from the table's sequence so concurrent inserts can't collide."""
+    return [row[0] for row in await conn.fetch(
+        "SELECT nextval(pg_get_serial_sequence($1, 'id')) FROM generate_series(1, $2)", table, count
+    )]
+
+
+async def ensure_partitions(months: int) -> None:
+    since = (datetime.now(timezone.utc) - timedelta(days=months * 30)).date()
+    async with engine.begin() as conn:
+        created = await conn.run_sync(ensure_payment_partitions, PAYMENTS_PARTITIONS_MONTHS_AHEAD, since)
+    await engine.dispose()
+    if created:
+        print(f"Created partitions: {', '.join(created)}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    await ensure_partitions(args.months)
+
+    started = time.perf_counter()
+    hashes = [get_password_hash(password_for(n, args.passwords)) for n in range(args.passwords)]
+    print(f"Hashed {len(hashes)} passwords in {time.perf_counter() - started:.1f}s")
+
+    generator = Generator(args, hashes)
+    columns = {
+        "users": USER_COLUMNS,
+        "accounts": ACCOUNT_COLUMNS,
+        "payments": PAYMENT_COLUMNS,
+        "payment_transactions": TRANSACTION_COLUMNS,
+    }
+    totals = dict.fromkeys(columns, 0)
+    copy_seconds = 0.0
+
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        for table in ("users", "accounts"):
+            await sync_sequence(conn, table)
+
+        started = time.perf_counter()
+        done = 0
+        while done < args.users:
+            size = min(args.batch_users, args.users - done)
+            accounts_per_user = [generator.accounts_count() for _ in range(size)]
+            user_ids = await reserve_ids(conn, "users", size)
+            account_ids = await reserve_ids(conn, "accounts", sum(accounts_per_user))
+
+            rows = generator.batch(user_ids, accounts_per_user, account_ids)
+
+            copy_started = time.perf_counter()
+            async with conn.transaction():
+                for table, records in rows.items():
+                    await conn.copy_records_to_table(table, records=records, columns=columns[table])
+            copy_seconds += time.perf_counter() - copy_started
+
+            for table, records in rows.items():
+                totals[table] += len(records)
+            done += size
+
+            elapsed = time.perf_counter() - started
+            loaded = sum(totals.values())
+            print(
+                f"  users {done:,}/{args.users:,}  accounts {totals['accounts']:,}  "
+                f"payments {totals['payments']:,}  {loaded / elapsed:,.0f} rows/s",
+                flush=True,
+            )
+    finally:
+        await conn.close()
+
+    elapsed = time.perf_counter() - started
+    loaded = sum(totals.values())
+    print(f"\n✅ Loaded {loaded:,} rows in {elapsed:.1f}s ({loaded / elapsed:,.0f} rows/s overall, "
+          f"{loaded / copy_seconds:,.0f} rows/s in COPY)")
+    for table, count in totals.items():
+        print(f"\t{table}: {count:,}")
+    print(f"🔑 Credentials: loadtest_<id>@example.com / loadtest_password_<id % {args.passwords}>")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--max-accounts", type=int, default=3, help="Maximal accounts per user")
+    parser.add_argument("--payments-per-account", type=float, default=20, help="Mean payments per account")
+    parser.add_argument("--pareto-alpha", type=float, default=1.5, help="Tail shape of payments per account")
+    parser.add_argument("--max-payments-per-account", type=int, default=10_000)
+    parser.add_argument("--months", type=int, default=24, help="Spread created_at over this many months")
+    parser.add_argument("--passwords", type=int, default=16, help="Distinct passwords (bcrypt runs per password)")
+    parser.add_argument("--batch-users", type=int, default=10_000, help="Users per COPY transaction")
+    parser.add_argument("--seed", type=int, default=None)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,459 @@
+"""
+Load test of the whole API with a regression gate.
+
+A scenario file (``scripts/loadtest/scenarios/*.json``) describes the load:
+
+- ``virtual_users`` run for ``duration_seconds`` after ``warmup_seconds``,
+  started evenly over ``ramp_up_seconds``
+- ``profiles`` split the virtual users by ``weight``. Each profile logs in
+  as a seeded user (``"credentials": "user"``), as the load-test admin
+  (``"admin"``) or not at all (``null``), and picks its next request from
+  ``actions`` by weight (see ``ACTIONS``)
+- a virtual user sleeps a random ``think_time_ms`` ``[min, max]`` between
+  requests and logs in again after ``token_reuse`` requests (0: once)
+- ``seed``: load-test users that must exist; missing ones are generated with
+  ``scripts.generate_data``
+- ``thresholds``: what counts as a regression against the baseline
+
+By default the server is started with ``gunicorn.conf.py`` on ``--port``
+with ``--server-workers`` workers; ``--target PORT`` runs against a local
+server that is already up. The result is compared with the baseline of the
+scenario (``scripts/loadtest/baselines/<scenario>.json``): the run fails
+with exit status 1 when the throughput drops or the p95 latency of all
+requests or of one action rises past the thresholds, or when too many
+requests fail. ``--save-baseline`` stores the result as the new baseline.
+Baselines record the machine they were taken on; compare runs on the same
+machine only.
+
+Usage:
+    python -m scripts.loadtest.run scripts/loadtest/scenarios/mixed.json --save-baseline
+    python -m scripts.loadtest.run scripts/loadtest/scenarios/mixed.json --output result.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import signal
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode
+
+import asyncpg
+
+from app.core.config import WEBHOOK_SECRET_KEY
+from app.core.security import get_password_hash
+from app.core.stats import percentile
+from app.db.session import asyncpg_dsn
+from scripts import generate_data
+from scripts.benchmarks.common import HttpClient, json_body, machine_info, print_table
+from scripts.benchmarks.workers import HOST, start_server, wait_ready
+from scripts.fill_db import create_signature
+
+BASELINES = Path(__file__).parent / "baselines"
+ADMIN_EMAIL = "loadtest_admin@example.com"
+ADMIN_PASSWORD = "loadtest_admin_password"
+DEFAULT_THRESHOLDS = {
+    # p95 may rise by this share and at least this many milliseconds before it counts
+    "p95_increase_pct": 25,
+    "p95_min_increase_ms": 5,
+    "throughput_drop_pct": 10,
+    "max_error_rate": 0.01,
+    # Actions with fewer requests in either run are not compared
+    "min_samples": 50,
+}
+
+
+class SeedData:
+    """Credentials and ids of the seeded data the virtual users work with."""
+
+    def __init__(self, users: list[tuple[str, str]], accounts: list[tuple[int, int]]):
+        self.users = users
+        self.accounts = accounts
+        self.user_ids = sorted({user_id for _, user_id in accounts})
+
+
+async def seed(config: dict) -> SeedData:
+    """
+    Make sure the scenario's users exist and load their credentials.
+
+    Args:
+        config: ``seed`` section of the scenario
+
+    Returns:
+        SeedData: Seeded users and their accounts
+    """
+    users = config.get("users", 1000)
+    passwords = config.get("passwords", 16)
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        existing = await conn.fetchval(
+            "SELECT count(*) FROM users WHERE email LIKE 'loadtest\\_%' AND role = 'USER' AND deleted_at IS NULL"
+        )
+    finally:
+        await conn.close()
+
+    if existing < users:
+        print(f"Seeding {users - existing} load-test users", flush=True)
+        await generate_data.main(argparse.Namespace(
+            users=users - existing,
+            max_accounts=config.get("max_accounts", 3),
+            payments_per_account=config.get("payments_per_account", 20),
+            pareto_alpha=1.5,
+            max_payments_per_account=config.get("max_payments_per_account", 10_000),
+            months=config.get("months", 12),
+            passwords=passwords,
+            batch_users=10_000,
+            seed=None,
+        ))
+
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        if not await conn.fetchval("SELECT 1 FROM users WHERE email = $1", ADMIN_EMAIL):
+            await conn.execute(
+                "INSERT INTO users (email, hashed_password, full_name, role) VALUES ($1, $2, 'Load Test Admin', "
+                "'ADMIN') ON CONFLICT (email) DO NOTHING",
+                ADMIN_EMAIL, get_password_hash(ADMIN_PASSWORD),
+            )
+        rows = await conn.fetch(
+            "SELECT id, email FROM users WHERE email LIKE 'loadtest\\_%' AND role = 'USER' AND deleted_at IS NULL "
+            "ORDER BY id LIMIT $1",
+            users,
+        )
+        accounts = await conn.fetch(
+            "SELECT id, user_id FROM accounts WHERE user_id = ANY($1::bigint[])", [row["id"] for row in rows]
+        )
+    finally:
+        await conn.close()
+    return SeedData(
+        [(row["email"], generate_data.password_for(row["id"], passwords)) for row in rows],
+        [(row["id"], row["user_id"]) for row in accounts],
+    )
+
+
+def webhook_request(data: SeedData, rng: random.Random) -> tuple:
+    account_id, user_id = rng.choice(data.accounts)
+    payload = {
+        "transaction_id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "account_id": account_id,
+        "amount": round(rng.uniform(1, 500), 2),
+    }
+    payload["signature"] = create_signature(payload, WEBHOOK_SECRET_KEY)
+    headers, body = json_body(payload)
+    return "POST", "/api/webhooks/payment", headers, body
+
+
+def update_user_request(data: SeedData, rng: random.Random) -> tuple:
+    headers, body = json_body({"full_name": f"Load Test User {rng.randrange(1_000_000)}"})
+    return "PATCH", f"/api/admin/users/{rng.choice(data.user_ids)}", headers, body
+
+
+# Action name -> function building (method, path, headers, body) from the seed data
+ACTIONS = {
+    "me": lambda data, rng: ("GET", "/api/users/me", {}, b""),
+    "accounts": lambda data, rng: ("GET", "/api/users/accounts", {}, b""),
+    "payments": lambda data, rng: ("GET", "/api/users/payments", {}, b""),
+    "webhook": webhook_request,
+    "admin_users": lambda data, rng: ("GET", "/api/admin/users", {}, b""),
+    "admin_update_user": update_user_request,
+    "admin_deletions": lambda data, rng: ("GET", "/api/admin/users/deletions?limit=20", {}, b""),
+    "admin_pool": lambda data, rng: ("GET", "/api/admin/monitoring/pool", {}, b""),
+}
+
+
+class Recorder:
+    """Latencies and errors per action of the requests in the measured window."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.measuring = False
+
+    def add(self, action: str, latency: float, ok: bool) -> None:
+        if not self.measuring:
+            return
+        self.latencies.setdefault(action, []).append(latency)
+        if not ok:
+            self.errors[action] = self.errors.get(action, 0) + 1
+
+
+class VirtualUser:
+    """
+    One simulated client on its own keep-alive connection.
+
+    Args:
+        profile: Profile of the scenario the user belongs to
+        credentials: Email and password to log in with, None for anonymous profiles
+        scenario: Whole scenario, for the defaults of the profile
+        data: Seeded data
+        recorder: Where the requests are recorded
+        rng: Random generator of this user
+    """
+
+    def __init__(self, profile: dict, credentials: Optional[tuple[str, str]], scenario: dict,
+                 data: SeedData, recorder: Recorder, rng: random.Random):
+        self.credentials = credentials
+        self.data = data
+        self.recorder = recorder
+        self.rng = rng
+        self.actions = list(profile["actions"])
+        self.weights = list(profile["actions"].values())
+        think_time = profile.get("think_time_ms", scenario.get("think_time_ms", [0, 0]))
+        self.think_time = (think_time[0] / 1000, think_time[1] / 1000)
+        self.token_reuse = profile.get("token_reuse", scenario.get("token_reuse", 0))
+        self.token: Optional[str] = None
+        self.uses = 0
+
+    async def send(self, client: HttpClient, action: str, method: str, path: str,
+                   headers: dict, body: bytes) -> tuple[int, bytes]:
+        started = time.perf_counter()
+        try:
+            status_code, response = await client.request(method, path, headers, body)
+        except (OSError, ConnectionError):
+            status_code, response = 0, b""
+        self.recorder.add(action, time.perf_counter() - started, status_code == 200)
+        return status_code, response
+
+    async def login(self, client: HttpClient) -> None:
+        email, password = self.credentials
+        body = urlencode({"username": email, "password": password}).encode()
+        status_code, response = await self.send(
+            client, "login", "POST", "/api/auth/login", {"Content-Type": "application/x-www-form-urlencoded"}, body
+        )
+        self.token = json.loads(response)["access_token"] if status_code == 200 else None
+        self.uses = 0
+
+    async def run(self, port: int, start_delay: float, deadline: float) -> None:
+        await asyncio.sleep(start_delay)
+        client = HttpClient(HOST, port)
+        try:
+            while time.monotonic() < deadline:
+                if self.credentials is not None and (
+                        self.token is None or (self.token_reuse and self.uses >= self.token_reuse)
+                ):
+                    await self.login(client)
+                else:
+                    action = self.rng.choices(self.actions, self.weights)[0]
+                    method, path, headers, body = ACTIONS[action](self.data, self.rng)
+                    if self.token is not None:
+                        headers = {**headers, "Authorization": f"Bearer {self.token}"}
+                    status_code, _ = await self.send(client, action, method, path, headers, body)
+                    self.uses += 1
+                    if status_code == 401:
+                        self.token = None
+                await asyncio.sleep(self.rng.uniform(*self.think_time))
+        finally:
+            await client.close()
+
+
+def allocate(profiles: dict, total: int) -> dict[str, int]:
+    """Split ``total`` virtual users over the profiles in proportion to their weights."""
+    weight_sum = sum(profile["weight"] for profile in profiles.values())
+    shares = {name: total * profile["weight"] / weight_sum for name, profile in profiles.items()}
+    counts = {name: int(share) for name, share in shares.items()}
+    for name in sorted(shares, key=lambda name: counts[name] - shares[name])[:total - sum(counts.values())]:
+        counts[name] += 1
+    return counts
+
+
+async def run_load(scenario: dict, data: SeedData, port: int) -> tuple[Recorder, float]:
+    recorder = Recorder()
+    rng = random.Random(scenario.get("random_seed"))
+    users = []
+    user_number = 0
+    for name, count in allocate(scenario["profiles"], scenario["virtual_users"]).items():
+        profile = scenario["profiles"][name]
+        for _ in range(count):
+            kind = profile.get("credentials")
+            credentials = None
+            if kind == "user":
+                credentials = data.users[user_number % len(data.users)]
+                user_number += 1
+            elif kind == "admin":
+                credentials = (ADMIN_EMAIL, ADMIN_PASSWORD)
+            users.append(VirtualUser(profile, credentials, scenario, data, recorder,
+                                     random.Random(rng.getrandbits(64))))
+    rng.shuffle(users)
+
+    ramp_up = scenario.get("ramp_up_seconds", 0)
+    warmup = scenario.get("warmup_seconds", 0)
+    duration = scenario["duration_seconds"]
+    started = time.monotonic()
+    deadline = started + warmup + duration
+    tasks = [
+        asyncio.create_task(user.run(port, ramp_up * number / len(users), deadline))
+        for number, user in enumerate(users)
+    ]
+    await asyncio.sleep(max(warmup, ramp_up))
+    recorder.measuring = True
+    measured_from = time.perf_counter()
+    await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+    recorder.measuring = False
+    elapsed = time.perf_counter() - measured_from
+    await asyncio.gather(*tasks)
+    return recorder, elapsed
+
+
+def action_summary(latencies: list, errors: int, elapsed: float) -> dict:
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def build_result(scenario: dict, recorder: Recorder, elapsed: float, server_workers: Optional[int]) -> dict:
+    all_latencies = [latency for latencies in recorder.latencies.values() for latency in latencies]
+    return {
+        "scenario": scenario["name"],
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "server_workers": server_workers,
+        "virtual_users": scenario["virtual_users"],
+        "duration_seconds": round(elapsed, 1),
+        "overall": action_summary(all_latencies, sum(recorder.errors.values()), elapsed),
+        "actions": {
+            action: action_summary(latencies, recorder.errors.get(action, 0), elapsed)
+            for action, latencies in sorted(recorder.latencies.items())
+        },
+    }
+
+
+def compare(result: dict, baseline: Optional[dict], thresholds: dict) -> list[str]:
+    """
+    Check the result against the thresholds and the baseline.
+
+    Returns:
+        list[str]: Regressions found; empty if the run passes
+    """
+    failures = []
+    overall = result["overall"]
+    error_rate = overall["errors"] / overall["count"] if overall["count"] else 1.0
+    if error_rate > thresholds["max_error_rate"]:
+        failures.append(f"error rate {error_rate:.2%} above {thresholds['max_error_rate']:.2%}")
+    if baseline is None:
+        return failures
+
+    drop = (1 - overall["rps"] / baseline["overall"]["rps"]) * 100 if baseline["overall"]["rps"] else 0.0
+    if drop > thresholds["throughput_drop_pct"]:
+        failures.append(f"throughput {overall['rps']} rps is {drop:.1f}% below baseline "
+                        f"{baseline['overall']['rps']} rps")
+
+    def check_p95(name: str, current: dict, base: dict) -> None:
+        limit = max(base["p95_ms"] * (1 + thresholds["p95_increase_pct"] / 100),
+                    base["p95_ms"] + thresholds["p95_min_increase_ms"])
+        if current["p95_ms"] > limit:
+            failures.append(f"{name} p95 {current['p95_ms']} ms above baseline {base['p95_ms']} ms "
+                            f"(limit {limit:.1f} ms)")
+
+    check_p95("overall", overall, baseline["overall"])
+    for action, current in result["actions"].items():
+        base = baseline["actions"].get(action)
+        if base and min(current["count"], base["count"]) >= thresholds["min_samples"]:
+            check_p95(action, current, base)
+    return failures
+
+
+def print_result(result: dict, baseline: Optional[dict]) -> None:
+    rows = []
+    for action, summary in [*result["actions"].items(), ("overall", result["overall"])]:
+        row = {"action": action, **summary}
+        base = (baseline or {}).get("actions", {}).get(action) if action != "overall" else (baseline or {}).get(
+            "overall")
+        if base:
+            row["base_p95_ms"] = base["p95_ms"]
+            row["base_rps"] = base["rps"]
+        rows.append(row)
+    print_table(rows, ["action", "count", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "base_p95_ms", "base_rps"])
+
+
+def load_baseline(path: Path, result: dict) -> Optional[dict]:
+    if not path.exists():
+        print(f"\nNo baseline at {path}, run with --save-baseline to store one")
+        return None
+    baseline = json.loads(path.read_text())
+    for key in ("hostname", "cpu_count"):
+        if baseline["machine"].get(key) != result["machine"][key]:
+            print(f"\nWarning: baseline was taken on another machine ({key} {baseline['machine'].get(key)!r})")
+            break
+    if baseline.get("server_workers") != result["server_workers"]:
+        print(f"\nWarning: baseline was taken with {baseline.get('server_workers')} server workers")
+    return baseline
+
+
+def main(args: argparse.Namespace) -> None:
+    scenario = json.loads(Path(args.scenario).read_text())
+    for key in ("duration_seconds", "virtual_users"):
+        value = getattr(args, key)
+        if value is not None:
+            scenario[key] = value
+    unknown = {action for profile in scenario["profiles"].values() for action in profile["actions"]} - set(ACTIONS)
+    if unknown:
+        sys.exit(f"Unknown actions in {args.scenario}: {', '.join(sorted(unknown))}")
+    thresholds = {**DEFAULT_THRESHOLDS, **scenario.get("thresholds", {})}
+
+    data = asyncio.run(seed(scenario.get("seed", {})))
+    if not data.users or not data.accounts:
+        sys.exit("No load-test users with accounts found after seeding")
+    print(f"{len(data.users)} users, {len(data.accounts)} accounts; running {scenario['name']} with "
+          f"{scenario['virtual_users']} virtual users for {scenario['duration_seconds']}s", flush=True)
+
+    server = None
+    if args.target:
+        port = args.target
+        server_workers = None
+    else:
+        port = args.port
+        server_workers = args.server_workers
+        server = start_server(server_workers, port, args.budget)
+    try:
+        asyncio.run(wait_ready(port))
+        recorder, elapsed = asyncio.run(run_load(scenario, data, port))
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+    result = build_result(scenario, recorder, elapsed, server_workers)
+    baseline_path = Path(args.baseline) if args.baseline else BASELINES / f"{scenario['name']}.json"
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(result, indent=2) + "\n")
+        print_result(result, None)
+        print(f"\nBaseline saved to {baseline_path}")
+        return
+
+    baseline = load_baseline(baseline_path, result)
+    print()
+    print_result(result, baseline)
+    failures = compare(result, baseline, thresholds)
+    if failures:
+        print("\n❌ Regression:")
+        for failure in failures:
+            print(f"\t{failure}")
+        sys.exit(1)
+    print("\n✅ No regression" if baseline else "\n✅ Error rate within threshold")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenario", help="Scenario JSON file")
+    parser.add_argument("--baseline", help="Baseline file, by default baselines/<scenario>.json")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the result as the baseline")
+    parser.add_argument("--output", help="Also write the result to this file")
+    parser.add_argument("--target", type=int, help="Port of a running local server instead of starting one")
+    parser.add_argument("--port", type=int, default=8766, help="Port of the started server")
+    parser.add_argument("--server-workers", type=int, default=1, help="Gunicorn workers of the started server")
+    parser.add_argument("--budget", type=int, default=40, help="DB_CONNECTION_BUDGET for the started server")
+    parser.add_argument("--duration-seconds", type=int, help="Override the scenario's duration")
+    parser.add_argument("--virtual-users", type=int, help="Override the scenario's virtual users")
+    main(parser.parse_args())
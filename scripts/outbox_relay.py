@@ -0,0 +1,245 @@
+"""
+Relay of ``payment_outbox`` events to a downstream sink.
+
+Rows are read in ``(txid, id)`` order, in batches of ``--batch-size``, and
+passed to the sink. After the sink accepts a batch, the position of the
+batch's last row is saved in ``outbox_checkpoints`` under ``--consumer``.
+Delivery is at-least-once: after a crash between send and checkpoint, the
+batch is sent again, so consumers dedupe on the event ``id``.
+
+Only rows of transactions older than ``pg_snapshot_xmin`` are read. Every
+transaction before that horizon has finished, so no row can commit later
+behind the checkpoint. A long-running transaction anywhere in the cluster
+holds the horizon back and delays events; it does not lose them.
+
+The relay sleeps until committed webhooks wake it via LISTEN on
+``OUTBOX_CHANNEL``, or until ``--poll-interval`` passes. The poll catches
+notifications lost during a reconnect and rows that were held back by the
+horizon. An advisory lock per consumer keeps a second relay of the same
+consumer from starting.
+
+Sinks: ``stdout`` and ``file`` (JSON lines), or ``module:factory`` for a
+custom one. The factory is called with the ``--sink-option key=value`` pairs
+and returns an object with ``async send(events)`` and ``async close()``.
+
+Usage:
+    python -m scripts.outbox_relay --consumer accounting --sink file --sink-option path=events.jsonl
+    python -m scripts.outbox_relay --consumer debug --sink stdout --start latest
+    python -m scripts.outbox_relay --consumer notifications --sink mypackage.sinks:KafkaSink
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import signal
+import sys
+import time
+from typing import Protocol
+
+import asyncpg
+
+from app.core.config import DB_APPLICATION_NAME, OUTBOX_CHANNEL
+from app.db.listener import PgListener
+from app.db.session import asyncpg_dsn
+
+FETCH_QUERY = """
+    WITH horizon AS (
+        SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint AS xmin
+    )
+    SELECT o.id, o.txid, o.event_type, o.payload::text AS payload, o.created_at
+    FROM payment_outbox o, horizon
+    WHERE (o.txid, o.id) > ($1, $2)
+      AND o.txid < horizon.xmin
+    ORDER BY o.txid, o.id
+    LIMIT $3
+"""
+LATEST_POSITION_QUERY = """
+    SELECT txid, id FROM payment_outbox
+    WHERE txid < pg_snapshot_xmin(pg_current_snapshot())::text::bigint
+    ORDER BY txid DESC, id DESC
+    LIMIT 1
+"""
+SAVE_CHECKPOINT_QUERY = """
+    INSERT INTO outbox_checkpoints (consumer, txid, outbox_id)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (consumer) DO UPDATE
+    SET txid = excluded.txid, outbox_id = excluded.outbox_id, updated_at = now()
+"""
+# Delivered to every consumer and older than the retention
+PRUNE_QUERY = """
+    DELETE FROM payment_outbox
+    WHERE id IN (
+        SELECT o.id FROM payment_outbox o
+        WHERE o.created_at < now() - make_interval(hours => $1)
+          AND (o.txid, o.id) <= (
+              SELECT txid, outbox_id FROM outbox_checkpoints ORDER BY txid, outbox_id LIMIT 1
+          )
+        LIMIT $2
+    )
+"""
+
+
+class Sink(Protocol):
+    async def send(self, events: list[dict]) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class StdoutSink:
+    """Writes events to stdout as JSON lines."""
+
+    async def send(self, events: list[dict]) -> None:
+        sys.stdout.write("".join(json.dumps(event) + "\n" for event in events))
+        sys.stdout.flush()
+
+    async def close(self) -> None:
+        pass
+
+
+class FileSink:
+    """
+    Appends events to a file as JSON lines, fsynced before the checkpoint moves.
+
+    Args:
+        path: Output file
+    """
+
+    def __init__(self, path: str = "outbox_events.jsonl"):
+        self.file = open(path, "a", encoding="utf-8")
+
+    async def send(self, events: list[dict]) -> None:
+        self.file.write("".join(json.dumps(event) + "\n" for event in events))
+        self.file.flush()
+        await asyncio.to_thread(os.fsync, self.file.fileno())
+
+    async def close(self) -> None:
+        self.file.close()
+
+
+SINKS = {"stdout": StdoutSink, "file": FileSink}
+
+
+def load_sink(spec: str, options: list[str]) -> Sink:
+    """
+    Build a sink from a name in ``SINKS`` or a ``module:factory`` path.
+
+    Args:
+        spec: Sink name or import path
+        options: ``key=value`` keyword arguments for the factory
+    """
+    kwargs = dict(option.split("=", 1) for option in options)
+    if spec in SINKS:
+        return SINKS[spec](**kwargs)
+    module, _, name = spec.partition(":")
+    if not name:
+        raise ValueError(f"Unknown sink {spec!r}, expected one of {sorted(SINKS)} or module:factory")
+    return getattr(importlib.import_module(module), name)(**kwargs)
+
+
+def to_event(row: asyncpg.Record) -> dict:
+    return {
+        "id": row["id"],
+        "type": row["event_type"],
+        "created_at": row["created_at"].isoformat(),
+        "data": json.loads(row["payload"]),
+    }
+
+
+async def load_position(conn: asyncpg.Connection, consumer: str, start: str) -> tuple[int, int]:
+    row = await conn.fetchrow("SELECT txid, outbox_id FROM outbox_checkpoints WHERE consumer = $1", consumer)
+    if row is not None:
+        return row["txid"], row["outbox_id"]
+    if start == "latest":
+        row = await conn.fetchrow(LATEST_POSITION_QUERY)
+        if row is not None:
+            position = (row["txid"], row["id"])
+            await conn.execute(SAVE_CHECKPOINT_QUERY, consumer, *position)
+            return position
+    return 0, 0
+
+
+def log(message: str) -> None:
+    # stdout may be the sink
+    print(message, file=sys.stderr, flush=True)
+
+
+async def relay(conn: asyncpg.Connection, sink: Sink, args: argparse.Namespace,
+                wake: asyncio.Event, stop: asyncio.Event) -> None:
+    position = await load_position(conn, args.consumer, args.start)
+    log(f"Relaying {args.consumer} from txid={position[0]} id={position[1]}")
+    delivered = 0
+    last_report = last_prune = time.monotonic()
+
+    while not stop.is_set():
+        # Cleared before the read: a notification arriving meanwhile triggers another read
+        wake.clear()
+        rows = await conn.fetch(FETCH_QUERY, *position, args.batch_size)
+        if rows:
+            await sink.send([to_event(row) for row in rows])
+            position = (rows[-1]["txid"], rows[-1]["id"])
+            await conn.execute(SAVE_CHECKPOINT_QUERY, args.consumer, *position)
+            delivered += len(rows)
+
+        now = time.monotonic()
+        if now - last_report >= args.report_interval and delivered:
+            log(f"{delivered} events delivered, at txid={position[0]} id={position[1]}")
+            last_report = now
+        if args.retention_hours and now - last_prune >= args.prune_interval:
+            result = await conn.execute(PRUNE_QUERY, args.retention_hours, args.prune_batch)
+            log(f"Pruned {result.split()[-1]} delivered events")
+            last_prune = now
+
+        if len(rows) == args.batch_size:
+            continue
+        waiters = [asyncio.create_task(wake.wait()), asyncio.create_task(stop.wait())]
+        await asyncio.wait(waiters, timeout=args.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in waiters:
+            waiter.cancel()
+
+    log(f"Stopped, {delivered} events delivered")
+
+
+async def main(args: argparse.Namespace) -> int:
+    sink = load_sink(args.sink, args.sink_option)
+    conn = await asyncpg.connect(
+        asyncpg_dsn(), server_settings={"application_name": f"{DB_APPLICATION_NAME}_outbox_relay"}
+    )
+    wake = asyncio.Event()
+    stop = asyncio.Event()
+    listener = PgListener({OUTBOX_CHANNEL: lambda _: wake.set()}, on_connect=wake.set, name="outbox_relay")
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        locked = await conn.fetchval(
+            "SELECT pg_try_advisory_lock(hashtext('outbox_relay:' || $1))", args.consumer
+        )
+        if not locked:
+            log(f"Another relay of consumer {args.consumer} is running")
+            return 1
+        listener.start()
+        await relay(conn, sink, args, wake, stop)
+    finally:
+        await listener.stop()
+        await sink.close()
+        await conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--consumer", default="default", help="Checkpoint name, one per downstream system")
+    parser.add_argument("--sink", default="stdout", help=f"One of {sorted(SINKS)} or module:factory")
+    parser.add_argument("--sink-option", action="append", default=[], help="key=value passed to the sink")
+    parser.add_argument("--start", choices=["earliest", "latest"], default="earliest",
+                        help="Where a consumer without checkpoint starts")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between reads without wake-up")
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    parser.add_argument("--retention-hours", type=float, default=0,
+                        help="Delete events delivered to all consumers and older than this, 0 keeps everything")
+    parser.add_argument("--prune-interval", type=float, default=60.0)
+    parser.add_argument("--prune-batch", type=int, default=10_000)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,69 @@
+"""
+Maintenance of the monthly ``payments`` partitions.
+
+Usage:
+    python -m scripts.payment_partitions list
+    python -m scripts.payment_partitions ensure --months-ahead 3
+    python -m scripts.payment_partitions archive --older-than-months 12 [--dry-run]
+"""
+import argparse
+import asyncio
+
+from app.core.config import PAYMENTS_ARCHIVE_SCHEMA, PAYMENTS_PARTITIONS_MONTHS_AHEAD
+from app.db.partitions import (
+    archive_payment_partitions,
+    ensure_payment_partitions,
+    list_payment_partitions,
+)
+from app.db.session import engine
+
+
+async def list_partitions(args: argparse.Namespace) -> None:
+    async with engine.connect() as conn:
+        partitions = await conn.run_sync(list_payment_partitions)
+    for name in partitions:
+        print(name)
+
+
+async def ensure(args: argparse.Namespace) -> None:
+    async with engine.begin() as conn:
+        created = await conn.run_sync(ensure_payment_partitions, args.months_ahead)
+    print(f"Created partitions: {', '.join(created) if created else 'none'}")
+
+
+async def archive(args: argparse.Namespace) -> None:
+    async with engine.begin() as conn:
+        archived = await conn.run_sync(
+            archive_payment_partitions, args.older_than_months, args.schema, args.dry_run, args.lock_timeout
+        )
+
+    action = "Would archive" if args.dry_run else f"Archived to schema '{args.schema}'"
+    print(f"{action}: {', '.join(archived) if archived else 'none'}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        await args.handler(args)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(required=True)
+
+    list_parser = commands.add_parser("list", help="Show attached partitions")
+    list_parser.set_defaults(handler=list_partitions)
+
+    ensure_parser = commands.add_parser("ensure", help="Create missing partitions ahead of time")
+    ensure_parser.add_argument("--months-ahead", type=int, default=PAYMENTS_PARTITIONS_MONTHS_AHEAD)
+    ensure_parser.set_defaults(handler=ensure)
+
+    archive_parser = commands.add_parser("archive", help="Detach old partitions into the archive schema")
+    archive_parser.add_argument("--older-than-months", type=int, required=True)
+    archive_parser.add_argument("--schema", default=PAYMENTS_ARCHIVE_SCHEMA)
+    archive_parser.add_argument("--dry-run", action="store_true")
+    archive_parser.add_argument("--lock-timeout", default="5s", help="Maximal wait for the lock on payments")
+    archive_parser.set_defaults(handler=archive)
+
+    asyncio.run(main(parser.parse_args()))
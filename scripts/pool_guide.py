@@ -0,0 +1,89 @@
+"""
+Suggest connection pool settings from observed database concurrency.
+
+Samples ``pg_stat_activity`` for connections opened by the application
+(``DB_APPLICATION_NAME``) and counts the ones doing work, i.e. not ``idle``.
+Run it while the service handles representative traffic.
+
+Usage:
+    python -m scripts.pool_guide --duration 60 --interval 0.1 --processes 1
+"""
+import argparse
+import asyncio
+import math
+import time
+
+import asyncpg
+
+from app.core.config import DB_APPLICATION_NAME, DB_POOL_SIZE, DB_MAX_OVERFLOW
+from app.core.stats import percentile
+from app.db.session import asyncpg_dsn
+
+SAMPLE_QUERY = """
+    SELECT count(*) AS total,
+           count(*) FILTER (WHERE state <> 'idle') AS busy
+    FROM pg_stat_activity
+    WHERE application_name = $1 AND pid <> pg_backend_pid()
+"""
+
+
+async def sample(duration: float, interval: float) -> tuple[list, list]:
+    conn = await asyncpg.connect(asyncpg_dsn())
+    busy, total = [], []
+    try:
+        max_connections = int(await conn.fetchval("SHOW max_connections"))
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            row = await conn.fetchrow(SAMPLE_QUERY, DB_APPLICATION_NAME)
+            busy.append(row["busy"])
+            total.append(row["total"])
+            await asyncio.sleep(interval)
+    finally:
+        await conn.close()
+
+    print(f"Postgres max_connections: {max_connections}")
+    return busy, total
+
+
+def suggest(busy: list, processes: int, headroom: float) -> dict:
+    """
+    Derive per-process pool settings from busy-connection samples.
+
+    The steady pool covers p95 concurrency plus headroom, overflow covers the peak.
+    """
+    p95 = percentile(busy, 95)
+    peak = max(busy)
+    pool_size = max(1, math.ceil(p95 * (1 + headroom) / processes))
+    ceiling = max(pool_size, math.ceil(peak * (1 + headroom) / processes))
+    return {"pool_size": pool_size, "max_overflow": ceiling - pool_size}
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"Sampling '{DB_APPLICATION_NAME}' connections for {args.duration}s ...")
+    busy, total = await sample(args.duration, args.interval)
+    if not any(total):
+        print("No application connections observed; is the service running and under load?")
+        return
+
+    print(f"Samples: {len(busy)}")
+    print(f"Open connections: max {max(total)}")
+    print(
+        f"Busy connections: p50 {percentile(busy, 50)}, p95 {percentile(busy, 95)}, "
+        f"p99 {percentile(busy, 99)}, max {max(busy)}"
+    )
+
+    suggestion = suggest(busy, args.processes, args.headroom)
+    print(f"\nCurrent:   DB_POOL_SIZE={DB_POOL_SIZE} DB_MAX_OVERFLOW={DB_MAX_OVERFLOW}")
+    print(
+        f"Suggested: DB_POOL_SIZE={suggestion['pool_size']} "
+        f"DB_MAX_OVERFLOW={suggestion['max_overflow']} (per process, {args.processes} process(es))"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=60.0, help="Sampling time in seconds")
+    parser.add_argument("--interval", type=float, default=0.1, help="Pause between samples in seconds")
+    parser.add_argument("--processes", type=int, default=1, help="Number of app processes sharing the load")
+    parser.add_argument("--headroom", type=float, default=0.25, help="Extra capacity over observed load")
+    asyncio.run(main(parser.parse_args()))
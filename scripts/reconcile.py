@@ -0,0 +1,267 @@
+"""
+Reconcile ``accounts.balance_minor`` with the sum of the account's payments.
+
+The account-id space is split into ranges of ``--range-size`` ids. Ranges are
+processed concurrently by ``--workers`` connections. Each range is a single
+read-only statement, so the balance and the payments total come from the
+same snapshot. Payments of partitions archived into ``--archive-schema``
+count towards the total. Mismatches are read through a server-side cursor and appended
+to ``--report`` (CSV) as each range finishes.
+
+Finished ranges are recorded in ``--checkpoint`` together with the size of
+the report at that point. ``--resume`` skips them and cuts the report back to
+that size, so an interrupted run continues where it stopped without
+reporting an account twice. ``--max-accounts-per-second``
+and ``--pause`` limit the load, so the job can run next to live webhook traffic.
+
+Exits with status 1 when mismatches were found.
+
+Usage:
+    python -m scripts.reconcile --workers 4 --range-size 10000 --max-accounts-per-second 50000
+    python -m scripts.reconcile --resume
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import asyncpg
+
+from app.core.config import DB_APPLICATION_NAME, PAYMENTS_ARCHIVE_SCHEMA
+from app.db.session import asyncpg_dsn
+
+ARCHIVED_TABLES_QUERY = """
+    SELECT table_name
+    FROM information_schema.columns
+    WHERE table_schema = $1 AND column_name = 'amount_minor' AND table_name ~ '^payments_[0-9]{4}_[0-9]{2}$'
+    ORDER BY table_name
+"""
+
+
+def mismatches_query(archived: list[str]) -> str:
+    """
+    Mismatches of the accounts in ``[$1, $2)``.
+
+    Balances include payments of partitions detached by
+    ``scripts.payment_partitions archive``, so ``archived`` tables are summed
+    together with ``payments``.
+    """
+    sources = "\n        UNION ALL ".join(
+        f"SELECT account_id, amount_minor FROM {table} WHERE account_id >= $1 AND account_id < $2"
+        for table in ["payments", *archived]
+    )
+    return f"""
+    SELECT a.id, a.user_id, a.balance_minor, COALESCE(p.total, 0) AS payments_total_minor
+    FROM accounts a
+    LEFT JOIN (
+        SELECT account_id, sum(amount_minor) AS total
+        FROM (
+        {sources}
+        ) all_payments
+        GROUP BY account_id
+    ) p ON p.account_id = a.id
+    WHERE a.id >= $1 AND a.id < $2
+      AND a.balance_minor <> COALESCE(p.total, 0)
+    ORDER BY a.id
+"""
+
+
+REPORT_COLUMNS = ["account_id", "user_id", "balance_minor", "payments_total_minor", "difference_minor"]
+
+
+class Checkpoint:
+    """
+    Progress of a reconciliation run, persisted as JSON after every range.
+
+    Args:
+        path: Checkpoint file
+        state: Id bounds, range size, finished ranges, mismatch count and report size
+    """
+
+    def __init__(self, path: Path, state: dict):
+        self.path = path
+        self.state = state
+
+    @classmethod
+    def start(cls, path: Path, min_id: int, max_id: int, range_size: int) -> "Checkpoint":
+        return cls(path, {
+            "min_id": min_id,
+            "max_id": max_id,
+            "range_size": range_size,
+            "done": [],
+            "mismatches": 0,
+            "report_offset": 0,
+        })
+
+    @classmethod
+    def load(cls, path: Path) -> "Checkpoint":
+        return cls(path, json.loads(path.read_text()))
+
+    def pending_ranges(self) -> list[tuple[int, int]]:
+        done = set(self.state["done"])
+        size = self.state["range_size"]
+        return [
+            (start, start + size)
+            for start in range(self.state["min_id"], self.state["max_id"] + 1, size)
+            if start not in done
+        ]
+
+    def mark_done(self, start: int, mismatches: int, report_offset: int) -> None:
+        self.state["done"].append(start)
+        self.state["mismatches"] += mismatches
+        self.state["report_offset"] = report_offset
+        # Write-then-rename, so an interrupted run never leaves a truncated checkpoint
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state))
+        os.replace(tmp, self.path)
+
+
+class Throttle:
+    """
+    Shared rate limit on processed account ids across all workers.
+
+    Args:
+        rate: Maximal account ids per second, 0 disables throttling
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.processed = 0
+
+    async def consume(self, count: int) -> None:
+        self.processed += count
+        if self.rate:
+            ahead = self.processed / self.rate - (time.monotonic() - self.started)
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+
+
+async def worker(
+        query: str,
+        ranges: asyncio.Queue,
+        checkpoint: Checkpoint,
+        report: csv.writer,
+        report_file,
+        throttle: Throttle,
+        args: argparse.Namespace,
+) -> None:
+    conn = await asyncpg.connect(
+        asyncpg_dsn(), server_settings={"application_name": f"{DB_APPLICATION_NAME}_reconcile"}
+    )
+    try:
+        while not ranges.empty():
+            start, end = ranges.get_nowait()
+            mismatches = []
+            async with conn.transaction(readonly=True):
+                if args.statement_timeout:
+                    await conn.execute(f"SET LOCAL statement_timeout = '{args.statement_timeout}'")
+                async for row in conn.cursor(query, start, end, prefetch=args.fetch_size):
+                    mismatches.append([
+                        row["id"], row["user_id"], row["balance_minor"], row["payments_total_minor"],
+                        row["balance_minor"] - row["payments_total_minor"],
+                    ])
+            # No await between the rows and the checkpoint entry, so the recorded
+            # offset ends after the rows of every finished range and of no other.
+            # Rows written before a crash but not checkpointed are cut off on resume.
+            report.writerows(mismatches)
+            report_file.flush()
+            checkpoint.mark_done(start, len(mismatches), report_file.tell())
+
+            await throttle.consume(end - start)
+            if args.pause:
+                await asyncio.sleep(args.pause)
+    finally:
+        await conn.close()
+
+
+async def main(args: argparse.Namespace) -> int:
+    checkpoint_path = Path(args.checkpoint)
+    report_path = Path(args.report)
+
+    resume = args.resume and checkpoint_path.exists()
+    if resume and not report_path.exists():
+        print(f"{report_path} of the interrupted run not found", file=sys.stderr)
+        return 2
+
+    conn = await asyncpg.connect(asyncpg_dsn())
+    try:
+        archived = [
+            f'"{args.archive_schema}"."{row["table_name"]}"'
+            for row in await conn.fetch(ARCHIVED_TABLES_QUERY, args.archive_schema)
+        ]
+        if not resume:
+            min_id, max_id = await conn.fetchrow("SELECT COALESCE(min(id), 0), COALESCE(max(id), -1) FROM accounts")
+    finally:
+        await conn.close()
+    query = mismatches_query(archived)
+    if archived:
+        print(f"Including {len(archived)} archived partitions of schema '{args.archive_schema}'")
+
+    if resume:
+        checkpoint = Checkpoint.load(checkpoint_path)
+    else:
+        checkpoint = Checkpoint.start(checkpoint_path, min_id, max_id, args.range_size)
+
+    pending = checkpoint.pending_ranges()
+    ranges = asyncio.Queue()
+    for id_range in pending:
+        ranges.put_nowait(id_range)
+    print(f"Reconciling accounts {checkpoint.state['min_id']}..{checkpoint.state['max_id']}: "
+          f"{len(pending)} ranges left of {checkpoint.state['range_size']} ids")
+
+    started = time.perf_counter()
+    throttle = Throttle(args.max_accounts_per_second)
+    with report_path.open("r+" if resume else "w", newline="") as report_file:
+        report = csv.writer(report_file)
+        if resume:
+            report_file.truncate(checkpoint.state["report_offset"])
+            report_file.seek(checkpoint.state["report_offset"])
+        else:
+            report.writerow(REPORT_COLUMNS)
+            report_file.flush()
+            checkpoint.state["report_offset"] = report_file.tell()
+
+        workers = [
+            asyncio.create_task(worker(query, ranges, checkpoint, report, report_file, throttle, args))
+            for _ in range(args.workers)
+        ]
+        progress = asyncio.create_task(report_progress(checkpoint, len(pending), started))
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            progress.cancel()
+
+    mismatches = checkpoint.state["mismatches"]
+    print(f"\n{'❌' if mismatches else '✅'} {mismatches} mismatched accounts "
+          f"({time.perf_counter() - started:.1f}s), report: {report_path}")
+    checkpoint_path.unlink(missing_ok=True)
+    return 1 if mismatches else 0
+
+
+async def report_progress(checkpoint: Checkpoint, total: int, started: float) -> None:
+    already_done = len(checkpoint.state["done"])
+    while True:
+        await asyncio.sleep(5)
+        done = len(checkpoint.state["done"]) - already_done
+        print(f"  {done}/{total} ranges, {done / (time.perf_counter() - started):.1f} ranges/s", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent connections")
+    parser.add_argument("--range-size", type=int, default=10_000, help="Account ids per range")
+    parser.add_argument("--fetch-size", type=int, default=1000, help="Rows per cursor fetch")
+    parser.add_argument("--report", default="reconcile_report.csv")
+    parser.add_argument("--checkpoint", default="reconcile_checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="Continue from --checkpoint")
+    parser.add_argument("--archive-schema", default=PAYMENTS_ARCHIVE_SCHEMA,
+                        help="Schema of the archived payments partitions")
+    parser.add_argument("--max-accounts-per-second", type=float, default=0, help="Throttle, 0 disables it")
+    parser.add_argument("--pause", type=float, default=0, help="Seconds to sleep after each range")
+    parser.add_argument("--statement-timeout", default="", help="E.g. 30s, aborts slow range queries")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,285 @@
+"""
+Replay a dump of missed payment webhooks straight through the service layer.
+
+``--input`` is a JSONL file with one signed webhook payload per line, as the
+payment system posts it. The file is streamed in batches of
+``--batch-size`` lines, and ``--workers`` batches are applied concurrently,
+each on its own connection:
+
+- every line is validated with ``WebhookRequest`` and its signature checked
+  with ``WebhookService.verify_signature``
+- valid payloads are applied with ``WebhookService.process_webhook``, each in
+  a savepoint, and the batch is committed once. Payloads are applied in
+  account order, so concurrent batches lock accounts in the same order
+- a transaction that was already processed, by the API or earlier in the
+  file, is counted as a duplicate and changes nothing (dedupe on
+  ``transaction_id`` in ``payment_transactions``)
+- rejected lines are appended to ``--rejects`` (JSONL) with the reason, e.g. a
+  bad signature or an unknown user, so they can be fixed and replayed
+
+Finished batches are recorded in ``--checkpoint``; ``--resume`` continues an
+interrupted run with the batches that were not committed. Cache
+invalidations and outbox wake-ups of the committed payments are sent to the
+running servers as with API webhooks; run with ``SSE_FANOUT=notify`` if the
+servers use it, so open event streams see the new balances.
+
+Exits with status 1 when lines were rejected.
+
+Usage:
+    python -m scripts.replay_webhooks --input missed.jsonl --workers 4 --batch-size 100
+    python -m scripts.replay_webhooks --input missed.jsonl --resume
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError
+
+from app.core.cache import invalidation_publisher
+from app.core.config import WEBHOOK_SECRET_KEY
+from app.core.events import balance_publisher
+from app.db.outbox import outbox_notifier
+from app.db.session import AsyncSessionLocal, engine
+from app.db.utils.payment import WebhookService
+from app.schemas.payment import WebhookRequest
+
+# Message of WebhookService responses for transactions processed before
+ALREADY_PROCESSED = "Transaction already processed"
+# SQLSTATEs of conflicts with concurrent batches or API webhooks: deadlock,
+# serialization failure, and an account created concurrently
+RETRYABLE = {"40P01", "40001", "23505"}
+SUMMARY_KEYS = ("applied", "duplicate", "invalid_json", "invalid_payload", "invalid_signature", "rejected", "failed")
+
+
+class Checkpoint:
+    """
+    Progress of a replay, persisted as JSON after every batch.
+
+    Batch ``n`` holds lines ``n * batch_size + 1`` to ``(n + 1) * batch_size``.
+    All batches before ``batch`` are committed and start at byte ``offset``;
+    later committed batches are listed in ``done``.
+
+    Args:
+        path: Checkpoint file
+        state: Input file, batch size, progress and counts
+    """
+
+    def __init__(self, path: Path, state: dict):
+        self.path = path
+        self.state = state
+        self.done = set(state["done"])
+        # End offsets of the batches read but not yet part of the committed prefix
+        self.ends: dict[int, int] = {}
+
+    @classmethod
+    def start(cls, path: Path, input_path: Path, batch_size: int) -> "Checkpoint":
+        return cls(path, {
+            "input": str(input_path.resolve()),
+            "size": input_path.stat().st_size,
+            "batch_size": batch_size,
+            "batch": 0,
+            "offset": 0,
+            "done": [],
+            "counts": dict.fromkeys(SUMMARY_KEYS, 0),
+        })
+
+    @classmethod
+    def load(cls, path: Path) -> "Checkpoint":
+        return cls(path, json.loads(path.read_text()))
+
+    def mark_done(self, batch: int, counts: Counter) -> None:
+        self.done.add(batch)
+        while self.state["batch"] in self.done:
+            self.done.remove(self.state["batch"])
+            self.state["offset"] = self.ends.pop(self.state["batch"])
+            self.state["batch"] += 1
+        self.state["done"] = sorted(self.done)
+        for key, count in counts.items():
+            self.state["counts"][key] += count
+        # Write-then-rename, so an interrupted run never leaves a truncated checkpoint
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state))
+        os.replace(tmp, self.path)
+
+
+def read_batches(input_path: Path, checkpoint: Checkpoint):
+    """Yield ``(batch, first line number, lines)`` of the batches not committed yet."""
+    batch_size = checkpoint.state["batch_size"]
+    batch = checkpoint.state["batch"]
+    with input_path.open("rb") as file:
+        file.seek(checkpoint.state["offset"])
+        offset = checkpoint.state["offset"]
+        lines = []
+        for line in file:
+            offset += len(line)
+            lines.append(line)
+            if len(lines) == batch_size:
+                checkpoint.ends[batch] = offset
+                if batch not in checkpoint.done:
+                    yield batch, batch * batch_size + 1, lines
+                batch += 1
+                lines = []
+        if lines:
+            checkpoint.ends[batch] = offset
+            if batch not in checkpoint.done:
+                yield batch, batch * batch_size + 1, lines
+
+
+def parse(line_number: int, line: bytes, rejects: list) -> tuple[str, dict]:
+    """Validate one line; returns its outcome so far and the payload as the API endpoint passes it on."""
+    text = line.decode("utf-8", errors="replace").strip()
+    try:
+        data = json.loads(text)
+        payload = WebhookRequest.model_validate(data).model_dump()
+    except ValueError as e:
+        kind = "invalid_payload" if isinstance(e, ValidationError) else "invalid_json"
+        rejects.append({"line": line_number, "reason": kind, "error": str(e).splitlines()[0], "payload": text})
+        return kind, {}
+    if not WebhookService.verify_signature(payload, payload["signature"], WEBHOOK_SECRET_KEY):
+        rejects.append({"line": line_number, "reason": "invalid_signature", "payload": text})
+        return "invalid_signature", {}
+    payload["line"] = line_number
+    payload["raw"] = text
+    return "valid", payload
+
+
+async def apply_batch(line_number: int, lines: list[bytes], retries: int) -> tuple[Counter, list]:
+    """Validate and apply the lines of one batch in one transaction; returns the counts and rejected lines."""
+    counts = Counter()
+    rejects = []
+    payloads = []
+    for number, line in enumerate(lines, line_number):
+        if not line.strip():
+            continue
+        outcome, payload = parse(number, line, rejects)
+        if outcome == "valid":
+            payloads.append(payload)
+        else:
+            counts[outcome] += 1
+    payloads.sort(key=lambda payload: (payload["account_id"], str(payload["transaction_id"])))
+
+    async with AsyncSessionLocal() as db:
+        for payload in payloads:
+            line, raw = payload.pop("line"), payload.pop("raw")
+            for attempt in range(retries + 1):
+                try:
+                    async with db.begin_nested():
+                        response = await WebhookService.process_webhook(db, payload, WEBHOOK_SECRET_KEY)
+                    counts["duplicate" if response.message == ALREADY_PROCESSED else "applied"] += 1
+                    break
+                except ValueError as e:
+                    counts["rejected"] += 1
+                    rejects.append({"line": line, "reason": "rejected", "error": str(e), "payload": raw})
+                    break
+                except DBAPIError as e:
+                    if getattr(e.orig, "sqlstate", None) in RETRYABLE and attempt < retries:
+                        await asyncio.sleep(0.05 * (attempt + 1))
+                        continue
+                    counts["failed"] += 1
+                    rejects.append({"line": line, "reason": "failed", "error": str(e.orig), "payload": raw})
+                    break
+        await db.commit()
+    return counts, rejects
+
+
+async def worker(batches: asyncio.Queue, checkpoint: Checkpoint, rejects_file, args: argparse.Namespace) -> None:
+    while (item := await batches.get()) is not None:
+        batch, line_number, lines = item
+        counts, rejects = await apply_batch(line_number, lines, args.retries)
+        # Rejects of a batch are written together with its checkpoint entry, so a
+        # resumed run never reports a line twice
+        rejects_file.writelines(json.dumps(reject) + "\n" for reject in rejects)
+        rejects_file.flush()
+        checkpoint.mark_done(batch, counts)
+
+
+async def feed(batches: asyncio.Queue, items, workers: list[asyncio.Task]) -> None:
+    """Queue ``items`` for the workers; stops when a worker fails, which only happens before its end marker."""
+    for item in items:
+        put = asyncio.create_task(batches.put(item))
+        await asyncio.wait([put, *workers], return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            return
+
+
+async def report_progress(checkpoint: Checkpoint, started: float) -> None:
+    counts = checkpoint.state["counts"]
+    already = sum(counts.values())
+    while True:
+        await asyncio.sleep(5)
+        done = sum(counts.values()) - already
+        print(f"  {sum(counts.values()):,} lines: {counts['applied']:,} applied, {counts['duplicate']:,} duplicate, "
+              f"{done / (time.perf_counter() - started):,.0f} lines/s", flush=True)
+
+
+async def main(args: argparse.Namespace) -> int:
+    input_path = Path(args.input)
+    checkpoint_path = Path(args.checkpoint)
+    rejects_path = Path(args.rejects)
+    if not input_path.is_file():
+        print(f"{input_path} not found", file=sys.stderr)
+        return 2
+
+    if args.resume and checkpoint_path.exists():
+        checkpoint = Checkpoint.load(checkpoint_path)
+        if checkpoint.state["input"] != str(input_path.resolve()) or checkpoint.state["size"] != input_path.stat().st_size:
+            print(f"{checkpoint_path} belongs to {checkpoint.state['input']} "
+                  f"({checkpoint.state['size']} bytes), not to {input_path}", file=sys.stderr)
+            return 2
+        rejects_mode = "a"
+        print(f"Resuming at line {checkpoint.state['batch'] * checkpoint.state['batch_size'] + 1:,}, "
+              f"{len(checkpoint.done)} later batches already committed")
+    else:
+        checkpoint = Checkpoint.start(checkpoint_path, input_path, args.batch_size)
+        rejects_mode = "w"
+
+    started = time.perf_counter()
+    batches = asyncio.Queue(maxsize=args.workers * 2)
+    with rejects_path.open(rejects_mode) as rejects_file:
+        workers = [asyncio.create_task(worker(batches, checkpoint, rejects_file, args)) for _ in range(args.workers)]
+        progress = asyncio.create_task(report_progress(checkpoint, started))
+        try:
+            await feed(batches, itertools.chain(read_batches(input_path, checkpoint), [None] * len(workers)), workers)
+            await asyncio.gather(*workers)
+        finally:
+            progress.cancel()
+            for task in workers:
+                task.cancel()
+            # Notifications of the last commits
+            await invalidation_publisher.stop()
+            await outbox_notifier.stop()
+            await balance_publisher.stop()
+            await engine.dispose()
+
+    counts = checkpoint.state["counts"]
+    rejected = sum(counts[key] for key in SUMMARY_KEYS[2:])
+    elapsed = time.perf_counter() - started
+    print(f"\n{'❌' if rejected else '✅'} {sum(counts.values()):,} webhooks in {elapsed:.1f}s: "
+          f"{counts['applied']:,} applied, {counts['duplicate']:,} duplicate, {rejected:,} rejected")
+    for key in SUMMARY_KEYS[2:]:
+        if counts[key]:
+            print(f"\t{key}: {counts[key]:,}")
+    if rejected:
+        print(f"Rejected lines: {rejects_path}")
+    checkpoint_path.unlink(missing_ok=True)
+    return 1 if rejected else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="JSONL file of webhook payloads")
+    parser.add_argument("--workers", type=int, default=4, help="Batches applied concurrently")
+    parser.add_argument("--batch-size", type=int, default=100, help="Lines per transaction")
+    parser.add_argument("--retries", type=int, default=3, help="Retries of a payload after a conflict")
+    parser.add_argument("--rejects", default="replay_rejects.jsonl")
+    parser.add_argument("--checkpoint", default="replay_checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="Continue from --checkpoint")
+    sys.exit(asyncio.run(main(parser.parse_args())))